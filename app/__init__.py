@@ -29,6 +29,9 @@ def create_app(config_name='default'):
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    from . import metrics
+    metrics.init_app(app)
+
     # Registro dos Blueprints
     from .auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
@@ -39,6 +42,9 @@ def create_app(config_name='default'):
     from .admin import admin as admin_blueprint
     app.register_blueprint(admin_blueprint, url_prefix='/admin')
 
+    from .commands import register_commands
+    register_commands(app)
+
     return app
 
 from . import models
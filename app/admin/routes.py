@@ -1,13 +1,20 @@
 # ==== AURA_V2/app/admin/routes.py ====
 
-from flask import render_template, redirect, url_for, flash, request
-from flask_login import login_required
+from flask import render_template, redirect, url_for, flash, request, current_app, abort, Response
+from flask_login import login_required, current_user
+import hmac
 import json
 from . import admin
 from .forms import UserForm, ClientForm, DataSourceForm
 from app import db
 from app.models import User, Client, DataSource
 from app.utils import admin_required
+from app.service_registry import service_registry
+from app.history_cache import get_history_cache
+from app.metadata_cache import get_metadata_cache
+from app.ticket_cache import get_ticket_cache
+from app.capability_index import get_capability_index
+from app.metrics import get_metrics
 
 # --- Dashboard do Admin ---
 @admin.route('/dashboard')
@@ -19,6 +26,17 @@ def dashboard():
     return render_template('admin/dashboard.html', title='Admin Dashboard',
                            client_count=client_count, user_count=user_count)
 
+# --- Métricas (Prometheus) ---
+@admin.route('/metrics')
+def metrics():
+    # Aceita um administrador com sessão ou o token de recolha (METRICS_TOKEN).
+    token = current_app.config.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    has_token = bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+    if not has_token and not (current_user.is_authenticated and current_user.is_role('Admin')):
+        abort(403)
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
 # --- Gestão de Clientes ---
 @admin.route('/clients')
 @login_required
@@ -106,6 +124,10 @@ def edit_datasource(datasource_id):
             datasource.platform = form.platform.data
             datasource.credentials_json = form.credentials_json.data
             db.session.commit()
+            service_registry.invalidate(datasource.id)
+            _purge_history_cache(datasource.id)
+            get_metadata_cache().invalidate(datasource.id)
+            get_capability_index().invalidate(datasource.id)
             flash(f'Fonte de dados {datasource.platform} atualizada com sucesso!', 'success')
             return redirect(url_for('admin.list_datasources', client_id=client.id))
         except json.JSONDecodeError:
@@ -121,9 +143,39 @@ def delete_datasource(datasource_id):
     client_id = datasource.client_id
     db.session.delete(datasource)
     db.session.commit()
+    service_registry.invalidate(datasource_id)
+    _purge_history_cache(datasource_id)
+    get_metadata_cache().invalidate(datasource_id)
+    get_capability_index().invalidate(datasource_id)
     flash('Fonte de dados apagada com sucesso!', 'success')
     return redirect(url_for('admin.list_datasources', client_id=client_id))
 
+@admin.route('/datasource/purge-cache/<int:datasource_id>', methods=['POST'])
+@login_required
+@admin_required
+def purge_datasource_cache(datasource_id):
+    datasource = DataSource.query.get_or_404(datasource_id)
+    _purge_history_cache(datasource.id)
+    flash(f'Cache de histórico da fonte de dados {datasource.platform} limpa com sucesso!', 'success')
+    return redirect(url_for('admin.list_datasources', client_id=datasource.client_id))
+
+@admin.route('/datasource/refresh-metadata/<int:datasource_id>', methods=['POST'])
+@login_required
+@admin_required
+def refresh_datasource_metadata(datasource_id):
+    datasource = DataSource.query.get_or_404(datasource_id)
+    get_metadata_cache().invalidate(datasource.id)
+    get_capability_index().invalidate(datasource.id)
+    flash(f'Grupos de hosts e hosts da fonte de dados {datasource.platform} serão recarregados no próximo acesso.', 'success')
+    return redirect(url_for('admin.list_datasources', client_id=datasource.client_id))
+
+def _purge_history_cache(datasource_id):
+    """Descarta o histórico e os tickets em cache de uma fonte de dados (ex.: o servidor pode ter mudado)."""
+    cache = get_history_cache()
+    if cache:
+        cache.purge(datasource_id)
+    get_ticket_cache().invalidate(datasource_id)
+
 # --- Gestão de Utilizadores ---
 @admin.route('/users')
 @login_required
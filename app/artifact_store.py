@@ -0,0 +1,118 @@
+# ==== AURA_V2/app/artifact_store.py ====
+
+import hashlib
+import json
+import os
+import time
+from flask import current_app
+
+PARTIAL_SUFFIX = '.part'
+
+def report_key(client_id, report_config):
+    """
+    Hash canónico de um pedido de relatório: cliente, módulos (na ordem do
+    layout), hosts, período e nome. Pedidos equivalentes têm a mesma chave,
+    independentemente da ordem em que os hosts foram selecionados.
+    """
+    modules = list(dict.fromkeys(report_config.get('modules') or []))
+    layout = report_config.get('layout_order') or []
+    if isinstance(layout, str):
+        layout = [key.strip() for key in layout.split(',') if key.strip()]
+    rank = {key: index for index, key in enumerate(layout)}
+    canonical = {
+        'client_id': client_id,
+        'modules': sorted(modules, key=lambda key: rank.get(key, len(rank))),
+        'hosts': sorted({str(host) for host in report_config.get('hosts') or []}),
+        'start_date': report_config.get('start_date'),
+        'end_date': report_config.get('end_date'),
+        'report_name': report_config.get('report_name'),
+    }
+    raw = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class ArtifactStore:
+    """
+    Armazém dos PDFs finais, endereçados pela chave do pedido (`report_key`).
+    Mantém o disco limitado por idade e tamanho total e remove ficheiros
+    temporários ou parciais abandonados por execuções que falharam.
+    """
+    def __init__(self, root, max_age_seconds, max_bytes, temp_max_age_seconds=3600):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.temp_max_age_seconds = temp_max_age_seconds
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    def path_for(self, key):
+        return os.path.abspath(os.path.join(self.root, f"{key}.pdf"))
+
+    def lookup(self, key, freshness_seconds):
+        """Devolve o caminho do PDF guardado se existir e ainda estiver fresco."""
+        path = self.path_for(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        return path if age <= freshness_seconds else None
+
+    def store(self, key, pdf_path):
+        """Move o PDF gerado para o armazém (operação atómica) e devolve o novo caminho."""
+        destination = self.path_for(key)
+        os.replace(pdf_path, destination)
+        return destination
+
+    def sweep(self):
+        """
+        Aplica a retenção: remove ficheiros temporários/parciais antigos, PDFs
+        mais velhos do que `max_age_seconds` e, se o total ainda exceder
+        `max_bytes`, os PDFs mais antigos até caber.
+        """
+        now = time.time()
+        removed = {'temp': 0, 'expired': 0, 'size': 0}
+        reports = []
+        for entry in os.scandir(self.root):
+            if not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            age = now - stat.st_mtime
+            is_temp = entry.name.startswith('temp_') or entry.name.endswith(PARTIAL_SUFFIX)
+            if is_temp:
+                if age > self.temp_max_age_seconds and self._remove(entry.path):
+                    removed['temp'] += 1
+            elif entry.name.endswith('.pdf'):
+                if age > self.max_age_seconds:
+                    if self._remove(entry.path):
+                        removed['expired'] += 1
+                else:
+                    reports.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in reports)
+        for _, size, path in sorted(reports):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed['size'] += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError as e:
+            current_app.logger.warning(f"Erro ao remover o ficheiro {path}: {e}")
+            return False
+
+def get_artifact_store():
+    """Armazém configurado para a aplicação atual."""
+    config = current_app.config
+    return ArtifactStore(
+        root=config.get('ARTIFACT_DIR', 'relatorios_gerados'),
+        max_age_seconds=config.get('ARTIFACT_MAX_AGE_DAYS', 30) * 86400,
+        max_bytes=config.get('ARTIFACT_MAX_MB', 2048) * 1024 * 1024,
+        temp_max_age_seconds=config.get('ARTIFACT_TEMP_MAX_AGE_SECONDS', 3600))
@@ -0,0 +1,124 @@
+# ==== AURA_V2/app/async_clients.py ====
+
+import asyncio
+import json
+import time
+from flask import current_app
+from . import json_stream
+from .async_runtime import AsyncHttpClient
+from .governor import TransientError
+from .metrics import record_zabbix_call
+from .softdesk_api import SoftdeskServiceError
+from .zabbix_api import ZabbixServiceError, batch_results, _count_rows
+
+# Variantes assíncronas dos serviços das plataformas. Este módulo (e o asyncio e
+# o aiohttp) só é importado quando um serviço cria o seu cliente assíncrono.
+
+class AsyncZabbixClient(AsyncHttpClient):
+    """
+    Variante assíncrona (asyncio + aiohttp) do ZabbixService, com a mesma
+    superfície `get`/`batch`. Partilha o token do serviço síncrono: o login,
+    raro, corre numa thread à parte para não bloquear o loop. Os pedidos
+    passam pelo governador do serviço (o mesmo limite de ZABBIX_MAX_CONCURRENCY
+    para os dois clientes). Usar através de `app.async_runtime`.
+    """
+    def __init__(self, service):
+        super().__init__({'Content-Type': 'application/json-rpc', 'Accept-Encoding': 'gzip, deflate'},
+                         service.timeout, service.governor)
+        self.service = service
+
+    async def _post(self, payload):
+        """Envia o payload (objeto ou lista JSON-RPC), medido em `app.metrics` como no serviço síncrono."""
+        import aiohttp
+        method = payload.get('method') if isinstance(payload, dict) else 'batch'
+        start = time.perf_counter()
+        content, data = b'', None
+        try:
+            content = await self._request('POST', self.service.url, data=json.dumps(payload),
+                                          on_retry=self.service._on_retry)
+            data = json_stream.loads(content)
+            return data
+        except (TransientError, aiohttp.ClientError) as e:
+            current_app.logger.error(f"Erro de conexão com o Zabbix: {e}")
+            raise ZabbixServiceError(f"Não foi possível conectar ao servidor Zabbix em {self.service.url}.")
+        finally:
+            responses = data if isinstance(data, list) else [data]
+            record_zabbix_call(self.service.datasource_id, method, time.perf_counter() - start,
+                               response_bytes=len(content), rows=sum(_count_rows(item) for item in responses),
+                               error=any(not isinstance(item, dict) or 'error' in item for item in responses))
+
+    async def _token(self, stale_token=None):
+        if self.service.uses_login:
+            await asyncio.to_thread(self.service._ensure_token, stale_token)
+        if not self.service.token:
+            raise ZabbixServiceError("Token de autenticação não encontrado ou inválido.")
+        return self.service.token
+
+    async def get(self, method, params, _retry=True):
+        """Igual a `ZabbixService.get`."""
+        token = await self._token()
+        data = await self._post({"jsonrpc": "2.0", "method": method, "params": params, "id": 1, "auth": token})
+        if 'error' in data:
+            error_msg = data['error'].get('data', 'Erro desconhecido na API do Zabbix.')
+            if _retry and self.service.uses_login and self.service._is_session_error(error_msg):
+                current_app.logger.info("Sessão Zabbix expirada. A renovar o login...")
+                await self._token(stale_token=token)
+                return await self.get(method, params, _retry=False)
+            current_app.logger.error(f"Erro na API Zabbix: {error_msg}")
+            raise ZabbixServiceError(error_msg)
+        self.service._token_last_used = time.monotonic()
+        return data.get('result')
+
+    async def batch(self, calls, raise_on_error=True, _retry=True):
+        """Igual a `ZabbixService.batch`."""
+        calls = list(calls)
+        if not calls:
+            return []
+        token = await self._token()
+        results = batch_results(calls, await self._post([
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": index, "auth": token}
+            for index, (method, params) in enumerate(calls)
+        ]))
+
+        errors = [r for r in results if isinstance(r, ZabbixServiceError)]
+        if errors and _retry and self.service.uses_login and any(self.service._is_session_error(e) for e in errors):
+            current_app.logger.info("Sessão Zabbix expirada. A renovar o login...")
+            await self._token(stale_token=token)
+            return await self.batch(calls, raise_on_error, _retry=False)
+
+        self.service._token_last_used = time.monotonic()
+        for error in errors:
+            current_app.logger.error(f"Erro na API Zabbix (lote): {error}")
+        if errors and raise_on_error:
+            raise errors[0]
+        return results
+
+class AsyncSoftdeskClient(AsyncHttpClient):
+    """Variante assíncrona (asyncio + aiohttp) do SoftdeskService, com a mesma superfície `get`/`batch`."""
+    def __init__(self, service):
+        super().__init__(dict(service.session.headers), service.timeout, service.governor)
+        self.service = service
+
+    async def get(self, endpoint, params=None):
+        """Igual a `SoftdeskService.get`."""
+        import aiohttp
+        full_url = f"{self.service.url.rstrip('/')}/{endpoint.lstrip('/')}"
+        try:
+            content = await self._request('GET', full_url, params=params)
+            return json_stream.loads(content) if content else None
+        except TransientError as e:
+            raise SoftdeskServiceError(f"Não foi possível conectar ao servidor Softdesk em {self.service.url}: {e}")
+        except aiohttp.ClientResponseError as e:
+            raise SoftdeskServiceError(f"Erro {e.status} da API do Softdesk em '{endpoint}'.")
+        except (aiohttp.ClientError, ValueError) as e:
+            raise SoftdeskServiceError(f"Resposta inválida do servidor Softdesk em {self.service.url}: {e}")
+
+    async def batch(self, calls, raise_on_error=True):
+        """
+        Várias leituras (endpoint, params) em simultâneo; resultados pela ordem
+        de `calls`. Com `raise_on_error=False`, as que falharam surgem na lista
+        como instâncias de SoftdeskServiceError.
+        """
+        results = await asyncio.gather(*(self.get(endpoint, params) for endpoint, params in calls),
+                                       return_exceptions=not raise_on_error)
+        return list(results)
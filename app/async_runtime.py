@@ -0,0 +1,224 @@
+# ==== AURA_V2/app/async_runtime.py ====
+
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+class _LoopThread:
+    """Event loop asyncio a correr numa thread própria (uma por processo)."""
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name='aura-async-loop', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+_runtime = None
+_runtime_lock = threading.Lock()
+_clients = weakref.WeakSet()
+
+def get_loop():
+    """
+    Loop partilhado por todas as threads do processo: os pedidos assíncronos de
+    todos os relatórios (e dos trabalhos de um lote) são multiplexados nele.
+    Depois de um fork, o processo filho cria o seu próprio loop.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime.pid != os.getpid():
+            _runtime = _LoopThread()
+        return _runtime.loop
+
+def submit(coro):
+    """
+    Agenda a corrotina no loop partilhado e devolve um `concurrent.futures.Future`.
+    A tarefa corre numa cópia do contexto de quem a submete, pelo que herda o
+    contexto da aplicação Flask e o relatório em medição (`app.metrics`).
+    """
+    loop = get_loop()
+    context = contextvars.copy_context()
+    future = Future()
+
+    def start():
+        if future.cancelled():
+            coro.close()
+            return
+        task = loop.create_task(coro, context=context)
+
+        def done(task):
+            try:
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+            except InvalidStateError:
+                pass  # cancelado por quem submeteu entretanto
+
+        task.add_done_callback(done)
+        future.add_done_callback(lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel))
+
+    loop.call_soon_threadsafe(start)
+    return future
+
+def run(coro, timeout=None):
+    """Executa a corrotina no loop partilhado e espera pelo resultado (API síncrona)."""
+    return submit(coro).result(timeout)
+
+def iter_ordered(factories, prefetch):
+    """
+    Gera os resultados de várias corrotinas pela ordem de `factories` (funções
+    sem argumentos que criam a corrotina), com no máximo `prefetch` em curso.
+    Só os resultados ainda não consumidos ficam em memória. Se o consumidor
+    parar a meio, as corrotinas pendentes são canceladas.
+    """
+    factories = iter(factories)
+    pending = deque()
+    try:
+        for factory in factories:
+            pending.append(submit(factory()))
+            if len(pending) >= max(1, prefetch):
+                break
+        while pending:
+            result = pending.popleft().result()
+            factory = next(factories, None)
+            if factory is not None:
+                pending.append(submit(factory()))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+_END = object()
+
+async def _pump(agen, queue):
+    """Passa os elementos do gerador assíncrono para a fila (à espera quando está cheia)."""
+    try:
+        async for item in agen:
+            await queue.put(item)
+        await queue.put(_END)
+    except Exception as e:
+        await queue.put(_Failure(e))
+    finally:
+        await agen.aclose()
+
+def iter_ordered_streams(factories, prefetch, buffer=1):
+    """
+    Como `iter_ordered`, mas cada fábrica cria um gerador assíncrono (ex.: as
+    páginas de uma janela) cujos elementos são entregues à medida que chegam.
+    Estão em curso no máximo `prefetch` geradores; cada um só avança quando
+    tiver menos de `buffer` elementos à espera de serem consumidos, pelo que a
+    memória fica limitada a cerca de prefetch x (buffer + 1) elementos.
+    """
+    factories = iter(factories)
+    pending = deque()
+
+    def start(factory):
+        queue = asyncio.Queue(max(1, buffer))
+        pending.append((queue, submit(_pump(factory(), queue))))
+
+    try:
+        for factory in factories:
+            start(factory)
+            if len(pending) >= max(1, prefetch):
+                break
+        while pending:
+            queue, _ = pending[0]
+            item = run(queue.get())
+            if item is _END:
+                pending.popleft()
+                factory = next(factories, None)
+                if factory is not None:
+                    start(factory)
+                continue
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+def async_http_available(config):
+    """Indica se os clientes assíncronos podem ser usados (aiohttp instalado e ASYNC_HTTP_ENABLED)."""
+    if not config.get('ASYNC_HTTP_ENABLED', True):
+        return False
+    try:
+        import aiohttp  # noqa: F401 (carregado só por quem usa os clientes assíncronos)
+    except ImportError:
+        return False
+    return True
+
+class AsyncHttpClient:
+    """
+    Base dos clientes assíncronos das plataformas: uma sessão aiohttp (criada
+    no loop partilhado, na primeira utilização) e os pedidos feitos sob o
+    governador da fonte de dados (`app.governor`). As vagas e o limite AIMD são
+    os mesmos do cliente síncrono, pelo que a latência e as falhas (429/5xx)
+    dos pedidos assíncronos também reduzem a concorrência.
+    """
+    def __init__(self, headers, timeout, governor):
+        self.headers = headers
+        self.timeout = timeout  # (ligação, leitura), como no requests
+        self.governor = governor
+        self.max_concurrency = governor.max_concurrency
+        self._session = None
+        _clients.add(self)
+
+    def _ensure_session(self):
+        import aiohttp
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout[0], sock_read=self.timeout[1]))
+        return self._session
+
+    async def _send(self, method, url, kwargs):
+        import aiohttp
+        from .governor import TRANSIENT_STATUS_CODES, TransientError, _retry_after
+
+        try:
+            async with self._ensure_session().request(method, url, **kwargs) as response:
+                if response.status in TRANSIENT_STATUS_CODES:
+                    raise TransientError(f'HTTP {response.status} em {url}', retry_after=_retry_after(response))
+                response.raise_for_status()
+                return await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise TransientError(str(e) or e.__class__.__name__) from e
+
+    async def _request(self, method, url, on_retry=None, **kwargs):
+        """Pedido HTTP sob o governador (vaga, ajuste do limite e repetições); devolve o corpo (bytes)."""
+        return await self.governor.call_async(self._send, method, url, kwargs, on_retry=on_retry)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close_sync(self):
+        """Fecha a sessão a partir de código síncrono (ex.: `service.close()`)."""
+        if self._session is not None:
+            try:
+                run(self.close(), timeout=5)
+            except Exception:
+                pass
+
+@atexit.register
+def _close_clients():
+    """Fecha as sessões aiohttp ainda abertas quando o processo termina."""
+    if _runtime is None or _runtime.pid != os.getpid():
+        return
+    for client in list(_clients):
+        client.close_sync()
@@ -0,0 +1,234 @@
+# ==== AURA_V2/app/batch_reports.py ====
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+from urllib.parse import urlparse
+from flask import current_app
+from . import db
+from .models import Client, DataSource, ReportBatch, ReportDefinition, ReportJob
+from .artifact_store import get_artifact_store, report_key
+from .report_worker import run_job, worker_name
+from .service_registry import service_registry
+
+class BatchInProgressError(Exception):
+    """O lote já está a ser executado por outro processo ativo."""
+    pass
+
+def resolve_period(period, today=None):
+    """(início, fim) de um período relativo; o fim é exclusivo (meia-noite do dia seguinte ao último)."""
+    today = today or date.today()
+    if period == 'previous_month':
+        end = today.replace(day=1)
+        return (end - timedelta(days=1)).replace(day=1), end
+    if period == 'last_7_days':
+        return today - timedelta(days=7), today
+    if period == 'last_30_days':
+        return today - timedelta(days=30), today
+    raise ValueError(f"Período desconhecido: '{period}'.")
+
+def _zabbix_source(client):
+    return client.data_sources.filter(DataSource.platform.ilike('zabbix')).first()
+
+def eligible_clients(names=None):
+    """Clientes com fonte de dados Zabbix (opcionalmente só os indicados por nome)."""
+    clients = Client.query.order_by(Client.name).all()
+    if names:
+        wanted = set(names)
+        missing = wanted - {client.name for client in clients}
+        if missing:
+            raise ValueError(f"Clientes não encontrados: {', '.join(sorted(missing))}.")
+        clients = [client for client in clients if client.name in wanted]
+    return [client for client in clients if _zabbix_source(client)]
+
+def server_key(client):
+    """Servidor Zabbix de um cliente (host:porta da URL), usado no limite por servidor."""
+    datasource = _zabbix_source(client)
+    url = datasource.get_credentials().get('url') if datasource else None
+    return urlparse(url).netloc if url else f'datasource-{datasource.id if datasource else 0}'
+
+def start_batch(definition, clients, period_start, period_end, retry_failed=False):
+    """
+    Cria ou retoma o lote de uma definição para um período. Um lote 'running'
+    cujo processo deixou de dar sinal (BATCH_STALE_SECONDS) é retomado: os
+    trabalhos que ficaram a meio voltam a 'scheduled' e os concluídos mantêm-se.
+    """
+    now = datetime.utcnow()
+    batch = ReportBatch.query.filter_by(definition_id=definition.id, period_start=period_start,
+                                        period_end=period_end).first()
+    if batch is None:
+        batch = ReportBatch(definition=definition, period_start=period_start, period_end=period_end)
+        db.session.add(batch)
+    elif batch.status == 'running' and batch.heartbeat_at:
+        stale_after = timedelta(seconds=current_app.config.get('BATCH_STALE_SECONDS', 120))
+        if now - batch.heartbeat_at < stale_after:
+            raise BatchInProgressError(f"O lote {batch.id} está a ser executado por '{batch.runner}'.")
+
+    batch.status = 'running'
+    batch.runner = worker_name()
+    batch.heartbeat_at = now
+    batch.finished_at = None
+    db.session.flush()
+
+    resumed = ['running', 'failed'] if retry_failed else ['running']
+    batch.jobs.filter(ReportJob.status.in_(resumed)).update(
+        {'status': 'scheduled', 'started_at': None, 'finished_at': None, 'error_message': None},
+        synchronize_session=False)
+
+    existing = {job.client_id for job in batch.jobs}
+    for client in clients:
+        if client.id not in existing:
+            job = ReportJob(client_id=client.id, status='scheduled', batch=batch)
+            job.set_config(_job_config(definition, period_start, period_end))
+            db.session.add(job)
+    db.session.commit()
+    return batch
+
+def _job_config(definition, period_start, period_end):
+    config = definition.get_config()
+    config.update({
+        'report_name': config.get('report_name') or definition.name,
+        'start_date': period_start.isoformat(),
+        'end_date': period_end.isoformat(),
+    })
+    return config
+
+def _resolve_hosts(client, host_groups):
+    """IDs dos hosts do cliente, opcionalmente limitados aos grupos indicados (por nome)."""
+    service = service_registry.get(_zabbix_source(client))
+    params = {'output': ['hostid']}
+    if host_groups:
+        groups = service.get('hostgroup.get', {'output': ['groupid'], 'filter': {'name': list(host_groups)}}) or []
+        if not groups:
+            return []
+        params['groupids'] = [group['groupid'] for group in groups]
+    return [host['hostid'] for host in service.get('host.get', params) or []]
+
+def _claim(job_id, runner):
+    claimed = ReportJob.query.filter_by(id=job_id, status='scheduled').update(
+        {'status': 'running', 'started_at': datetime.utcnow(), 'worker': runner},
+        synchronize_session=False)
+    db.session.commit()
+    return ReportJob.query.get(job_id) if claimed else None
+
+def _run_batch_job(app, job_id, runner):
+    """Executa um trabalho do lote numa thread (com o seu próprio contexto e sessão)."""
+    with app.app_context():
+        try:
+            job = _claim(job_id, runner)
+            if job is None:
+                return None
+            config = job.get_config()
+            if not config.get('hosts'):
+                config['hosts'] = _resolve_hosts(job.client, config.get('host_groups'))
+            if not config['hosts']:
+                job.status, job.error_message = 'failed', 'Nenhum host encontrado para o cliente.'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                return job.status
+            job.set_config(config)
+            job.artifact_key = report_key(job.client_id, config)
+
+            stored_path = get_artifact_store().lookup(job.artifact_key,
+                                                      current_app.config.get('ARTIFACT_FRESHNESS_SECONDS', 6 * 3600))
+            if stored_path:
+                job.status, job.output_path, job.finished_at = 'done', stored_path, datetime.utcnow()
+                db.session.commit()
+                return job.status
+            db.session.commit()
+            return run_job(job).status
+        except Exception as e:
+            current_app.logger.error(f"Erro no trabalho {job_id} do lote: {e}", exc_info=True)
+            db.session.rollback()
+            ReportJob.query.filter_by(id=job_id).update(
+                {'status': 'failed', 'finished_at': datetime.utcnow(), 'error_message': str(e)},
+                synchronize_session=False)
+            db.session.commit()
+            return 'failed'
+        finally:
+            db.session.remove()
+
+def run_batch(batch, max_workers=None, per_server=None):
+    """
+    Executa os trabalhos 'scheduled' do lote, com no máximo `max_workers` em
+    simultâneo e `per_server` por servidor Zabbix. Um trabalho cujo servidor
+    está no limite fica à espera sem ocupar uma vaga global. Devolve o resumo.
+    """
+    config = current_app.config
+    max_workers = max(1, max_workers or config.get('BATCH_MAX_WORKERS', 4))
+    per_server = max(1, per_server or config.get('BATCH_MAX_PER_SERVER', 2))
+    heartbeat = config.get('BATCH_HEARTBEAT_SECONDS', 30)
+    app = current_app._get_current_object()
+    runner = batch.runner
+    started = time.monotonic()
+
+    pending = [(job.id, server_key(job.client))
+               for job in batch.jobs.filter_by(status='scheduled').order_by(ReportJob.id)]
+    current_app.logger.info(f"Lote {batch.id}: {len(pending)} relatório(s) por gerar "
+                            f"({max_workers} em simultâneo, {per_server} por servidor).")
+    running, busy = {}, Counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-batch') as executor:
+        while pending or running:
+            for entry in list(pending):
+                if len(running) >= max_workers:
+                    break
+                job_id, server = entry
+                if busy[server] >= per_server:
+                    continue
+                pending.remove(entry)
+                busy[server] += 1
+                running[executor.submit(_run_batch_job, app, job_id, runner)] = entry
+
+            done, _ = wait(running, timeout=heartbeat, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id, server = running.pop(future)
+                busy[server] -= 1
+                current_app.logger.info(f"Lote {batch.id}: trabalho {job_id} terminou ({future.result()}); "
+                                        f"{len(pending)} por iniciar, {len(running)} em curso.")
+            batch.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+    batch.status = 'finished'
+    batch.finished_at = datetime.utcnow()
+    db.session.commit()
+    return batch_summary(batch, time.monotonic() - started)
+
+def batch_summary(batch, wall_seconds=None):
+    """Contagens por estado, tempos e falhas do lote (inclui trabalhos de execuções anteriores)."""
+    jobs = batch.jobs.order_by(ReportJob.id).all()
+    durations = sorted((job.run_seconds, job.client.name) for job in jobs if job.run_seconds is not None)
+    return {
+        'batch_id': batch.id,
+        'definition': batch.definition.name,
+        'period': f'{batch.period_start.isoformat()} a {batch.period_end.isoformat()}',
+        'wall_seconds': wall_seconds,
+        'counts': dict(Counter(job.status for job in jobs)),
+        'total': len(jobs),
+        'run_seconds': {
+            'min': durations[0][0] if durations else None,
+            'avg': sum(d for d, _ in durations) / len(durations) if durations else None,
+            'max': durations[-1][0] if durations else None,
+        },
+        'slowest': [{'client': name, 'seconds': seconds} for seconds, name in reversed(durations[-5:])],
+        'failures': [{'client': job.client.name, 'error': job.error_message} for job in jobs if job.status == 'failed'],
+    }
+
+def run_definition(definition, client_names=None, period_start=None, period_end=None,
+                   max_workers=None, per_server=None, retry_failed=False, today=None):
+    """Inicia (ou retoma) e executa o lote de uma definição; devolve o resumo."""
+    if period_start is None or period_end is None:
+        period_start, period_end = resolve_period(definition.period, today)
+    batch = start_batch(definition, eligible_clients(client_names), period_start, period_end, retry_failed)
+    return run_batch(batch, max_workers, per_server)
+
+def due_definitions(today=None):
+    """Definições agendadas para hoje cujo lote do período ainda não terminou."""
+    today = today or date.today()
+    due = []
+    for definition in ReportDefinition.query.filter_by(run_day=today.day).order_by(ReportDefinition.id):
+        period_start, period_end = resolve_period(definition.period, today)
+        batch = definition.batches.filter_by(period_start=period_start, period_end=period_end).first()
+        if batch is None or batch.status != 'finished':
+            due.append(definition)
+    return due
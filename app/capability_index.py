@@ -0,0 +1,185 @@
+# ==== AURA_V2/app/capability_index.py ====
+
+import threading
+import time
+from flask import current_app
+from .local_store import connect, instance_file
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS indexed_hosts (
+        datasource_id INTEGER NOT NULL,
+        hostid TEXT NOT NULL,
+        refreshed_at REAL NOT NULL,
+        PRIMARY KEY (datasource_id, hostid)
+    )""",
+    """CREATE TABLE IF NOT EXISTS host_capabilities (
+        datasource_id INTEGER NOT NULL,
+        hostid TEXT NOT NULL,
+        module_key TEXT NOT NULL,
+        PRIMARY KEY (datasource_id, hostid, module_key)
+    )""",
+    """CREATE TABLE IF NOT EXISTS index_builds (
+        datasource_id INTEGER PRIMARY KEY,
+        built_at REAL,
+        building_until REAL
+    )""",
+)
+
+def capability_keys(collectors):
+    """{module_key: chaves de item} dos coletores que declaram CAPABILITY_KEYS."""
+    return {key: list(data['class'].CAPABILITY_KEYS) for key, data in collectors.items()
+            if getattr(data['class'], 'CAPABILITY_KEYS', None)}
+
+def items_to_capabilities(items, keys_by_module):
+    """{hostid: {module_key, ...}} a partir de itens com 'hostid' e 'key_'."""
+    capabilities = {}
+    for item in items:
+        item_key = item.get('key_', '')
+        modules = capabilities.setdefault(item['hostid'], set())
+        for module_key, keys in keys_by_module.items():
+            # O 'search' do Zabbix compara por substring; a verificação local faz o mesmo.
+            if any(key in item_key for key in keys):
+                modules.add(module_key)
+    return capabilities
+
+class CapabilityIndex:
+    """
+    Índice local de capacidades por host: que módulos (coletores) têm itens em
+    cada host. Responde à validação de módulos com uma pesquisa local em vez
+    de um item.get por coletor a cada alteração da seleção.
+
+    O índice completo de uma fonte de dados é construído com um único item.get
+    (em segundo plano); os hosts selecionados que ainda não estejam indexados,
+    ou cuja entrada expirou (CAPABILITY_INDEX_TTL), são atualizados na hora.
+    """
+    def __init__(self, path, ttl=3600, rebuild_seconds=86400):
+        self.path = path
+        self.ttl = ttl
+        self.rebuild_seconds = rebuild_seconds
+        with connect(self.path) as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def supported_modules(self, datasource_id, host_ids, keys_by_module, service_loader):
+        """Conjunto de módulos suportados por pelo menos um dos hosts indicados."""
+        host_ids = [str(host_id) for host_id in host_ids]
+        self._schedule_rebuild(datasource_id, keys_by_module, service_loader)
+
+        stale = self._stale_hosts(datasource_id, host_ids)
+        if stale:
+            self.refresh_hosts(datasource_id, stale, keys_by_module, service_loader())
+
+        supported = set()
+        with connect(self.path) as connection:
+            for offset in range(0, len(host_ids), 500):
+                chunk = host_ids[offset:offset + 500]
+                rows = connection.execute(
+                    f"""SELECT DISTINCT module_key FROM host_capabilities
+                        WHERE datasource_id = ? AND hostid IN ({','.join('?' * len(chunk))})""",
+                    [datasource_id, *chunk])
+                supported.update(row['module_key'] for row in rows)
+        return supported
+
+    def refresh_hosts(self, datasource_id, host_ids, keys_by_module, service):
+        """Reindexa apenas os hosts indicados (um item.get)."""
+        items = self._fetch_items(service, keys_by_module, host_ids)
+        with connect(self.path) as connection:
+            self._store(connection, datasource_id, host_ids, items_to_capabilities(items, keys_by_module))
+
+    def rebuild(self, datasource_id, keys_by_module, service):
+        """Reconstrói o índice de todos os hosts da fonte de dados (um item.get)."""
+        items = self._fetch_items(service, keys_by_module)
+        capabilities = items_to_capabilities(items, keys_by_module)
+        with connect(self.path) as connection:
+            connection.execute('DELETE FROM host_capabilities WHERE datasource_id = ?', (datasource_id,))
+            connection.execute('DELETE FROM indexed_hosts WHERE datasource_id = ?', (datasource_id,))
+            # Hosts sem itens relevantes não entram aqui; são indexados quando forem selecionados.
+            self._store(connection, datasource_id, list(capabilities), capabilities)
+            connection.execute(
+                """INSERT OR REPLACE INTO index_builds (datasource_id, built_at, building_until)
+                   VALUES (?, ?, NULL)""", (datasource_id, time.time()))
+
+    def invalidate(self, datasource_id):
+        """Descarta o índice de uma fonte de dados."""
+        with connect(self.path) as connection:
+            for table in ('host_capabilities', 'indexed_hosts', 'index_builds'):
+                connection.execute(f'DELETE FROM {table} WHERE datasource_id = ?', (datasource_id,))
+
+    @staticmethod
+    def _fetch_items(service, keys_by_module, host_ids=None):
+        all_keys = sorted({key for keys in keys_by_module.values() for key in keys})
+        params = {'output': ['hostid', 'key_'], 'search': {'key_': all_keys}, 'searchByAny': True}
+        if host_ids is not None:
+            params['hostids'] = host_ids
+        return service.get('item.get', params) or []
+
+    @staticmethod
+    def _store(connection, datasource_id, host_ids, capabilities):
+        now = time.time()
+        for offset in range(0, len(host_ids), 500):
+            chunk = host_ids[offset:offset + 500]
+            connection.execute(
+                f"""DELETE FROM host_capabilities
+                    WHERE datasource_id = ? AND hostid IN ({','.join('?' * len(chunk))})""",
+                [datasource_id, *chunk])
+        connection.executemany(
+            'INSERT OR REPLACE INTO indexed_hosts (datasource_id, hostid, refreshed_at) VALUES (?, ?, ?)',
+            [(datasource_id, host_id, now) for host_id in host_ids])
+        connection.executemany(
+            'INSERT OR IGNORE INTO host_capabilities (datasource_id, hostid, module_key) VALUES (?, ?, ?)',
+            [(datasource_id, host_id, module_key)
+             for host_id in host_ids for module_key in capabilities.get(host_id, ())])
+
+    def _stale_hosts(self, datasource_id, host_ids):
+        fresh = set()
+        limit = time.time() - self.ttl
+        with connect(self.path) as connection:
+            for offset in range(0, len(host_ids), 500):
+                chunk = host_ids[offset:offset + 500]
+                rows = connection.execute(
+                    f"""SELECT hostid FROM indexed_hosts
+                        WHERE datasource_id = ? AND refreshed_at >= ?
+                          AND hostid IN ({','.join('?' * len(chunk))})""",
+                    [datasource_id, limit, *chunk])
+                fresh.update(row['hostid'] for row in rows)
+        return [host_id for host_id in host_ids if host_id not in fresh]
+
+    def _schedule_rebuild(self, datasource_id, keys_by_module, service_loader):
+        """Inicia a reconstrução completa em segundo plano se o índice nunca foi feito ou está velho."""
+        now = time.time()
+        with connect(self.path) as connection:
+            connection.execute('INSERT OR IGNORE INTO index_builds (datasource_id) VALUES (?)', (datasource_id,))
+            cursor = connection.execute(
+                """UPDATE index_builds SET building_until = ?
+                   WHERE datasource_id = ?
+                     AND (built_at IS NULL OR built_at < ?)
+                     AND (building_until IS NULL OR building_until < ?)""",
+                (now + 600, datasource_id, now - self.rebuild_seconds, now))
+            if cursor.rowcount != 1:
+                return
+
+        app = current_app._get_current_object()
+
+        def rebuild():
+            with app.app_context():
+                try:
+                    self.rebuild(datasource_id, keys_by_module, service_loader())
+                except Exception as e:
+                    app.logger.warning(f"Falha ao construir o índice de capacidades da fonte {datasource_id}: {e}")
+
+        threading.Thread(target=rebuild, name='capability-index', daemon=True).start()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_capability_index():
+    """Devolve o índice de capacidades da aplicação atual."""
+    path = instance_file(current_app.config.get('CAPABILITY_INDEX_FILE', 'capability_cache.db'))
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = CapabilityIndex(path,
+                                    ttl=current_app.config.get('CAPABILITY_INDEX_TTL', 3600),
+                                    rebuild_seconds=current_app.config.get('CAPABILITY_INDEX_REBUILD_SECONDS', 86400))
+            _indexes[path] = index
+        return index
@@ -1,47 +1,158 @@
 # ==== AURA_V2/app/charting.py ====
 
-import os
-import uuid
+import base64
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict, namedtuple
 import matplotlib
 matplotlib.use('Agg') # Modo não-interativo, essencial para servidores web
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import pandas as pd
 import seaborn as sns
-from flask import current_app
+from .render_pool import run_in_pool
+from .metrics import span
+
+# Tema definido uma única vez; as figuras só o leem, não alteram estado global.
+sns.set_theme(style="whitegrid")
+
+MIME_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+class ChartImage(namedtuple('ChartImage', ['data', 'mime_type'])):
+    """Gráfico renderizado em memória (bytes), pronto a embutir no HTML do PDF."""
+    __slots__ = ()
+
+    @property
+    def data_uri(self):
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+class ChartCache:
+    """
+    Cache LRU de gráficos renderizados, endereçada pelo conteúdo: a chave é um
+    hash dos dados do DataFrame e dos parâmetros de renderização. O tamanho
+    total dos bytes guardados é limitado a `max_bytes`.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(kind, df, params):
+        """Hash do tipo de gráfico, do conteúdo do DataFrame e dos parâmetros."""
+        digest = hashlib.sha256()
+        digest.update(kind.encode('utf-8'))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        size = len(image.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.data)
+            self._entries[key] = image
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+                self.evictions += 1
+
+    def stats(self):
+        """Contadores para monitorização."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+_chart_cache = None
+_chart_cache_lock = threading.Lock()
+
+def get_chart_cache(app):
+    """Cache de gráficos partilhada pelo processo (None se CHART_CACHE_MAX_MB = 0)."""
+    global _chart_cache
+    max_mb = app.config.get('CHART_CACHE_MAX_MB', 64)
+    if not max_mb:
+        return None
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            _chart_cache = ChartCache(max_bytes=int(max_mb * 1024 * 1024))
+        return _chart_cache
 
 class ChartingService:
-    """Serviço dedicado à criação de gráficos."""
-    def __init__(self):
-        self.output_dir = os.path.join(current_app.static_folder, 'charts')
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-        
-        sns.set_theme(style="whitegrid")
-
-    def _save_chart(self, filename_prefix='chart'):
-        """Salva a figura atual e fecha-a para libertar memória."""
-        filename = f"{filename_prefix}_{uuid.uuid4().hex[:12]}.png"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        plt.savefig(filepath, bbox_inches='tight', dpi=150)
-        plt.close()
-        
-        # Retorna o caminho absoluto do ficheiro para o gerador de PDF
-        return filepath
+    """
+    Serviço dedicado à criação de gráficos. Usa a API orientada a objetos do
+    matplotlib (uma Figure por gráfico, sem o estado global do pyplot), pelo que
+    várias threads podem renderizar em paralelo. Os gráficos são devolvidos em
+    memória, sem passar pelo disco. Se receber um pool de processos, a
+    renderização (pesada em CPU) é delegada a esse pool.
+    """
+    def __init__(self, render_pool=None, image_format='png', cache=None):
+        self.render_pool = render_pool
+        self.image_format = image_format
+        self.cache = cache
+
+    def _render(self, kind, render_fn, df, **params):
+        """Devolve o gráfico da cache ou renderiza-o com `render_fn(df, **params)`."""
+        params['image_format'] = self.image_format
+        key = ChartCache.make_key(kind, df, params) if self.cache else None
+        image = self.cache.get(key) if key else None
+        if image is None:
+            with span('chart_render'):
+                image = run_in_pool(self.render_pool, _call_renderer, render_fn, df, params)
+            if key:
+                self.cache.put(key, image)
+        return image
 
     def generate_bar_chart(self, df, x, y, title, xlabel, ylabel):
         """Gera um gráfico de barras a partir de um DataFrame do Pandas."""
         if df.empty:
             return None
-            
-        plt.figure(figsize=(10, 6))
-        
-        palette = sns.color_palette("viridis", len(df))
-        
-        ax = sns.barplot(data=df, x=x, y=y, palette=palette, hue=x, legend=False)
-        
-        ax.set_title(title, fontsize=16, weight='bold')
-        ax.set_xlabel(xlabel, fontsize=12)
-        ax.set_ylabel(ylabel, fontsize=12)
-        plt.xticks(rotation=45, ha='right')
-        
-        return self._save_chart(filename_prefix='bar_chart')
\ No newline at end of file
+        return self._render('bar', render_bar_chart, df,
+                            x=x, y=y, title=title, xlabel=xlabel, ylabel=ylabel)
+
+def _call_renderer(render_fn, df, params):
+    """Adaptador com argumentos posicionais, para envio ao pool de processos."""
+    return render_fn(df, **params)
+
+def _figure_to_image(fig, image_format):
+    """Serializa a figura para bytes no formato pedido."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format, bbox_inches='tight', dpi=150)
+    return ChartImage(buffer.getvalue(), MIME_TYPES[image_format])
+
+def render_bar_chart(df, x, y, title, xlabel, ylabel, image_format='png'):
+    """Renderiza o gráfico de barras (função de topo para poder correr noutro processo)."""
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    
+    palette = sns.color_palette("viridis", len(df))
+    
+    sns.barplot(data=df, x=x, y=y, palette=palette, hue=x, legend=False, ax=ax)
+    
+    ax.set_title(title, fontsize=16, weight='bold')
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    
+    return _figure_to_image(fig, image_format)
@@ -1,10 +1,13 @@
 # ==== AURA_V2/app/collectors/__init__.py ====
 
-# Importa as classes dos coletores
+# Importa as classes dos coletores. Este pacote é carregado pelo processo web,
+# por isso os coletores só importam pandas/numpy dentro dos métodos de coleta.
 from .cpu_collector import CpuCollector
+from .ticket_collector import TicketCollector
 # No futuro, importe outros coletores aqui.
 
 # Define a lista de módulos disponíveis num local central.
 AVAILABLE_COLLECTORS = {
     'cpu': {'class': CpuCollector, 'name': 'Uso de CPU'},
+    'tickets': {'class': TicketCollector, 'name': 'Chamados (Softdesk)'},
 }
\ No newline at end of file
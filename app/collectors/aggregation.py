@@ -0,0 +1,138 @@
+# ==== AURA_V2/app/collectors/aggregation.py ====
+
+import numpy as np
+import pandas as pd
+
+class HostAggregator:
+    """
+    Agregação em fluxo por host: consome as páginas tipadas (ver `ingestion`)
+    à medida que chegam e guarda apenas, por host, contagem, soma, mínimo,
+    máximo e um histograma de intervalos fixos. A memória é O(hosts x bins),
+    independente do número de amostras.
+
+    O histograma é mesclável (somam-se as contagens), pelo que agregadores de
+    páginas, blocos ou processos diferentes podem ser juntos com `merge`. Os
+    percentis são estimados por interpolação dentro do intervalo, com um erro
+    máximo de (high - low) / bins; valores fora de [low, high] contam no
+    primeiro/último intervalo e o resultado é limitado ao mínimo/máximo reais.
+    """
+    def __init__(self, low=0.0, high=100.0, bins=1000):
+        if high <= low or bins < 1:
+            raise ValueError("O histograma precisa de high > low e de pelo menos um intervalo.")
+        self.low = float(low)
+        self.high = float(high)
+        self.bins = int(bins)
+        self.hosts = []
+        self._index = {}
+        self.count = np.zeros(0, dtype=np.float64)
+        self.total = np.zeros(0, dtype=np.float64)
+        self.minimum = np.zeros(0, dtype=np.float64)
+        self.maximum = np.zeros(0, dtype=np.float64)
+        self.histogram = np.zeros((0, self.bins), dtype=np.float64)
+
+    def _host_positions(self, names):
+        """Posições (nas matrizes de estado) dos hosts indicados, criando as que faltam."""
+        new = [name for name in names if name not in self._index]
+        if new:
+            for name in new:
+                self._index[name] = len(self.hosts)
+                self.hosts.append(name)
+            extra = len(new)
+            self.count = np.concatenate([self.count, np.zeros(extra)])
+            self.total = np.concatenate([self.total, np.zeros(extra)])
+            self.minimum = np.concatenate([self.minimum, np.full(extra, np.inf)])
+            self.maximum = np.concatenate([self.maximum, np.full(extra, -np.inf)])
+            self.histogram = np.vstack([self.histogram, np.zeros((extra, self.bins))])
+        return np.array([self._index[name] for name in names], dtype=np.int64)
+
+    def _bin_of(self, values):
+        scaled = (values - self.low) / (self.high - self.low) * self.bins
+        return np.clip(np.floor(scaled), 0, self.bins - 1).astype(np.int64)
+
+    def add_frame(self, frame):
+        """
+        Acumula uma página. Usa 'value' pesado por 'num' (amostras que cada linha
+        representa) e, se existirem (trends), 'value_min'/'value_max' para os extremos.
+        """
+        if frame.empty:
+            return
+        hosts = frame['host']
+        codes = hosts.cat.codes.to_numpy()
+        valid = codes >= 0
+        if not valid.all():
+            frame, codes = frame[valid], codes[valid]
+            if frame.empty:
+                return
+
+        categories = list(hosts.cat.categories)
+        used = np.unique(codes)
+        positions = self._host_positions([categories[code] for code in used])
+        # Códigos do categórico -> posição compacta (0..len(used)-1) -> posição global.
+        local = np.searchsorted(used, codes)
+        size = len(used)
+
+        values = frame['value'].to_numpy(dtype=np.float64)
+        weights = frame['num'].to_numpy(dtype=np.float64)
+        lows = frame['value_min'].to_numpy(dtype=np.float64) if 'value_min' in frame else values
+        highs = frame['value_max'].to_numpy(dtype=np.float64) if 'value_max' in frame else values
+
+        self.count[positions] += np.bincount(local, weights=weights, minlength=size)
+        self.total[positions] += np.bincount(local, weights=values * weights, minlength=size)
+
+        page_min = np.full(size, np.inf)
+        np.minimum.at(page_min, local, lows)
+        page_max = np.full(size, -np.inf)
+        np.maximum.at(page_max, local, highs)
+        self.minimum[positions] = np.minimum(self.minimum[positions], page_min)
+        self.maximum[positions] = np.maximum(self.maximum[positions], page_max)
+
+        flat = local * self.bins + self._bin_of(values)
+        counts = np.bincount(flat, weights=weights, minlength=size * self.bins)
+        self.histogram[positions] += counts.reshape(size, self.bins)
+
+    def merge(self, other):
+        """Junta o estado de outro agregador com os mesmos intervalos."""
+        if (other.low, other.high, other.bins) != (self.low, self.high, self.bins):
+            raise ValueError("Só é possível juntar agregadores com o mesmo histograma.")
+        if not other.hosts:
+            return self
+        positions = self._host_positions(other.hosts)
+        self.count[positions] += other.count
+        self.total[positions] += other.total
+        self.minimum[positions] = np.minimum(self.minimum[positions], other.minimum)
+        self.maximum[positions] = np.maximum(self.maximum[positions], other.maximum)
+        self.histogram[positions] += other.histogram
+        return self
+
+    def quantiles(self, q):
+        """Percentil `q` (0-1) estimado para cada host (NaN para hosts sem amostras)."""
+        cumulative = np.cumsum(self.histogram, axis=1)
+        target = q * self.count
+        result = np.full(len(self.hosts), np.nan)
+        width = (self.high - self.low) / self.bins
+        for position in np.flatnonzero(self.count > 0):
+            row = cumulative[position]
+            bin_index = min(int(np.searchsorted(row, target[position], side='left')), self.bins - 1)
+            before = row[bin_index - 1] if bin_index else 0.0
+            in_bin = row[bin_index] - before
+            fraction = (target[position] - before) / in_bin if in_bin else 0.0
+            estimate = self.low + (bin_index + fraction) * width
+            result[position] = min(max(estimate, self.minimum[position]), self.maximum[position])
+        return result
+
+    def to_frame(self, percentiles=(95, 99)):
+        """
+        Resultado por host: host, count, mean, min, max e uma coluna pN por
+        percentil pedido. Hosts sem amostras ficam de fora.
+        """
+        present = self.count > 0
+        frame = pd.DataFrame({
+            'host': np.array(self.hosts, dtype=object),
+            'count': self.count,
+            'mean': np.divide(self.total, self.count, out=np.full(len(self.hosts), np.nan), where=present),
+            'min': self.minimum,
+            'max': self.maximum,
+        })
+        for percentile in percentiles:
+            frame[f'p{percentile}'] = self.quantiles(percentile / 100)
+        return frame[present].sort_values('host', ignore_index=True)
@@ -1,16 +1,52 @@
 # ==== AURA_V2/app/collectors/base_collector.py (VERSÃO FINAL E COMPLETA) ====
 
 from abc import ABC, abstractmethod
+import re
 import time
+from flask import current_app
+from ..history_cache import get_history_cache
+
+TREND_PERIOD = 3600               # os trends do Zabbix guardam agregados horários
+NUMERIC_VALUE_TYPES = ('0', '3')  # float e unsigned: os únicos tipos com trends
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_interval(delay):
+    """
+    Converte um intervalo do Zabbix ('60', '30s', '5m', '1h'...) em segundos.
+    Intervalos flexíveis usam apenas a parte base; macros devolvem None.
+    """
+    if delay is None:
+        return None
+    base = str(delay).split(';')[0].strip()
+    match = re.fullmatch(r'(\d+)([smhdw]?)', base)
+    if not match:
+        return None
+    seconds = int(match.group(1)) * INTERVAL_UNITS.get(match.group(2) or 's')
+    return seconds or None
 
 class BaseCollector(ABC):
     """Classe base abstrata para todos os coletores de dados."""
     platform = None
+    # Resolução mínima (em segundos) de que o coletor precisa. None deixa o
+    # resolvedor escolher; valores abaixo de uma hora obrigam a histórico bruto.
+    REQUIRED_RESOLUTION = None
+    # Chaves de item (substrings) que indicam que um host suporta o coletor.
+    # Quando definidas, a validação de módulos usa o índice de capacidades local.
+    CAPABILITY_KEYS = None
+    # Chaves de item (substrings) de que o coletor precisa. Quando definidas, o
+    # ReportGenerator junta os pedidos de todos os módulos num único plano de
+    # recolha (ver `fetch_plan`), em vez de cada coletor pedir os seus dados.
+    ITEM_KEYS = None
+    # Definidos pela estimativa prévia (`app.preflight`): fonte de dados imposta
+    # ('history'/'trends') e leitura em fluxo sem pedidos em paralelo.
+    source_override = None
+    low_memory = False
 
-    def __init__(self, platform_service, charting_service, report_config):
+    def __init__(self, platform_service, charting_service, report_config, fetch_plan=None):
         self.service = platform_service
         self.charting = charting_service
         self.config = report_config
+        self.fetch_plan = fetch_plan
         self.host_ids = self.config.get('hosts', [])
         
         start_date_str = self.config.get('start_date')
@@ -31,17 +67,52 @@ class BaseCollector(ABC):
         except Exception as e:
             print(f"Erro ao coletar dados para {self.__class__.__name__}: {e}")
             return None
+        finally:
+            # Com o plano partilhado, deixa de receber a série (mesmo que tenha falhado antes de a ler).
+            if self.fetch_plan is not None:
+                self.fetch_plan.release(self)
 
     @classmethod
     @abstractmethod
     def is_supported(cls, platform_service, host_ids):
         pass
 
+    @classmethod
+    def support_probe(cls, host_ids):
+        """
+        Devolve a chamada (method, params) que verifica o suporte do coletor,
+        para que várias verificações possam seguir num único lote. Os coletores
+        que não a definem são verificados individualmente com `is_supported`.
+        """
+        return None
+
+    @classmethod
+    def is_supported_from_result(cls, result):
+        """Interpreta o resultado da chamada devolvida por `support_probe`."""
+        return bool(result)
+
     @abstractmethod
     def fetch_data(self):
         pass
 
     # --- FUNÇÕES DE AJUDA RESTAURADAS ---
+    def _get_items_and_hosts(self, keys):
+        """
+        Itens (com 'hostid', 'delay' e 'value_type') cujas chaves contêm `keys`
+        e o mapa hostid -> nome dos hosts selecionados. Vêm do plano partilhado,
+        se existir; senão, de um único pedido em lote.
+        """
+        if self.fetch_plan is not None:
+            return self.fetch_plan.items_for(keys), self.fetch_plan.host_map()
+        items, hosts = self.service.batch([
+            ('item.get', {
+                'output': ['itemid', 'hostid', 'key_', 'delay', 'value_type'], 'hostids': self.host_ids,
+                'search': {'key_': keys}, 'searchByAny': True
+            }),
+            ('host.get', {'output': ['hostid', 'name'], 'hostids': self.host_ids}),
+        ])
+        return items or [], {host['hostid']: host['name'] for host in hosts or []}
+
     def _get_items_by_key(self, key_pattern, host_ids=None):
         """Função de ajuda para buscar itens com base num padrão de chave."""
         active_host_ids = host_ids if host_ids is not None else self.host_ids
@@ -54,16 +125,318 @@ class BaseCollector(ABC):
             'searchByAny': True
         })
 
-    def _get_history(self, item_ids, history_type):
-        """Função de ajuda para buscar o histórico de itens."""
+    def _history_windows(self, time_from, time_till, setting='HISTORY_WINDOW_SECONDS', default=86400):
+        """Divide um intervalo em janelas [início, fim] de tamanho configurável."""
+        window = max(1, int(current_app.config.get(setting, default)))
+        window_start = time_from
+        while window_start <= time_till:
+            window_end = min(window_start + window - 1, time_till)
+            yield window_start, window_end
+            window_start = window_end + 1
+
+    def _check_period(self):
         if not self.start_time or not self.end_time:
             raise ValueError("Período (data de início/fim) não foi definido para buscar o histórico.")
-        return self.service.get('history.get', {
-            'output': 'extend',
-            'history': history_type,
-            'itemids': item_ids,
-            'time_from': self.start_time,
-            'time_till': self.end_time,
-            'sortfield': 'clock',
-            'sortorder': 'ASC'
-        })
\ No newline at end of file
+
+    def _history_cache(self):
+        """Cache local de histórico, se ativa e se o serviço identificar a fonte de dados."""
+        if getattr(self.service, 'datasource_id', None) is None:
+            return None
+        return get_history_cache()
+
+    def _iter_cached(self, cache, source, item_ids, fetch):
+        """
+        Preenche na cache apenas os baldes em falta ou recentes (pedindo-os com
+        `fetch(item_ids, time_from, time_till)`) e depois serve o período pedido
+        a partir da cache, página a página.
+        """
+        datasource_id = self.service.datasource_id
+        now = int(time.time())
+        buckets = cache.bucket_starts(self.start_time, self.end_time)
+        missing = cache.missing(datasource_id, source, item_ids, buckets)
+        for bucket, ids in missing.items():
+            bucket_from, bucket_till = cache.bucket_bounds(bucket, now)
+            if bucket_from > bucket_till:
+                continue  # Balde no futuro: nada a pedir.
+            with cache.writer(datasource_id, source, ids, bucket) as add:
+                for page in fetch(ids, bucket_from, bucket_till):
+                    add(page)
+        if missing:
+            cache.evict()
+
+        page_limit = max(1, int(current_app.config.get('HISTORY_PAGE_LIMIT', 50000)))
+        yield from cache.iter_rows(datasource_id, source, item_ids, self.start_time, self.end_time, page_limit)
+
+    def _iter_history(self, item_ids, history_type):
+        """
+        Gera o histórico dos itens página a página, em vez de o devolver de uma vez.
+
+        Para valores numéricos, usa a cache local e só pede ao Zabbix os baldes
+        em falta ou recentes. Os pedidos ao Zabbix são sempre divididos em blocos
+        de itens e janelas de tempo (ver `_fetch_history`).
+        """
+        self._check_period()
+        item_ids = list(item_ids)
+        cache = self._history_cache() if str(history_type) in NUMERIC_VALUE_TYPES else None
+        if cache:
+            fetch = lambda ids, time_from, time_till: self._fetch_history(ids, history_type, time_from, time_till)
+            yield from self._iter_cached(cache, f'history:{history_type}', item_ids, fetch)
+        else:
+            yield from self._fetch_history(item_ids, history_type, self.start_time, self.end_time)
+
+    def _fetch_history(self, item_ids, history_type, time_from, time_till):
+        """
+        Pede o histórico ao Zabbix em blocos de itens (HISTORY_ITEM_CHUNK) e
+        janelas de tempo (HISTORY_WINDOW_SECONDS); dentro de cada janela, as
+        páginas são obtidas com 'limit' (HISTORY_PAGE_LIMIT). Assim, nem o Zabbix
+        nem o worker precisam de ter o período completo em memória.
+        """
+        chunk_size = max(1, int(current_app.config.get('HISTORY_ITEM_CHUNK', 100)))
+        page_limit = max(1, int(current_app.config.get('HISTORY_PAGE_LIMIT', 50000)))
+        calls = [(item_ids[offset:offset + chunk_size], window_start, window_end)
+                    for offset in range(0, len(item_ids), chunk_size)
+                    for window_start, window_end in self._history_windows(time_from, time_till)]
+
+        client = self._async_client()
+        if client is not None:
+            # Janelas pedidas em simultâneo no loop assíncrono, entregues pela ordem.
+            yield from self._iter_async(
+                lambda chunk=chunk, start=start, end=end: self._history_window_async(
+                    client, chunk, history_type, start, end, page_limit)
+                for chunk, start, end in calls)
+            return
+        for chunk, window_start, window_end in calls:
+            yield from self._iter_history_window(chunk, history_type, window_start, window_end, page_limit)
+
+    def _async_client(self):
+        """Cliente assíncrono do serviço, se a plataforma o tiver e os clientes assíncronos estiverem ativos."""
+        if self.low_memory:
+            return None  # em fluxo, uma janela de cada vez
+        factory = getattr(self.service, 'async_client', None)
+        return factory() if factory else None
+
+    def _iter_async(self, factories):
+        """
+        Executa os geradores assíncronos (um por janela) no loop partilhado
+        (`app.async_runtime`), com até ZABBIX_ASYNC_PREFETCH janelas em curso, e
+        gera as linhas de cada página, pela ordem, em lotes de
+        ZABBIX_STREAM_BATCH_ROWS. Cada janela só pede a página seguinte depois de
+        a anterior ser consumida (no máximo 2 páginas em memória por janela).
+        """
+        from ..async_runtime import iter_ordered_streams
+        prefetch = max(1, int(current_app.config.get('ZABBIX_ASYNC_PREFETCH', 8)))
+        batch_rows = max(1, int(current_app.config.get('ZABBIX_STREAM_BATCH_ROWS', 10000)))
+        for rows in iter_ordered_streams(factories, prefetch, buffer=1):
+            for offset in range(0, len(rows), batch_rows):
+                yield rows[offset:offset + batch_rows]
+
+    async def _history_window_async(self, client, item_ids, history_type, time_from, time_till, limit):
+        """Mesma paginação por cursor de `_iter_history_window`; gera as linhas de cada página."""
+        seen_at_cursor = set()
+        while True:
+            page = await client.get('history.get', {
+                'output': 'extend',
+                'history': history_type,
+                'itemids': item_ids,
+                'time_from': time_from,
+                'time_till': time_till,
+                'sortfield': 'clock',
+                'sortorder': 'ASC',
+                'limit': limit
+            }) or []
+            rows = [row for row in page if int(row['clock']) != time_from or _row_key(row) not in seen_at_cursor]
+            if rows:
+                yield rows
+            if len(page) < limit:
+                return
+
+            last_clock = int(page[-1]['clock'])
+            if last_clock == time_from:
+                seen_at_cursor.update(_row_key(row) for row in page)
+                limit *= 2
+                continue
+            seen_at_cursor = {_row_key(row) for row in page if int(row['clock']) == last_clock}
+            time_from = last_clock
+
+    def _iter_history_window(self, item_ids, history_type, time_from, time_till, limit):
+        """
+        Pagina uma janela de tempo usando o 'clock' do último registo como cursor.
+        Cada página do Zabbix é lida em fluxo (`iter_result`) e entregue em lotes
+        de ZABBIX_STREAM_BATCH_ROWS linhas, sem esperar pela resposta completa.
+        """
+        batch_rows = max(1, int(current_app.config.get('ZABBIX_STREAM_BATCH_ROWS', 10000)))
+        seen_at_cursor = set()
+        while True:
+            rows_seen, last_clock, at_last_clock, batch = 0, None, set(), []
+            for row in self.service.iter_result('history.get', {
+                'output': 'extend',
+                'history': history_type,
+                'itemids': item_ids,
+                'time_from': time_from,
+                'time_till': time_till,
+                'sortfield': 'clock',
+                'sortorder': 'ASC',
+                'limit': limit
+            }):
+                rows_seen += 1
+                clock = int(row['clock'])
+                if clock != last_clock:
+                    last_clock, at_last_clock = clock, set()
+                key = _row_key(row)
+                at_last_clock.add(key)
+                # Registos no segundo do cursor podem já ter vindo na página anterior.
+                if clock == time_from and key in seen_at_cursor:
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            if rows_seen < limit:
+                return
+
+            if last_clock == time_from:
+                # Página inteira no mesmo segundo: o cursor não avança, alarga a página.
+                seen_at_cursor.update(at_last_clock)
+                limit *= 2
+                continue
+            seen_at_cursor = at_last_clock
+            time_from = last_clock
+
+    def _resolve_source(self, items):
+        """
+        Escolhe entre 'trends' (agregados horários) e 'history' (dados brutos).
+
+        Os trends são usados quando o período é longo (TRENDS_MIN_PERIOD_SECONDS),
+        os itens são numéricos, a sua recolha é mais frequente do que a hora
+        (senão não há ganho) e o coletor aceita resolução horária. A estimativa
+        prévia pode impor a fonte (`source_override`).
+        """
+        if self.source_override:
+            return self.source_override
+        if self.REQUIRED_RESOLUTION is not None and self.REQUIRED_RESOLUTION < TREND_PERIOD:
+            return 'history'
+        if not self.start_time or not self.end_time or not items:
+            return 'history'
+
+        min_period = current_app.config.get('TRENDS_MIN_PERIOD_SECONDS', 3 * 86400)
+        if self.end_time - self.start_time < min_period:
+            return 'history'
+        if any(str(item.get('value_type', '0')) not in NUMERIC_VALUE_TYPES for item in items):
+            return 'history'
+
+        intervals = sorted(i for i in (parse_interval(item.get('delay')) for item in items) if i)
+        if intervals and intervals[len(intervals) // 2] >= TREND_PERIOD:
+            return 'history'
+        return 'trends'
+
+    def _iter_series(self, items, source=None):
+        """
+        Gera páginas normalizadas de dados para os itens, vindas de trends ou de
+        histórico conforme `_resolve_source` (ou a `source` indicada). Todas as
+        linhas têm 'itemid', 'clock', 'value' e 'num' (amostras representadas);
+        as de trends trazem também 'value_min' e 'value_max'. Assim a agregação
+        é igual nos dois casos.
+        """
+        source = source or self._resolve_source(items)
+        by_value_type = {}
+        for item in items:
+            by_value_type.setdefault(str(item.get('value_type', '0')), []).append(item['itemid'])
+
+        if source == 'trends':
+            item_ids = [item_id for ids in by_value_type.values() for item_id in ids]
+            for page in self._iter_trends(item_ids):
+                for row in page:
+                    row['value'] = row['value_avg']
+                yield page
+            return
+
+        for value_type, item_ids in by_value_type.items():
+            for page in self._iter_history(item_ids, int(value_type)):
+                for row in page:
+                    row['num'] = 1
+                yield page
+
+    def _series_frames(self, items, host_map):
+        """
+        Páginas tipadas da série dos itens (ver `_iter_series_frames`). Com um
+        plano partilhado, a recolha é feita uma única vez para todos os módulos.
+        É este o ponto de entrada que os coletores devem usar.
+        """
+        if self.fetch_plan is not None:
+            return self.fetch_plan.iter_frames(self, items, host_map)
+        return self._iter_series_frames(items, host_map)
+
+    def _iter_series_frames(self, items, host_map, source=None):
+        """
+        Igual a `_iter_series`, mas cada página chega como DataFrame tipado:
+        itemid int64, clock uint32, value float32, num uint32 e 'host' categórico
+        (ver `ingestion`).
+        """
+        # pandas/numpy só são carregados aqui: o processo web importa os coletores
+        # apenas pelos metadados (validação de módulos) e nunca chega a coletar.
+        from .ingestion import HostLabeler, page_to_frame
+        labeler = HostLabeler(items, host_map)
+        for page in self._iter_series(items, source):
+            frame = page_to_frame(page, labeler)
+            if not frame.empty:
+                yield frame
+
+    def _load_series_frame(self, items, host_map):
+        """Carrega a série completa num único DataFrame compacto."""
+        from .ingestion import HostLabeler, concat_frames
+        return concat_frames(self._series_frames(items, host_map), HostLabeler(items, host_map))
+
+    def _iter_trends(self, item_ids):
+        """Gera os trends horários dos itens, usando a cache local quando ativa."""
+        self._check_period()
+        item_ids = list(item_ids)
+        cache = self._history_cache()
+        if cache:
+            yield from self._iter_cached(cache, 'trends', item_ids, self._fetch_trends)
+        else:
+            yield from self._fetch_trends(item_ids, self.start_time, self.end_time)
+
+    def _fetch_trends(self, item_ids, time_from, time_till):
+        """Pede os trends ao Zabbix em blocos de itens e janelas de tempo, lidos em fluxo."""
+        chunk_size = max(1, int(current_app.config.get('HISTORY_ITEM_CHUNK', 100)))
+        batch_rows = max(1, int(current_app.config.get('ZABBIX_STREAM_BATCH_ROWS', 10000)))
+        calls = [{
+            'output': ['itemid', 'clock', 'num', 'value_min', 'value_avg', 'value_max'],
+            'itemids': item_ids[offset:offset + chunk_size],
+            'time_from': window_start,
+            'time_till': window_end
+        } for offset in range(0, len(item_ids), chunk_size)
+          for window_start, window_end in self._history_windows(time_from, time_till, 'TRENDS_WINDOW_SECONDS', 30 * 86400)]
+
+        client = self._async_client()
+        if client is not None:
+            yield from self._iter_async(self._trends_async(client, params) for params in calls)
+            return
+        for params in calls:
+            batch = []
+            for row in self.service.iter_result('trend.get', params):
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    @staticmethod
+    def _trends_async(client, params):
+        """Fábrica do gerador assíncrono de uma janela de trends (para `_iter_async`)."""
+        async def fetch():
+            rows = await client.get('trend.get', params)
+            if rows:
+                yield rows
+        return fetch
+
+    def _get_history(self, item_ids, history_type):
+        """Função de ajuda para buscar o histórico de itens (lista completa)."""
+        return [row for page in self._iter_history(item_ids, history_type) for row in page]
+
+def _row_key(row):
+    """Identifica um registo de histórico de forma única."""
+    return (row['itemid'], row['clock'], row.get('ns'))
@@ -1,12 +1,26 @@
 # ==== AURA_V2/app/collectors/cpu_collector.py ====
 
 from .base_collector import BaseCollector
-import pandas as pd
 
 class CpuCollector(BaseCollector):
     """Coletor para dados de utilização de CPU."""
     platform = 'Zabbix'
     CPU_KEYS = ['system.cpu.util', 'hrProcessorLoad']
+    CAPABILITY_KEYS = CPU_KEYS
+    ITEM_KEYS = CPU_KEYS
+    # Médias por host: agregados horários são suficientes. Em períodos longos
+    # (trends), os percentis são calculados sobre as médias horárias.
+    REQUIRED_RESOLUTION = 3600
+    # Intervalos do histograma de 0 a 100% (resolução dos percentis: 0,1 p.p.).
+    HISTOGRAM_BINS = 1000
+
+    @classmethod
+    def support_probe(cls, host_ids):
+        """Chamada que procura pelo menos um item de CPU nos hosts selecionados."""
+        return ('item.get', {
+            'output': ['itemid'], 'hostids': host_ids,
+            'search': {'key_': cls.CPU_KEYS}, 'searchByAny': True, 'limit': 1
+        })
 
     @classmethod
     def is_supported(cls, platform_service, host_ids):
@@ -15,51 +29,46 @@ class CpuCollector(BaseCollector):
             return False
         
         try:
-            cpu_items = platform_service.get('item.get', {
-                'output': ['itemid'], 'hostids': host_ids,
-                'search': {'key_': cls.CPU_KEYS}, 'searchByAny': True, 'limit': 1
-            })
-            return bool(cpu_items)
+            method, params = cls.support_probe(host_ids)
+            return cls.is_supported_from_result(platform_service.get(method, params))
         except Exception as e:
             print(f"Erro ao verificar suporte para CpuCollector: {e}")
             return False
 
     def fetch_data(self):
         """Busca dados do Zabbix, processa com Pandas e gera um gráfico."""
-        cpu_items = self.service.get('item.get', {
-            'output': ['itemid', 'hostid'], 'hostids': self.host_ids,
-            'search': {'key_': self.CPU_KEYS}, 'searchByAny': True
-        })
-        if not cpu_items: return None
-
-        item_ids = [item['itemid'] for item in cpu_items]
-        history = self._get_history(item_ids, history_type=0) # 0 para valores numéricos (float)
-        if not history: return None
+        import pandas as pd
+        from .aggregation import HostAggregator
 
-        # Transformação de dados com Pandas
-        df = pd.DataFrame(history)
-        df['value'] = pd.to_numeric(df['value'], errors='coerce').astype(float)
-        df.dropna(subset=['value'], inplace=True)
-        if df.empty: return None
+        cpu_items, host_map = self._get_items_and_hosts(self.CPU_KEYS)
+        if not cpu_items: return None
 
-        # Mapeamento de IDs para nomes
-        host_map = {host['hostid']: host['name'] for host in self.service.get('host.get', {'output': ['hostid', 'name'], 'hostids': self.host_ids})}
-        item_map = {item['itemid']: host_map.get(item['hostid']) for item in cpu_items}
-        df['host'] = df['itemid'].map(item_map)
+        # Agregação em fluxo, página a página: por host só ficam contagem, soma,
+        # extremos e um histograma (para os percentis). Trends ou histórico, cada
+        # linha pesa pelo número de amostras que representa ('num').
+        aggregator = HostAggregator(low=0.0, high=100.0, bins=self.HISTOGRAM_BINS)
+        for frame in self._series_frames(cpu_items, host_map):
+            aggregator.add_frame(frame)
+        per_host = aggregator.to_frame(percentiles=(95, 99))
+        if per_host.empty: return None
 
-        # Agregação dos dados: calcular a média de uso de CPU por host
-        avg_cpu_usage = df.groupby('host')['value'].mean().reset_index()
-        avg_cpu_usage.rename(columns={'value': 'avg_usage'}, inplace=True)
-        avg_cpu_usage['avg_usage'] = avg_cpu_usage['avg_usage'].round(2)
+        avg_cpu_usage = pd.DataFrame({
+            'host': per_host['host'].astype(str),
+            'avg_usage': per_host['mean'],
+            'min_usage': per_host['min'],
+            'max_usage': per_host['max'],
+            'p95_usage': per_host['p95'],
+            'p99_usage': per_host['p99'],
+        }).round(2)
 
         # Geração do gráfico
-        chart_path = self.charting.generate_bar_chart(
-            df=avg_cpu_usage, x='host', y='avg_usage',
+        chart = self.charting.generate_bar_chart(
+            df=avg_cpu_usage[['host', 'avg_usage']], x='host', y='avg_usage',
             title='Média de Utilização de CPU (%) por Host',
             xlabel='Host', ylabel='Uso Médio de CPU (%)'
         )
 
         return {
             'table_html': avg_cpu_usage.to_html(classes='table table-striped', index=False, border=0),
-            'chart_path': chart_path
+            'chart': chart
         }
\ No newline at end of file
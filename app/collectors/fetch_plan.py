@@ -0,0 +1,222 @@
+# ==== AURA_V2/app/collectors/fetch_plan.py ====
+
+import contextvars
+import queue
+import threading
+
+# Páginas à espera em cada coletor que partilha uma série: a memória da partilha
+# fica limitada a consumidores x páginas, independente do tamanho da série.
+QUEUE_PAGES = 2
+_END = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+class _SharedSeries:
+    """
+    Série de uma fonte ('history' ou 'trends') partilhada por vários coletores:
+    uma única recolha (numa thread própria) entrega cada página, já filtrada,
+    na fila de cada coletor ainda ativo.
+    """
+    def __init__(self):
+        self.consumers = {}   # id(coletor) -> itens do coletor
+        self.queues = {}      # id(coletor) -> fila de páginas
+        self.released = set()
+        self.producer = None
+        self.lock = threading.Lock()
+
+    def active(self):
+        with self.lock:
+            return [key for key in self.consumers if key not in self.released]
+
+    def release(self, key):
+        """O coletor deixou de consumir (terminou ou falhou): a recolha deixa de lhe entregar páginas."""
+        with self.lock:
+            if key not in self.consumers or key in self.released:
+                return
+            self.released.add(key)
+        pending = self.queues[key]
+        while True:
+            try:
+                pending.get_nowait()  # desbloqueia a recolha, se estiver à espera desta fila
+            except queue.Empty:
+                break
+
+    def put(self, key, item):
+        """Entrega à fila do coletor, à espera enquanto estiver cheia (e o coletor ativo)."""
+        while True:
+            with self.lock:
+                if key in self.released:
+                    return
+            try:
+                self.queues[key].put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+class FetchPlan:
+    """
+    Plano de recolha partilhado pelos módulos Zabbix de um relatório.
+
+    Antes de os módulos correrem, o ReportGenerator regista cada coletor
+    (`register`). O plano junta as chaves de item de todos e faz um único
+    pedido em lote (item.get + host.get) para a lista de hosts; cada coletor
+    recebe depois só os seus itens (`items_for`). As séries seguem o mesmo
+    princípio: coletores que usam a mesma fonte (histórico ou trends) são
+    servidos por uma única recolha dos itens de todos.
+
+    Com um único coletor por fonte, a série passa em fluxo, página a página,
+    como antes. Com partilha, a recolha corre numa thread própria e cada página
+    tipada é repartida pelos coletores (filas de QUEUE_PAGES páginas), pelo que
+    a memória também não cresce com o número de amostras. Cada coletor liberta
+    a sua parte quando termina ou falha (`release`); `close` liberta tudo.
+    """
+    ITEM_OUTPUT = ['itemid', 'hostid', 'key_', 'delay', 'value_type']
+
+    def __init__(self, service, host_ids):
+        self.service = service
+        self.host_ids = list(host_ids)
+        self.keys = []
+        self._items = None
+        self._host_map = None
+        self._series = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        # Desligado em modo de pouca memória: cada coletor lê a sua série em fluxo.
+        self.share_series = True
+
+    # --- Metadados ---
+    def add_keys(self, keys):
+        """Junta chaves ao plano (antes de os metadados serem pedidos)."""
+        if self._items is not None:
+            raise RuntimeError("Os metadados do plano já foram obtidos.")
+        self.keys = sorted(set(self.keys) | set(keys))
+
+    def _load_metadata(self):
+        with self._lock:
+            if self._items is not None:
+                return
+            if not self.keys or not self.host_ids:
+                self._items, self._host_map = [], {}
+                return
+            # Itens (de todos os módulos) e hosts seguem no mesmo pedido HTTP.
+            items, hosts = self.service.batch([
+                ('item.get', {'output': self.ITEM_OUTPUT, 'hostids': self.host_ids,
+                              'search': {'key_': self.keys}, 'searchByAny': True}),
+                ('host.get', {'output': ['hostid', 'name'], 'hostids': self.host_ids}),
+            ])
+            self._host_map = {host['hostid']: host['name'] for host in hosts or []}
+            self._items = items or []
+
+    def items_for(self, keys):
+        """Itens do plano cuja chave contém alguma das indicadas (mesma regra do 'search' do Zabbix)."""
+        self._load_metadata()
+        return [item for item in self._items if any(key in item.get('key_', '') for key in keys)]
+
+    def host_map(self):
+        self._load_metadata()
+        return self._host_map
+
+    # --- Séries ---
+    def register(self, collector):
+        """Regista um coletor (ainda na thread principal) e a fonte de dados que vai usar."""
+        items = self.items_for(collector.ITEM_KEYS)
+        source = collector._resolve_source(items)
+        with self._lock:
+            shared = self._series.setdefault(source, _SharedSeries())
+            shared.consumers[id(collector)] = items
+            shared.queues[id(collector)] = queue.Queue(QUEUE_PAGES)
+            self._sources[id(collector)] = source
+
+    def shared_consumers(self):
+        """Número de coletores que recebem uma série partilhada (têm de correr em simultâneo)."""
+        if not self.share_series:
+            return 0
+        with self._lock:
+            return sum(len(shared.consumers) for shared in self._series.values() if len(shared.consumers) > 1)
+
+    def release(self, collector):
+        """O coletor terminou (ou falhou, mesmo antes de ler a série): deixa de receber páginas."""
+        shared = self._series.get(self._sources.get(id(collector)))
+        if shared is not None:
+            shared.release(id(collector))
+
+    def close(self):
+        """Liberta todos os coletores e espera pelo fim das recolhas partilhadas (fim do relatório)."""
+        for shared in list(self._series.values()):
+            for key in list(shared.consumers):
+                shared.release(key)
+            if shared.producer is not None:
+                shared.producer.join()
+
+    def iter_frames(self, collector, items, host_map):
+        """Páginas tipadas dos `items` do coletor, recolhidas uma única vez por fonte."""
+        source = self._sources.get(id(collector))
+        shared = self._series.get(source)
+        try:
+            if shared is None or len(shared.consumers) == 1 or not self.share_series:
+                yield from collector._iter_series_frames(items, host_map, source)
+                return
+
+            with shared.lock:
+                if shared.producer is None:
+                    # A thread herda o contexto (aplicação Flask e relatório em medição).
+                    shared.producer = threading.Thread(
+                        target=contextvars.copy_context().run, args=(self._produce, shared, collector, source),
+                        name='fetch-plan', daemon=True)
+                    shared.producer.start()
+            pending = shared.queues[id(collector)]
+            while True:
+                item = pending.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self.release(collector)
+
+    def _produce(self, shared, collector, source):
+        """Recolhe a série de todos os coletores da fonte e reparte cada página pelos que estão ativos."""
+        wanted = {key: [int(item['itemid']) for item in consumer] for key, consumer in shared.consumers.items()}
+        union = {item['itemid']: item for consumer in shared.consumers.values() for item in consumer}
+        end = _END
+        try:
+            for frame in collector._iter_series_frames(list(union.values()), self.host_map(), source):
+                active = shared.active()
+                if not active:
+                    break  # ninguém está a consumir: pára a recolha
+                for key in active:
+                    selected = frame[frame['itemid'].isin(wanted[key])]
+                    if not selected.empty:
+                        shared.put(key, selected)
+        except Exception as e:
+            end = _Failure(e)
+        for key in shared.active():
+            shared.put(key, end)
+
+def create_collectors(module_keys, platform_services, charting, report_config):
+    """
+    Cria os coletores dos módulos e, por plataforma, um plano de recolha
+    partilhado com as chaves de todos (os metadados ainda não são pedidos).
+    Módulos cuja plataforma não tem serviço ficam de fora.
+    """
+    from . import AVAILABLE_COLLECTORS
+
+    collectors, plans = {}, {}
+    for module_key in module_keys:
+        CollectorClass = AVAILABLE_COLLECTORS[module_key]['class']
+        required_platform = CollectorClass.platform
+        platform_service = platform_services.get(required_platform)
+        print(f"[DEBUG] A processar módulo: '{module_key}' (requer plataforma: '{required_platform}')")
+        if not platform_service:
+            print(f"[DEBUG] ERRO: Serviço para a plataforma '{required_platform}' não foi encontrado ou falhou na inicialização.")
+            continue
+
+        plan = None
+        if CollectorClass.ITEM_KEYS and hasattr(platform_service, 'batch'):
+            plan = plans.setdefault(required_platform, FetchPlan(platform_service, report_config.get('hosts', [])))
+            plan.add_keys(CollectorClass.ITEM_KEYS)
+        collectors[module_key] = CollectorClass(platform_service, charting, report_config, fetch_plan=plan)
+    return collectors
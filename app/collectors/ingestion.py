@@ -0,0 +1,77 @@
+# ==== AURA_V2/app/collectors/ingestion.py ====
+
+import numpy as np
+import pandas as pd
+
+# Tipos das colunas entregues aos coletores.
+COLUMN_DTYPES = {
+    'itemid': np.int64,
+    'clock': np.uint32,
+    'value': np.float32,
+    'num': np.uint32,
+    'value_min': np.float32,
+    'value_max': np.float32,
+}
+
+class HostLabeler:
+    """
+    Converte itemids (inteiros) em rótulos categóricos de host, com uma pesquisa
+    vetorizada (searchsorted) em vez de dicionários Python linha a linha.
+    """
+    def __init__(self, items, host_map):
+        categories = sorted({name for name in host_map.values() if name is not None})
+        position = {name: code for code, name in enumerate(categories)}
+        pairs = sorted((int(item['itemid']), position.get(host_map.get(item['hostid']), -1)) for item in items)
+        self.categories = categories
+        self.item_ids = np.array([item_id for item_id, _ in pairs], dtype=np.int64)
+        self.codes = np.array([code for _, code in pairs], dtype=np.int32)
+
+    def label(self, item_ids):
+        """Devolve um pd.Categorical com o host de cada itemid (NaN se desconhecido)."""
+        if not len(self.item_ids):
+            return pd.Categorical.from_codes(np.full(len(item_ids), -1, dtype=np.int32), categories=self.categories)
+        index = np.searchsorted(self.item_ids, item_ids).clip(0, len(self.item_ids) - 1)
+        codes = np.where(self.item_ids[index] == item_ids, self.codes[index], -1)
+        return pd.Categorical.from_codes(codes, categories=self.categories)
+
+def page_to_columns(page):
+    """
+    Converte uma página de histórico/trends (lista de dicts, normalmente com
+    strings) em colunas numpy tipadas. As colunas opcionais só aparecem se
+    existirem na página.
+    """
+    columns = {
+        'itemid': np.array([row['itemid'] for row in page]).astype(np.int64),
+        'clock': np.array([row['clock'] for row in page]).astype(np.uint32),
+        'value': np.array([row.get('value') for row in page], dtype=np.float32),
+    }
+    first = page[0] if page else {}
+    columns['num'] = (np.array([row.get('num') or 1 for row in page]).astype(np.uint32)
+                      if 'num' in first else np.ones(len(page), dtype=np.uint32))
+    for name in ('value_min', 'value_max'):
+        if name in first:
+            columns[name] = np.array([row.get(name) for row in page], dtype=np.float32)
+    return columns
+
+def page_to_frame(page, labeler=None):
+    """Página -> DataFrame tipado (itemid int64, clock uint32, value float32, host categórico)."""
+    frame = pd.DataFrame(page_to_columns(page), copy=False)
+    frame.dropna(subset=['value'], inplace=True)
+    if labeler is not None:
+        frame['host'] = labeler.label(frame['itemid'].to_numpy())
+    return frame
+
+def empty_frame(labeler=None):
+    """DataFrame vazio com o mesmo esquema das páginas."""
+    frame = pd.DataFrame({name: np.array([], dtype=dtype) for name, dtype in COLUMN_DTYPES.items()
+                          if name not in ('value_min', 'value_max')})
+    if labeler is not None:
+        frame['host'] = pd.Categorical([], categories=labeler.categories)
+    return frame
+
+def concat_frames(frames, labeler=None):
+    """Junta páginas tipadas num único DataFrame, preservando os tipos compactos."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_frame(labeler)
+    return pd.concat(frames, ignore_index=True, copy=False)
@@ -0,0 +1,71 @@
+# ==== AURA_V2/app/collectors/ticket_collector.py ====
+
+from .base_collector import BaseCollector
+from ..metrics import span
+
+class TicketCollector(BaseCollector):
+    """Coletor de volume e SLA dos tickets do Softdesk."""
+    platform = 'Softdesk'
+    # Categorias mostradas no gráfico (as restantes ficam de fora).
+    CHART_CATEGORIES = 15
+
+    @classmethod
+    def is_supported(cls, platform_service, host_ids):
+        """Os tickets são do cliente e não dos hosts: basta o cliente ter uma fonte Softdesk."""
+        return platform_service is not None
+
+    def fetch_data(self):
+        """Sincroniza os tickets, calcula os agregados com Pandas e gera um gráfico."""
+        import pandas as pd
+
+        self._check_period()
+        with span('softdesk_sync'):
+            tickets = self.service.tickets_between(self.start_time, self.end_time)
+        if not tickets: return None
+
+        df = pd.DataFrame(tickets, columns=['priority', 'category', 'created_ts', 'closed_ts', 'due_at'])
+        created = df['created_ts'].astype('float64')
+        closed = df['closed_ts'].astype('float64')
+        due = pd.to_datetime(df['due_at'], utc=True, errors='coerce')
+        due = (due - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+
+        # Indicadores por ticket, calculados em bloco sobre as colunas.
+        df['opened'] = created.ge(self.start_time) & created.lt(self.end_time)
+        df['resolved'] = closed.ge(self.start_time) & closed.lt(self.end_time)
+        df['backlog'] = closed.isna() | closed.ge(self.end_time)
+        df['sla_applicable'] = df['resolved'] & due.notna()
+        df['sla_met'] = df['sla_applicable'] & closed.le(due)
+        df['resolution_hours'] = ((closed - created) / 3600).where(df['resolved'])
+
+        columns = {'opened': 'sum', 'resolved': 'sum', 'backlog': 'sum', 'sla_applicable': 'sum',
+                   'sla_met': 'sum', 'resolution_hours': 'mean'}
+        by_priority = df.groupby('priority', sort=True).agg(columns)
+        total = df.agg(columns).to_frame('Total').T
+        summary = pd.concat([by_priority, total])
+        summary['sla_pct'] = (100 * summary['sla_met'] / summary['sla_applicable'].where(summary['sla_applicable'] > 0))
+
+        table = pd.DataFrame({
+            'prioridade': summary.index.astype(str),
+            'abertos': summary['opened'].astype(int),
+            'resolvidos': summary['resolved'].astype(int),
+            'em_aberto_no_fim': summary['backlog'].astype(int),
+            'sla_cumprido_pct': summary['sla_pct'].astype(float),
+            'tempo_medio_resolucao_h': summary['resolution_hours'].astype(float),
+        }).round(1)
+
+        # Geração do gráfico: tickets abertos no período por categoria.
+        by_category = (df[df['opened']].groupby('category').size()
+                       .sort_values(ascending=False).head(self.CHART_CATEGORIES)
+                       .rename('tickets').reset_index())
+        chart = self.charting.generate_bar_chart(
+            df=by_category, x='category', y='tickets',
+            title='Tickets Abertos por Categoria',
+            xlabel='Categoria', ylabel='Tickets'
+        )
+
+        return {
+            'table_html': table.to_html(classes='table table-striped', index=False, border=0, na_rep='-'),
+            'chart': chart,
+            'opened': int(df['opened'].sum()),
+            'resolved': int(df['resolved'].sum()),
+        }
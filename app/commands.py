@@ -0,0 +1,142 @@
+# ==== AURA_V2/app/commands.py ====
+
+import json
+import time
+from datetime import date
+import click
+
+def register_commands(app):
+    """Regista os comandos 'flask ...' da aplicação."""
+
+    @app.cli.command('report-worker')
+    @click.option('--poll-interval', default=2.0, show_default=True, help='Segundos entre consultas à fila.')
+    @click.option('--once', is_flag=True, help='Processa a fila atual e termina.')
+    def report_worker(poll_interval, once):
+        """Processa a fila de relatórios em segundo plano."""
+        from .report_worker import run_worker
+        from .render_pool import shutdown_render_pool
+        try:
+            run_worker(poll_interval=poll_interval, once=once)
+        except KeyboardInterrupt:
+            click.echo('Worker interrompido.')
+        finally:
+            shutdown_render_pool()
+
+    @app.cli.command('sweep-artifacts')
+    def sweep_artifacts_command():
+        """Aplica a retenção ao armazém de relatórios e remove temporários abandonados."""
+        from .report_worker import sweep_artifacts
+        removed = sweep_artifacts()
+        click.echo(f"Removidos: {removed['temp']} temporário(s), {removed['expired']} expirado(s), "
+                   f"{removed['size']} por limite de espaço.")
+
+    @app.cli.command('report-definition-add')
+    @click.argument('name')
+    @click.option('--modules', required=True, help='Módulos, separados por vírgulas (ex.: cpu).')
+    @click.option('--period', type=click.Choice(['previous_month', 'last_7_days', 'last_30_days']),
+                  default='previous_month', show_default=True)
+    @click.option('--host-group', 'host_groups', multiple=True, help='Limita aos hosts destes grupos (nome).')
+    @click.option('--report-name', help='Título dos relatórios (por omissão, o nome da definição).')
+    @click.option('--run-day', type=click.IntRange(1, 28), help='Dia do mês em que o agendador gera o lote.')
+    def report_definition_add(name, modules, period, host_groups, report_name, run_day):
+        """Guarda uma definição de relatório para geração em lote."""
+        from . import db
+        from .models import ReportDefinition
+        from .collectors import AVAILABLE_COLLECTORS
+        module_keys = [key.strip() for key in modules.split(',') if key.strip()]
+        unknown = [key for key in module_keys if key not in AVAILABLE_COLLECTORS]
+        if unknown:
+            raise click.BadParameter(f"Módulos desconhecidos: {', '.join(unknown)}.", param_hint='--modules')
+        definition = ReportDefinition.query.filter_by(name=name).first() or ReportDefinition(name=name)
+        definition.period = period
+        definition.run_day = run_day
+        definition.set_config({'modules': module_keys, 'layout_order': module_keys,
+                               'host_groups': list(host_groups), 'report_name': report_name or name})
+        db.session.add(definition)
+        db.session.commit()
+        click.echo(f"Definição '{name}' guardada (id {definition.id}).")
+
+    @app.cli.command('report-definitions')
+    def report_definitions():
+        """Lista as definições de relatório e o último lote de cada uma."""
+        from .models import ReportDefinition, ReportBatch
+        for definition in ReportDefinition.query.order_by(ReportDefinition.name):
+            last = definition.batches.order_by(ReportBatch.created_at.desc()).first()
+            schedule = f"dia {definition.run_day}" if definition.run_day else 'manual'
+            status = (f"último lote: {last.period_start} a {last.period_end} ({last.status})" if last else 'sem lotes')
+            click.echo(f"{definition.name}: {definition.period}, {schedule}, "
+                       f"módulos {', '.join(definition.get_config().get('modules', []))}; {status}")
+
+    @app.cli.command('batch-run')
+    @click.argument('definition_name')
+    @click.option('--client', 'client_names', multiple=True, help='Só estes clientes (por omissão, todos com Zabbix).')
+    @click.option('--start', 'period_start', type=click.DateTime(['%Y-%m-%d']), help='Início do período (substitui o relativo).')
+    @click.option('--end', 'period_end', type=click.DateTime(['%Y-%m-%d']), help='Fim (exclusivo) do período.')
+    @click.option('--workers', type=int, help='Relatórios em simultâneo (BATCH_MAX_WORKERS).')
+    @click.option('--per-server', type=int, help='Relatórios em simultâneo por servidor Zabbix (BATCH_MAX_PER_SERVER).')
+    @click.option('--retry-failed', is_flag=True, help='Ao retomar um lote, repete também os relatórios falhados.')
+    @click.option('--json', 'as_json', is_flag=True, help='Escreve o resumo em JSON.')
+    def batch_run(definition_name, client_names, period_start, period_end, workers, per_server, retry_failed, as_json):
+        """Gera (ou retoma) o lote de uma definição para vários clientes."""
+        from .models import ReportDefinition
+        from .batch_reports import run_definition, BatchInProgressError
+        from .render_pool import shutdown_render_pool
+        definition = ReportDefinition.query.filter_by(name=definition_name).first()
+        if definition is None:
+            raise click.ClickException(f"Definição '{definition_name}' não encontrada.")
+        if bool(period_start) != bool(period_end):
+            raise click.UsageError('Indique --start e --end em conjunto.')
+        try:
+            summary = run_definition(definition, client_names or None,
+                                     period_start.date() if period_start else None,
+                                     period_end.date() if period_end else None,
+                                     workers, per_server, retry_failed)
+        except (BatchInProgressError, ValueError) as e:
+            raise click.ClickException(str(e))
+        finally:
+            shutdown_render_pool()
+        _echo_summary(summary, as_json)
+        if summary['counts'].get('failed'):
+            raise SystemExit(1)
+
+    @app.cli.command('batch-scheduler')
+    @click.option('--interval', default=3600, show_default=True, help='Segundos entre verificações.')
+    @click.option('--once', is_flag=True, help='Executa os lotes devidos hoje e termina (para o cron).')
+    def batch_scheduler(interval, once):
+        """Executa os lotes das definições agendadas para o dia de hoje."""
+        from .batch_reports import due_definitions, run_definition, BatchInProgressError
+        from .render_pool import shutdown_render_pool
+        from . import db
+        try:
+            while True:
+                for definition in due_definitions():
+                    click.echo(f"A gerar o lote de '{definition.name}'...")
+                    try:
+                        _echo_summary(run_definition(definition), False)
+                    except BatchInProgressError as e:
+                        click.echo(str(e))
+                if once:
+                    return
+                db.session.remove()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            click.echo('Agendador interrompido.')
+        finally:
+            shutdown_render_pool()
+
+def _echo_summary(summary, as_json):
+    """Escreve o resumo de um lote (texto ou JSON)."""
+    if as_json:
+        click.echo(json.dumps(summary, indent=2, default=str))
+        return
+    counts = ', '.join(f"{count} {status}" for status, count in sorted(summary['counts'].items()))
+    click.echo(f"Lote {summary['batch_id']} ('{summary['definition']}', {summary['period']}): "
+               f"{summary['total']} relatório(s) - {counts}.")
+    timing = summary['run_seconds']
+    if timing['avg'] is not None:
+        click.echo(f"Tempo por relatório: mín {timing['min']:.1f}s, média {timing['avg']:.1f}s, máx {timing['max']:.1f}s"
+                   + (f"; lote em {summary['wall_seconds']:.1f}s." if summary['wall_seconds'] is not None else '.'))
+    for slow in summary['slowest']:
+        click.echo(f"  {slow['client']}: {slow['seconds']:.1f}s")
+    for failure in summary['failures']:
+        click.echo(f"FALHOU {failure['client']}: {failure['error']}")
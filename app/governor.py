@@ -0,0 +1,186 @@
+# ==== AURA_V2/app/governor.py ====
+
+import random
+import threading
+import time
+import requests
+
+# Respostas HTTP que indicam sobrecarga ou falha passageira do frontend.
+TRANSIENT_STATUS_CODES = {429, 502, 503, 504}
+
+class TransientError(Exception):
+    """Falha passageira (ligação, tempo esgotado, 429/5xx) que pode ser repetida."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def classify(exception):
+    """Converte exceções do `requests` em TransientError quando faz sentido repetir."""
+    if isinstance(exception, TransientError):
+        return exception
+    if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return TransientError(str(exception))
+    response = getattr(exception, 'response', None)
+    if isinstance(exception, requests.exceptions.HTTPError) and response is not None \
+            and response.status_code in TRANSIENT_STATUS_CODES:
+        return TransientError(str(exception), retry_after=_retry_after(response))
+    return None
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+class RequestGovernor:
+    """
+    Controla os pedidos a um servidor (uma instância por fonte de dados).
+
+    - Limita os pedidos em curso a `limit`, ajustado por AIMD: cada pedido
+      rápido e bem-sucedido aumenta o limite em ~1 por "ronda" (1/limit), e um
+      erro ou uma latência acima de `target_latency` reduz o limite para metade.
+      Só os pedidos iniciados depois da última redução contam para a seguinte,
+      para que uma rajada de falhas simultâneas não leve o limite ao mínimo.
+    - Repete falhas passageiras até `max_retries` vezes, com espera exponencial
+      com jitter ("full jitter") ou o Retry-After indicado pelo servidor.
+
+    Os clientes síncronos (`call`) e assíncronos (`call_async`, no loop de
+    `app.async_runtime`) partilham as mesmas vagas e o mesmo limite.
+    """
+    def __init__(self, max_concurrency=8, min_concurrency=1, target_latency=10.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=30.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.target_latency = target_latency
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.retries = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._async_waiters = []
+
+    def acquire(self):
+        """Espera por uma vaga e devolve o instante de início do pedido."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def acquire_async(self):
+        """Como `acquire`, mas espera pela vaga sem bloquear o loop asyncio."""
+        import asyncio
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.monotonic()
+                waiter = asyncio.get_running_loop().create_future()
+                self._async_waiters.append(waiter)
+            await waiter
+
+    def release(self, started, ok):
+        """
+        Liberta a vaga e ajusta o limite conforme o resultado e a latência do
+        pedido (`ok=None`: pedido cancelado, não conta para o ajuste).
+        """
+        latency = time.monotonic() - started
+        with self._condition:
+            self.in_flight -= 1
+            if ok is None:
+                pass
+            elif ok and latency <= self.target_latency:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            elif started >= self._last_decrease:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def backoff(self, attempt, retry_after=None):
+        """Espera antes da repetição `attempt` (0, 1, ...)."""
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_delay(self, error, attempt, on_retry):
+        """
+        Espera antes de repetir o pedido que falhou com `error`. Propaga o erro
+        se não for passageiro ou se as repetições se esgotaram.
+        """
+        transient = classify(error)
+        if transient is None:
+            raise error
+        if attempt >= self.max_retries:
+            raise transient from error
+        delay = self.backoff(attempt, transient.retry_after)
+        with self._condition:
+            self.retries += 1
+        if on_retry:
+            on_retry(attempt + 1, delay, transient)
+        return delay
+
+    def call(self, fn, *args, on_retry=None):
+        """
+        Executa `fn(*args)` dentro do limite, repetindo as falhas passageiras.
+        Outras exceções são propagadas de imediato; esgotadas as repetições,
+        propaga a última TransientError.
+        """
+        attempt = 0
+        while True:
+            started = self.acquire()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self.release(started, ok=False)
+                time.sleep(self._retry_delay(e, attempt, on_retry))
+                attempt += 1
+                continue
+            self.release(started, ok=True)
+            return result
+
+    async def call_async(self, fn, *args, on_retry=None):
+        """Como `call`, para corrotinas: `await fn(*args)` ocupa uma vaga do mesmo limite."""
+        import asyncio
+        attempt = 0
+        while True:
+            started = await self.acquire_async()
+            try:
+                result = await fn(*args)
+            except asyncio.CancelledError:
+                self.release(started, ok=None)
+                raise
+            except Exception as e:
+                self.release(started, ok=False)
+                await asyncio.sleep(self._retry_delay(e, attempt, on_retry))
+                attempt += 1
+                continue
+            self.release(started, ok=True)
+            return result
+
+    def stats(self):
+        with self._condition:
+            return {'limit': round(self.limit, 2), 'in_flight': self.in_flight,
+                    'retries': self.retries, 'decreases': self.decreases}
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+def governor_from_config(config, prefix='ZABBIX'):
+    """Cria um governador com os parâmetros `<prefix>_*` da configuração (ZABBIX_*, SOFTDESK_*...)."""
+    return RequestGovernor(
+        max_concurrency=config.get(f'{prefix}_MAX_CONCURRENCY', 8),
+        min_concurrency=config.get(f'{prefix}_MIN_CONCURRENCY', 1),
+        target_latency=config.get(f'{prefix}_TARGET_LATENCY', 10.0),
+        max_retries=config.get(f'{prefix}_MAX_RETRIES', 3),
+        backoff_base=config.get(f'{prefix}_BACKOFF_BASE', 0.5),
+        backoff_max=config.get(f'{prefix}_BACKOFF_MAX', 30.0),
+    )
@@ -0,0 +1,247 @@
+# ==== AURA_V2/app/history_cache.py ====
+
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app
+from .local_store import connect, instance_file, open_connection, transaction, used_bytes
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS buckets (
+        datasource_id INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        itemid TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        fetched_at REAL NOT NULL,
+        last_access REAL NOT NULL,
+        row_count INTEGER NOT NULL,
+        complete INTEGER NOT NULL,
+        PRIMARY KEY (datasource_id, source, itemid, bucket)
+    )""",
+    """CREATE INDEX IF NOT EXISTS ix_buckets_last_access ON buckets (last_access)""",
+    """CREATE TABLE IF NOT EXISTS samples (
+        datasource_id INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        itemid TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        clock INTEGER NOT NULL,
+        ns INTEGER,
+        value REAL,
+        num INTEGER,
+        value_min REAL,
+        value_max REAL
+    )""",
+    """CREATE INDEX IF NOT EXISTS ix_samples_lookup
+        ON samples (datasource_id, source, itemid, bucket, clock)""",
+)
+
+class HistoryCache:
+    """
+    Cache local (SQLite em 'instance/') do histórico e dos trends do Zabbix.
+
+    Os dados são guardados por item e por balde de tempo (HISTORY_CACHE_BUCKET_SECONDS).
+    Um balde só é considerado completo quando termina antes da janela "recente"
+    (HISTORY_CACHE_RECENT_SECONDS); os baldes recentes ou em falta voltam a ser
+    pedidos ao Zabbix, os restantes são servidos localmente.
+    """
+    def __init__(self, path, bucket_seconds=86400, recent_seconds=3600, max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.recent_seconds = recent_seconds
+        self.max_bytes = max_bytes
+        with connect(self.path) as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def bucket_starts(self, time_from, time_till):
+        """Inícios dos baldes que cobrem o intervalo [time_from, time_till]."""
+        first = time_from // self.bucket_seconds * self.bucket_seconds
+        return list(range(first, time_till + 1, self.bucket_seconds))
+
+    def bucket_bounds(self, bucket, now=None):
+        """Intervalo [início, fim] de um balde, limitado ao instante atual."""
+        now = int(now or time.time())
+        return bucket, min(bucket + self.bucket_seconds - 1, now)
+
+    def missing(self, datasource_id, source, item_ids, buckets):
+        """Devolve {balde: [itemids]} com o que ainda não está completo na cache."""
+        item_ids = list(item_ids)
+        if not item_ids or not buckets:
+            return {}
+        complete = set()
+        with connect(self.path) as connection:
+            for offset in range(0, len(item_ids), 500):
+                chunk = item_ids[offset:offset + 500]
+                rows = connection.execute(
+                    f"""SELECT itemid, bucket FROM buckets
+                        WHERE datasource_id = ? AND source = ? AND complete = 1
+                          AND bucket BETWEEN ? AND ?
+                          AND itemid IN ({','.join('?' * len(chunk))})""",
+                    [datasource_id, source, buckets[0], buckets[-1], *chunk])
+                complete.update((row['itemid'], row['bucket']) for row in rows)
+
+        missing = {}
+        for bucket in buckets:
+            ids = [item_id for item_id in item_ids if (item_id, bucket) not in complete]
+            if ids:
+                missing[bucket] = ids
+        return missing
+
+    @contextmanager
+    def writer(self, datasource_id, source, item_ids, bucket):
+        """
+        Substitui o conteúdo de um balde para os itens indicados. O bloco recebe
+        uma função `add(page)` para gravar as páginas à medida que chegam.
+
+        As páginas ficam numa tabela temporária da ligação (fora da base de
+        dados partilhada), pelo que a recolha no Zabbix não prende o bloqueio de
+        escrita: só no fim o balde é substituído, numa transação curta. Se o
+        bloco falhar, o balde fica como estava.
+        """
+        now = time.time()
+        complete = int(bucket + self.bucket_seconds <= now - self.recent_seconds)
+        counts = dict.fromkeys(item_ids, 0)
+        connection = open_connection(self.path)
+        try:
+            connection.execute('PRAGMA temp_store=FILE')
+            connection.execute(
+                """CREATE TEMP TABLE staging (itemid TEXT NOT NULL, clock INTEGER NOT NULL, ns INTEGER,
+                                              value REAL, num INTEGER, value_min REAL, value_max REAL)""")
+
+            def add(page):
+                with transaction(connection):
+                    connection.executemany(
+                        """INSERT INTO temp.staging (itemid, clock, ns, value, num, value_min, value_max)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        [(str(row['itemid']), int(row['clock']), _to_int(row.get('ns')),
+                          _to_float(row.get('value', row.get('value_avg'))), _to_int(row.get('num')),
+                          _to_float(row.get('value_min')), _to_float(row.get('value_max')))
+                         for row in page])
+                for row in page:
+                    item_id = str(row['itemid'])
+                    counts[item_id] = counts.get(item_id, 0) + 1
+
+            yield add
+
+            # IMMEDIATE: pede o bloqueio de escrita logo no início (espera pela vez
+            # em vez de falhar ao passar de leitura a escrita).
+            with transaction(connection, 'IMMEDIATE'):
+                for offset in range(0, len(item_ids), 500):
+                    chunk = item_ids[offset:offset + 500]
+                    connection.execute(
+                        f"""DELETE FROM samples
+                            WHERE datasource_id = ? AND source = ? AND bucket = ?
+                              AND itemid IN ({','.join('?' * len(chunk))})""",
+                        [datasource_id, source, bucket, *chunk])
+                connection.execute(
+                    """INSERT INTO samples (datasource_id, source, itemid, bucket, clock, ns,
+                                            value, num, value_min, value_max)
+                       SELECT ?, ?, itemid, ?, clock, ns, value, num, value_min, value_max
+                       FROM temp.staging""",
+                    [datasource_id, source, bucket])
+                connection.executemany(
+                    """INSERT OR REPLACE INTO buckets (datasource_id, source, itemid, bucket,
+                                                       fetched_at, last_access, row_count, complete)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [(datasource_id, source, item_id, bucket, now, now, count, complete)
+                     for item_id, count in counts.items()])
+        finally:
+            connection.close()
+
+    def iter_rows(self, datasource_id, source, item_ids, time_from, time_till, page_size=50000):
+        """
+        Gera páginas de linhas (no formato do Zabbix) a partir da cache. A
+        marcação de uso ('last_access') é gravada numa transação curta à parte;
+        as páginas são lidas numa ligação sem transação de escrita, pelo que um
+        consumidor lento não impede as escritas de outros relatórios (em WAL,
+        uma leitura em curso não bloqueia quem escreve).
+        """
+        item_ids = list(item_ids)
+        trends = source == 'trends'
+        buckets = self.bucket_starts(time_from, time_till)
+        for offset in range(0, len(item_ids), 500):
+            chunk = item_ids[offset:offset + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with connect(self.path) as connection:
+                connection.execute(
+                    f"""UPDATE buckets SET last_access = ?
+                        WHERE datasource_id = ? AND source = ? AND bucket BETWEEN ? AND ?
+                          AND itemid IN ({placeholders})""",
+                    [time.time(), datasource_id, source, buckets[0], buckets[-1], *chunk])
+            connection = open_connection(self.path)
+            try:
+                cursor = connection.execute(
+                    f"""SELECT itemid, clock, ns, value, num, value_min, value_max FROM samples
+                        WHERE datasource_id = ? AND source = ? AND itemid IN ({placeholders})
+                          AND bucket BETWEEN ? AND ? AND clock BETWEEN ? AND ?
+                        ORDER BY itemid, clock""",
+                    [datasource_id, source, *chunk, buckets[0], buckets[-1], time_from, time_till])
+                while True:
+                    rows = cursor.fetchmany(page_size)
+                    if not rows:
+                        break
+                    if trends:
+                        yield [{'itemid': row['itemid'], 'clock': row['clock'], 'num': row['num'],
+                                'value_min': row['value_min'], 'value_avg': row['value'],
+                                'value_max': row['value_max']} for row in rows]
+                    else:
+                        yield [{'itemid': row['itemid'], 'clock': row['clock'],
+                                'ns': row['ns'], 'value': row['value']} for row in rows]
+            finally:
+                connection.close()
+
+    def evict(self):
+        """Remove os baldes menos usados até a cache voltar a caber em HISTORY_CACHE_MAX_MB."""
+        removed = 0
+        with connect(self.path) as connection:
+            if used_bytes(connection) <= self.max_bytes:
+                return 0
+            # Liberta um pouco mais do que o limite para não despejar a cada escrita.
+            target = self.max_bytes * 0.9
+            while used_bytes(connection) > target:
+                victims = connection.execute(
+                    """SELECT datasource_id, source, itemid, bucket FROM buckets
+                       ORDER BY last_access LIMIT 200""").fetchall()
+                if not victims:
+                    break
+                for victim in victims:
+                    key = (victim['datasource_id'], victim['source'], victim['itemid'], victim['bucket'])
+                    connection.execute(
+                        """DELETE FROM samples WHERE datasource_id = ? AND source = ?
+                           AND itemid = ? AND bucket = ?""", key)
+                    connection.execute(
+                        """DELETE FROM buckets WHERE datasource_id = ? AND source = ?
+                           AND itemid = ? AND bucket = ?""", key)
+                removed += len(victims)
+        return removed
+
+    def purge(self, datasource_id):
+        """Apaga tudo o que está em cache para uma fonte de dados."""
+        with connect(self.path) as connection:
+            connection.execute('DELETE FROM samples WHERE datasource_id = ?', (datasource_id,))
+            connection.execute('DELETE FROM buckets WHERE datasource_id = ?', (datasource_id,))
+
+def _to_int(value):
+    return int(value) if value not in (None, '') else None
+
+def _to_float(value):
+    return float(value) if value not in (None, '') else None
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_history_cache():
+    """Devolve a cache de histórico da aplicação atual, ou None se estiver desativada."""
+    if not current_app.config.get('HISTORY_CACHE_ENABLED', True):
+        return None
+    path = instance_file(current_app.config.get('HISTORY_CACHE_FILE', 'history_cache.db'))
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = HistoryCache(
+                path,
+                bucket_seconds=current_app.config.get('HISTORY_CACHE_BUCKET_SECONDS', 86400),
+                recent_seconds=current_app.config.get('HISTORY_CACHE_RECENT_SECONDS', 3600),
+                max_bytes=current_app.config.get('HISTORY_CACHE_MAX_MB', 1024) * 1024 * 1024)
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,58 @@
+# ==== AURA_V2/app/json_stream.py ====
+
+import json
+
+# Dependências do requirements.txt; se faltarem, tudo continua a funcionar com o
+# módulo json da biblioteca padrão (decodificando as respostas de uma vez).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+class JsonRpcError(Exception):
+    """Resposta JSON-RPC com o campo 'error' (em `error`, o objeto devolvido)."""
+    def __init__(self, error):
+        super().__init__(error.get('data') or error.get('message') or 'Erro JSON-RPC.')
+        self.error = error
+
+def loads(data):
+    """Decodifica JSON a partir de bytes (orjson, se disponível), sem passar por texto."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def can_stream():
+    """Indica se a decodificação incremental (ijson) está disponível."""
+    return ijson is not None
+
+def iter_rpc_result(stream):
+    """
+    Lê uma resposta JSON-RPC de um ficheiro (ex.: `response.raw`) e gera os
+    elementos da lista 'result' à medida que são decodificados, sem construir a
+    resposta inteira em memória. Se a resposta trouxer 'error', levanta
+    JsonRpcError no fim (uma resposta de erro não tem resultados).
+    """
+    builder, building, error = None, None, None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is None:
+            if prefix == 'result.item' and event == 'start_map':
+                builder, building = ijson.ObjectBuilder(), 'result.item'
+            elif prefix == 'error' and event == 'start_map':
+                builder, building = ijson.ObjectBuilder(), 'error'
+            else:
+                continue
+        builder.event(event, value)
+        # Só o fecho do próprio objeto tem o mesmo prefixo; os aninhados têm prefixos mais longos.
+        if prefix == building and event == 'end_map':
+            if building == 'error':
+                error = builder.value
+            else:
+                yield builder.value
+            builder, building = None, None
+    if error is not None:
+        raise JsonRpcError(error)
@@ -0,0 +1,54 @@
+# ==== AURA_V2/app/local_store.py ====
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from flask import current_app
+
+def instance_file(filename):
+    """Caminho absoluto de um ficheiro dentro da pasta 'instance' da aplicação."""
+    return os.path.join(current_app.instance_path, filename)
+
+def open_connection(path):
+    """
+    Abre uma ligação SQLite (em modo autocommit) a um armazenamento local
+    (caches partilhadas entre threads e processos), com WAL para leituras
+    concorrentes. Quem a abre é responsável por a fechar.
+    """
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+@contextmanager
+def transaction(connection, mode=''):
+    """Transação numa ligação aberta: commit no fim do bloco e rollback em caso de erro."""
+    connection.execute(f'BEGIN {mode}'.strip())
+    try:
+        yield connection
+        connection.execute('COMMIT')
+    except Exception:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+
+@contextmanager
+def connect(path):
+    """
+    Abre uma ligação SQLite a um armazenamento local, numa única transação:
+    commit no fim do bloco e rollback em caso de erro.
+    """
+    connection = open_connection(path)
+    try:
+        with transaction(connection):
+            yield connection
+    finally:
+        connection.close()
+
+def used_bytes(connection):
+    """Espaço efetivamente ocupado pela base de dados (exclui páginas livres)."""
+    page_count = connection.execute('PRAGMA page_count').fetchone()[0]
+    free_pages = connection.execute('PRAGMA freelist_count').fetchone()[0]
+    page_size = connection.execute('PRAGMA page_size').fetchone()[0]
+    return (page_count - free_pages) * page_size
@@ -1,16 +1,21 @@
 # ==== AURA_V2/app/main/routes.py (VERSÃO FINAL E CORRIGIDA) ====
 
-from flask import render_template, redirect, url_for, session, flash, jsonify, request, current_app, send_file
+from flask import render_template, redirect, url_for, session, flash, jsonify, request, current_app, send_file, abort
 from flask_login import login_required, current_user
 import os # Importar o módulo 'os' para manipulação de caminhos
 import json
 
 from . import main
 from .forms import AnalyticsStudioForm
-from app.models import Client, DataSource
-from app.zabbix_api import ZabbixService, ZabbixServiceError
+from app.models import Client, DataSource, ReportJob
+from app.zabbix_api import ZabbixServiceError
+from app.service_registry import service_registry, PLATFORM_SERVICES
+from app.metadata_cache import get_metadata_cache
+from app.capability_index import get_capability_index, capability_keys
 from app.collectors import AVAILABLE_COLLECTORS
-from app.report_generator import ReportGenerator
+from app.collectors.fetch_plan import create_collectors
+from app.preflight import ReportTooLargeError, plan_report
+from app.report_worker import enqueue_report
 
 @main.route('/')
 @main.route('/index')
@@ -39,8 +44,9 @@ def analytics_studio():
     try:
         zabbix_ds = client.data_sources.filter(DataSource.platform.ilike('Zabbix')).first()
         if zabbix_ds:
-            zabbix = ZabbixService(zabbix_ds)
-            host_groups = zabbix.get('hostgroup.get', {'output': ['groupid', 'name']})
+            ds_id = zabbix_ds.id
+            host_groups = get_metadata_cache().get(ds_id, 'hostgroups', lambda: service_registry.get_by_id(ds_id).get(
+                'hostgroup.get', {'output': ['groupid', 'name']}))
             sorted_groups = sorted(host_groups, key=lambda x: x['name'])
             form.host_groups.choices = [(g['groupid'], g['name']) for g in sorted_groups]
         else:
@@ -62,31 +68,68 @@ def generate_report():
         'hosts': request.form.getlist('hosts'),
         'start_date': request.form.get('start_date'),
         'end_date': request.form.get('end_date'),
+        'layout_order': request.form.get('report_layout_order'),
     }
 
+    wants_json = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
     if not report_config['modules']:
+        if wants_json:
+            return jsonify({'error': 'Nenhum módulo foi selecionado para o relatório.'}), 400
         flash('Nenhum módulo foi selecionado para o relatório.', 'warning')
         return redirect(url_for('main.analytics_studio'))
 
+    # Recusa já aqui o que a estimativa prévia não deixaria gerar (o worker volta a verificar).
     try:
-        generator = ReportGenerator(client, report_config)
-        relative_pdf_path = generator.generate()
-        
-        if relative_pdf_path:
-            # --- CORREÇÃO APLICADA AQUI ---
-            # Convertemos o caminho relativo para um caminho absoluto
-            absolute_pdf_path = os.path.abspath(relative_pdf_path)
-            
-            # Enviamos o caminho absoluto para o Flask, garantindo que ele o encontre
-            return send_file(absolute_pdf_path, as_attachment=True)
-        else:
-            flash('Não foi possível gerar o relatório. Verifique se há dados para os parâmetros selecionados.', 'warning')
-            return redirect(url_for('main.analytics_studio'))
-            
+        _estimate_report(client, report_config)
+    except ReportTooLargeError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'danger')
+        return redirect(url_for('main.analytics_studio'))
     except Exception as e:
-        flash(f'Ocorreu um erro inesperado ao gerar o relatório: {e}', 'danger')
-        current_app.logger.error(f"Erro na geração do relatório: {e}", exc_info=True)
+        current_app.logger.warning(f"Estimativa prévia indisponível: {e}")
+
+    # A geração corre no worker ('flask report-worker'); o pedido HTTP só cria o trabalho.
+    job = enqueue_report(client, current_user, report_config)
+    if wants_json:
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('main.report_job_status', job_id=job.id),
+            'download_url': url_for('main.download_report', job_id=job.id),
+        }), 202
+
+    flash(f'O relatório foi colocado na fila de geração (trabalho #{job.id}).', 'info')
+    return redirect(url_for('main.analytics_studio'))
+
+def _estimate_report(client, report_config):
+    """Estimativa prévia de volume e memória (ver `app.preflight`) com as fontes de dados do cliente."""
+    platform_services = {ds.platform.capitalize(): service_registry.get(ds)
+                         for ds in client.data_sources if ds.platform.lower() in PLATFORM_SERVICES}
+    module_keys = [key for key in report_config['modules'] if key in AVAILABLE_COLLECTORS]
+    collectors = create_collectors(module_keys, platform_services, None, report_config)
+    return plan_report(collectors, len(report_config['hosts']))
+
+def _get_job_or_404(job_id):
+    """
+    Obtém um trabalho de relatório visível para o utilizador atual. Como pedidos
+    idênticos partilham o mesmo trabalho, o acesso é dado por cliente.
+    """
+    job = ReportJob.query.get_or_404(job_id)
+    if not current_user.is_role('Admin') and job.user_id != current_user.id \
+            and not current_user.clients.filter_by(id=job.client_id).first():
+        abort(404)
+    return job
+
+@main.route('/report-jobs/<int:job_id>/download')
+@login_required
+def download_report(job_id):
+    job = _get_job_or_404(job_id)
+    if job.status != 'done' or not job.output_path or not os.path.exists(job.output_path):
+        flash('O relatório ainda não está disponível para download.', 'warning')
         return redirect(url_for('main.analytics_studio'))
+    return send_file(job.output_path, as_attachment=True, download_name=job.download_name)
 
 # --- APIs (removi o debug para a versão final) ---
 @main.route('/api/get_hosts/<string:group_ids>')
@@ -99,16 +142,45 @@ def get_hosts(group_ids):
         if not zabbix_ds:
             return jsonify({'error': 'Fonte de dados Zabbix não configurada.'}), 500
             
-        zabbix = ZabbixService(zabbix_ds)
-        hosts = zabbix.get('host.get', {
-            'output': ['hostid', 'name'],
-            'groupids': group_ids.split(','),
-            'sortfield': 'name'
-        })
+        ds_id = zabbix_ds.id
+        groupids = sorted(set(group_ids.split(',')))
+        hosts = get_metadata_cache().get(ds_id, f"hosts:{','.join(groupids)}", lambda: service_registry.get_by_id(ds_id).get(
+            'host.get', {'output': ['hostid', 'name'], 'groupids': groupids, 'sortfield': 'name'}))
         return jsonify([{'id': h['hostid'], 'name': h['name']} for h in hosts])
     except ZabbixServiceError as e:
         return jsonify({'error': str(e)}), 500
 
+@main.route('/api/estimate_report', methods=['POST'])
+@login_required
+def estimate_report():
+    client_id = session.get('selected_client_id')
+    client = Client.query.get_or_404(client_id)
+    data = request.json or {}
+    report_config = {
+        'modules': data.get('modules', []),
+        'hosts': data.get('host_ids', []),
+        'start_date': data.get('start_date'),
+        'end_date': data.get('end_date'),
+    }
+    if not report_config['modules'] or not report_config['hosts']:
+        return jsonify({'rows': 0, 'memory_mb': 0, 'modules': {}, 'actions': [], 'notes': [], 'refused': False})
+    try:
+        return jsonify(dict(_estimate_report(client, report_config), refused=False))
+    except ReportTooLargeError as e:
+        return jsonify(dict(e.estimate, refused=True, error=str(e)))
+    except Exception as e:
+        current_app.logger.error(f"Erro na estimativa do relatório: {e}", exc_info=True)
+        return jsonify({'error': f'Erro na estimativa do relatório: {e}'}), 500
+
+@main.route('/api/report_jobs/<int:job_id>')
+@login_required
+def report_job_status(job_id):
+    job = _get_job_or_404(job_id)
+    data = job.to_dict()
+    if job.status == 'done':
+        data['download_url'] = url_for('main.download_report', job_id=job.id)
+    return jsonify(data)
+
 @main.route('/api/validate_modules', methods=['POST'])
 @login_required
 def validate_modules():
@@ -117,7 +189,8 @@ def validate_modules():
     host_ids = request.json.get('host_ids', [])
     if not host_ids: return jsonify({'supported_modules': []})
     
-    platform_services, supported_modules = {}, []
+    platform_services, supported, probes = {}, {}, []
+    indexed = {}
     try:
         for key, data in AVAILABLE_COLLECTORS.items():
             collector_class = data['class']
@@ -125,14 +198,41 @@ def validate_modules():
             if required_platform not in platform_services:
                 ds = client.data_sources.filter(DataSource.platform.ilike(required_platform)).first()
                 if ds:
-                    if required_platform.lower() == 'zabbix':
-                        platform_services[required_platform] = ZabbixService(ds)
+                    platform_services[required_platform] = (ds, service_registry.get(ds))
             
             if required_platform in platform_services:
-                service_instance = platform_services[required_platform]
-                if collector_class.is_supported(service_instance, host_ids):
-                    supported_modules.append({'key': key, 'name': data['name']})
-        
+                ds, service_instance = platform_services[required_platform]
+                if collector_class.CAPABILITY_KEYS and hasattr(service_instance, 'batch'):
+                    # Respondido pelo índice local de capacidades, sem consulta por módulo.
+                    indexed.setdefault(ds.id, {})[key] = data
+                    continue
+                probe = collector_class.support_probe(host_ids)
+                if probe and hasattr(service_instance, 'batch'):
+                    probes.append((key, collector_class, service_instance, probe))
+                elif collector_class.is_supported(service_instance, host_ids):
+                    supported[key] = True
+
+        index = get_capability_index()
+        for ds_id, collectors in indexed.items():
+            keys_by_module = capability_keys(collectors)
+            loader = lambda ds_id=ds_id: service_registry.get_by_id(ds_id)
+            for key in index.supported_modules(ds_id, host_ids, keys_by_module, loader):
+                supported[key] = True
+
+        # Todas as verificações de uma mesma plataforma seguem num único pedido.
+        for service_instance in {id(p[2]): p[2] for p in probes}.values():
+            entries = [p for p in probes if p[2] is service_instance]
+            results = service_instance.batch([p[3] for p in entries], raise_on_error=False)
+            for (key, collector_class, _, _), result in zip(entries, results):
+                if isinstance(result, Exception):
+                    current_app.logger.warning(f"Falha ao verificar o módulo '{key}': {result}")
+                elif collector_class.is_supported_from_result(result):
+                    supported[key] = True
+
+        supported_modules = [
+            {'key': key, 'name': data['name']}
+            for key, data in AVAILABLE_COLLECTORS.items() if key in supported
+        ]
         return jsonify({'supported_modules': supported_modules})
     except Exception as e:
         current_app.logger.error(f"Erro ao validar módulos: {e}", exc_info=True)
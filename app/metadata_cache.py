@@ -0,0 +1,106 @@
+# ==== AURA_V2/app/metadata_cache.py ====
+
+import json
+import threading
+import time
+from flask import current_app
+from .local_store import connect, instance_file
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS metadata (
+        datasource_id INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        refreshing_until REAL,
+        PRIMARY KEY (datasource_id, key)
+    )""",
+)
+
+class MetadataCache:
+    """
+    Cache de metadados das plataformas (grupos de hosts, hosts...) por fonte de
+    dados, guardada em SQLite para ser partilhada por todos os workers.
+
+    Dentro de `ttl` o valor é servido diretamente. Entre `ttl` e `ttl + stale_ttl`
+    é servido o valor antigo e a atualização corre em segundo plano
+    (stale-while-revalidate); só um processo a faz de cada vez. Depois disso,
+    o pedido espera pelo carregamento.
+    """
+    def __init__(self, path, ttl=300, stale_ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        with connect(self.path) as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def get(self, datasource_id, key, loader):
+        """Devolve o valor em cache ou carrega-o com `loader()` (sem argumentos)."""
+        now = time.time()
+        with connect(self.path) as connection:
+            row = connection.execute(
+                'SELECT value, fetched_at FROM metadata WHERE datasource_id = ? AND key = ?',
+                (datasource_id, key)).fetchone()
+
+        if row is not None:
+            age = now - row['fetched_at']
+            if age <= self.ttl:
+                return json.loads(row['value'])
+            if age <= self.ttl + self.stale_ttl:
+                if self._claim_refresh(datasource_id, key, now):
+                    self._refresh_in_background(datasource_id, key, loader)
+                return json.loads(row['value'])
+
+        value = loader()
+        self.set(datasource_id, key, value)
+        return value
+
+    def set(self, datasource_id, key, value):
+        with connect(self.path) as connection:
+            connection.execute(
+                """INSERT OR REPLACE INTO metadata (datasource_id, key, value, fetched_at, refreshing_until)
+                   VALUES (?, ?, ?, ?, NULL)""",
+                (datasource_id, key, json.dumps(value), time.time()))
+
+    def invalidate(self, datasource_id):
+        """Descarta todos os metadados de uma fonte de dados (próximo pedido recarrega)."""
+        with connect(self.path) as connection:
+            connection.execute('DELETE FROM metadata WHERE datasource_id = ?', (datasource_id,))
+
+    def _claim_refresh(self, datasource_id, key, now):
+        """Marca a entrada como 'a atualizar'; falha se outro processo já o estiver a fazer."""
+        with connect(self.path) as connection:
+            cursor = connection.execute(
+                """UPDATE metadata SET refreshing_until = ?
+                   WHERE datasource_id = ? AND key = ?
+                     AND (refreshing_until IS NULL OR refreshing_until < ?)""",
+                (now + 60, datasource_id, key, now))
+            return cursor.rowcount == 1
+
+    def _refresh_in_background(self, datasource_id, key, loader):
+        app = current_app._get_current_object()
+
+        def refresh():
+            with app.app_context():
+                try:
+                    self.set(datasource_id, key, loader())
+                except Exception as e:
+                    app.logger.warning(f"Falha ao atualizar metadados '{key}' da fonte {datasource_id}: {e}")
+
+        threading.Thread(target=refresh, name='metadata-refresh', daemon=True).start()
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_metadata_cache():
+    """Devolve a cache de metadados da aplicação atual."""
+    path = instance_file(current_app.config.get('METADATA_CACHE_FILE', 'metadata_cache.db'))
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = MetadataCache(path,
+                                  ttl=current_app.config.get('METADATA_CACHE_TTL', 300),
+                                  stale_ttl=current_app.config.get('METADATA_CACHE_STALE_TTL', 3600))
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,291 @@
+# ==== AURA_V2/app/metrics.py ====
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import current_app
+from .local_store import connect, instance_file
+
+# Limites (em segundos) dos histogramas de latência.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Métricas conhecidas: nome -> (tipo Prometheus, descrição).
+METRICS = {
+    'aura_zabbix_request_seconds': ('histogram', 'Latência dos pedidos à API do Zabbix.'),
+    'aura_zabbix_response_bytes_total': ('counter', 'Bytes recebidos da API do Zabbix.'),
+    'aura_zabbix_rows_total': ('counter', 'Linhas devolvidas pela API do Zabbix.'),
+    'aura_zabbix_errors_total': ('counter', 'Pedidos à API do Zabbix que falharam.'),
+    'aura_zabbix_retries_total': ('counter', 'Repetições de pedidos ao Zabbix após falhas passageiras.'),
+    'aura_report_stage_seconds': ('histogram', 'Duração de cada etapa da geração de relatórios.'),
+    'aura_reports_total': ('counter', 'Trabalhos de relatório terminados, por estado.'),
+}
+
+_SCHEMA = """CREATE TABLE IF NOT EXISTS metric_values (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    le TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels, le)
+)"""
+
+# Relatório e etiquetas ativos no contexto atual (propagados às threads dos módulos).
+_current_trace = contextvars.ContextVar('aura_report_trace', default=None)
+_current_labels = contextvars.ContextVar('aura_span_labels', default={})
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas do processo. Os valores acumulam-se em memória e
+    são somados periodicamente (`flush`) numa base SQLite partilhada, para que o
+    endpoint de métricas veja também o trabalho feito pelos workers e pelos
+    outros processos web (no fim de cada trabalho, depois dos pedidos HTTP no
+    máximo a cada `flush_interval` segundos e quando o processo termina).
+    """
+    def __init__(self, path=None, buckets=DEFAULT_BUCKETS, flush_interval=15):
+        self.path = path
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+        self._last_flush = time.monotonic()
+        if path:
+            with connect(path) as connection:
+                connection.execute(_SCHEMA)
+
+    @staticmethod
+    def _labels_key(labels):
+        return json.dumps({key: str(value) for key, value in labels.items()}, sort_keys=True)
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[(name, self._labels_key(labels), '')] += value
+
+    def observe(self, name, value, **labels):
+        """Regista uma observação num histograma (contagem por intervalo, soma e total)."""
+        le = next((str(bound) for bound in self.buckets if value <= bound), '+Inf')
+        key = self._labels_key(labels)
+        with self._lock:
+            self._values[(name, key, le)] += 1
+            self._values[(name, key, 'sum')] += value
+            self._values[(name, key, 'count')] += 1
+
+    def _drain(self):
+        with self._lock:
+            values, self._values = self._values, defaultdict(float)
+        return values
+
+    def flush(self):
+        """Soma os valores em memória à base partilhada."""
+        if not self.path:
+            return
+        self._last_flush = time.monotonic()
+        values = self._drain()
+        if not values:
+            return
+        try:
+            with connect(self.path) as connection:
+                connection.executemany(
+                    """INSERT INTO metric_values (name, labels, le, value) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value""",
+                    [(name, labels, le, value) for (name, labels, le), value in values.items()])
+        except Exception:
+            # Os valores voltam para a memória e seguem no próximo flush.
+            with self._lock:
+                for key, value in values.items():
+                    self._values[key] += value
+            raise
+
+    def maybe_flush(self):
+        """Faz `flush` se o último foi há mais de `flush_interval` segundos."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        """Todos os valores (base partilhada e memória): {(name, labels, le): value}."""
+        self.flush()
+        if not self.path:
+            with self._lock:
+                return dict(self._values)
+        with connect(self.path) as connection:
+            rows = connection.execute('SELECT name, labels, le, value FROM metric_values').fetchall()
+        return {(row['name'], row['labels'], row['le']): row['value'] for row in rows}
+
+    def render(self):
+        """Métricas no formato de texto do Prometheus."""
+        series = defaultdict(lambda: defaultdict(dict))
+        for (name, labels, le), value in self.snapshot().items():
+            series[name][labels][le] = value
+
+        lines = []
+        for name in sorted(series):
+            kind, description = METRICS.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels in sorted(series[name]):
+                values = series[name][labels]
+                label_pairs = json.loads(labels)
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(label_pairs)} {_format_value(values.get('', 0))}")
+                    continue
+                # Os intervalos do Prometheus são cumulativos.
+                cumulative = 0
+                for bound in [*map(str, self.buckets), '+Inf']:
+                    cumulative += values.get(bound, 0)
+                    lines.append(f"{name}_bucket{_format_labels({**label_pairs, 'le': bound})} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(label_pairs)} {_format_value(values.get('sum', 0))}")
+                lines.append(f"{name}_count{_format_labels(label_pairs)} {_format_value(values.get('count', 0))}")
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class ReportTrace:
+    """Spans de uma geração de relatório, resumidos no registo quando termina."""
+    def __init__(self, client_name):
+        self.client_name = client_name
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = defaultdict(lambda: [0, 0.0])
+        self.zabbix = defaultdict(lambda: [0, 0.0, 0, 0])
+        self.warnings = []
+
+    def add_stage(self, stage, module, seconds):
+        with self._lock:
+            entry = self.stages[(stage, module)]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_zabbix(self, method, seconds, response_bytes, rows):
+        with self._lock:
+            entry = self.zabbix[method]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += response_bytes
+            entry[3] += rows
+
+    def add_warning(self, message):
+        with self._lock:
+            self.warnings.append(message)
+
+    def format(self):
+        """Resumo numa linha por etapa e por método do Zabbix."""
+        lines = [f"Tempos do relatório de '{self.client_name}' ({time.perf_counter() - self.started:.2f}s no total):"]
+        for (stage, module), (count, seconds) in sorted(self.stages.items(), key=lambda kv: -kv[1][1]):
+            target = f" [{module}]" if module else ''
+            lines.append(f"  {stage}{target}: {seconds:.3f}s em {count} chamada(s)")
+        for method, (count, seconds, response_bytes, rows) in sorted(self.zabbix.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"  zabbix {method}: {seconds:.3f}s em {count} pedido(s), "
+                         f"{response_bytes / 1024:.0f} KiB, {rows} linha(s)")
+        lines.extend(f"  aviso: {message}" for message in self.warnings)
+        return '\n'.join(lines)
+
+@contextmanager
+def trace_report(client_name):
+    """Ativa um ReportTrace no contexto atual e devolve-o."""
+    trace = ReportTrace(client_name)
+    trace_token = _current_trace.set(trace)
+    labels_token = _current_labels.set({'client': client_name})
+    try:
+        yield trace
+    finally:
+        _current_labels.reset(labels_token)
+        _current_trace.reset(trace_token)
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Mede a duração de uma etapa. As etiquetas (ex.: `module`) são herdadas pelos
+    spans aninhados, pelo que um gráfico renderizado dentro de um módulo fica
+    associado a esse módulo e ao cliente do relatório.
+    """
+    merged = {**_current_labels.get(), **labels}
+    token = _current_labels.set(merged)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _current_labels.reset(token)
+        get_metrics().observe('aura_report_stage_seconds', seconds, stage=stage,
+                              client=merged.get('client', ''), module=merged.get('module', ''))
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_stage(stage, merged.get('module', ''), seconds)
+
+def report_warning(message):
+    """Regista um aviso no log e no resumo do relatório em curso."""
+    current_app.logger.warning(message)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_warning(message)
+
+def record_zabbix_call(datasource_id, method, seconds, response_bytes=0, rows=0, error=False):
+    """Regista um pedido à API do Zabbix (métricas do processo e relatório em curso)."""
+    metrics = get_metrics()
+    labels = {'datasource': datasource_id, 'method': method}
+    metrics.observe('aura_zabbix_request_seconds', seconds, **labels)
+    metrics.inc('aura_zabbix_response_bytes_total', response_bytes, **labels)
+    metrics.inc('aura_zabbix_rows_total', rows, **labels)
+    if error:
+        metrics.inc('aura_zabbix_errors_total', **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_zabbix(method, seconds, response_bytes, rows)
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_metrics():
+    """Registo de métricas do processo, somado em instance/METRICS_FILE."""
+    path = instance_file(current_app.config.get('METRICS_FILE', 'metrics.db'))
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = MetricsRegistry(path, flush_interval=current_app.config.get('METRICS_FLUSH_SECONDS', 15))
+            _registries[path] = registry
+        return registry
+
+def flush_registries(force=False):
+    """Grava os registos deste processo na base partilhada (só os que já passaram o intervalo, sem `force`)."""
+    with _registries_lock:
+        registries = [registry for registry in _registries.values() if registry.pid == os.getpid()]
+    for registry in registries:
+        if force:
+            registry.flush()
+        else:
+            registry.maybe_flush()
+
+def init_app(app):
+    """
+    Liga o registo de métricas à aplicação: o processo web grava as suas
+    (metadados, validação de módulos, estimativas...) depois dos pedidos, no
+    máximo a cada METRICS_FLUSH_SECONDS, em vez de só quando serve /metrics.
+    """
+    @app.after_request
+    def flush_metrics(response):
+        try:
+            flush_registries()
+        except Exception as e:
+            app.logger.warning(f"Não foi possível gravar as métricas: {e}")
+        return response
+
+@atexit.register
+def _flush_at_exit():
+    """Grava o que ficou em memória quando o processo termina."""
+    try:
+        flush_registries(force=True)
+    except Exception:
+        pass
@@ -2,6 +2,7 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
+from datetime import datetime
 import json
 
 user_client_association = db.Table('user_client',
@@ -40,4 +41,85 @@ class DataSource(db.Model):
     credentials_json = db.Column(db.Text, nullable=False)
     def set_credentials(self, data): self.credentials_json = json.dumps(data)
     def get_credentials(self): return json.loads(self.credentials_json)
-    def __repr__(self): return f'<DataSource {self.platform} for Client {self.client.name}>'
\ No newline at end of file
+    def __repr__(self): return f'<DataSource {self.platform} for Client {self.client.name}>'
+
+class ReportJob(db.Model):
+    """Pedido de geração de relatório, executado em segundo plano pelo worker."""
+    # 'scheduled': trabalho de um lote, executado pelo comando de lotes e não pelo worker.
+    STATUSES = ['queued', 'scheduled', 'running', 'done', 'failed']
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    status = db.Column(db.String(20), index=True, nullable=False, default='queued')
+    config_json = db.Column(db.Text, nullable=False)
+    artifact_key = db.Column(db.String(64), index=True)
+    output_path = db.Column(db.String(512))
+    error_message = db.Column(db.Text)
+    worker = db.Column(db.String(120))
+    batch_id = db.Column(db.Integer, db.ForeignKey('report_batch.id'), index=True)
+    estimated_memory_mb = db.Column(db.Float)  # estimativa prévia (app.preflight)
+    peak_memory_mb = db.Column(db.Float)       # pico medido com tracemalloc durante a geração
+    created_at = db.Column(db.DateTime, index=True, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    client = db.relationship('Client', backref=db.backref('report_jobs', lazy='dynamic', cascade="all, delete-orphan"))
+    user = db.relationship('User', backref=db.backref('report_jobs', lazy='dynamic'))
+    batch = db.relationship('ReportBatch', backref=db.backref('jobs', lazy='dynamic'))
+    def set_config(self, data): self.config_json = json.dumps(data)
+    def get_config(self): return json.loads(self.config_json)
+    @property
+    def download_name(self):
+        report_name = (self.get_config().get('report_name') or 'Relatorio').replace(' ', '_')
+        return f"{report_name}_{self.client.name}.pdf"
+    @property
+    def queue_seconds(self):
+        if not self.started_at: return None
+        return (self.started_at - self.created_at).total_seconds()
+    @property
+    def run_seconds(self):
+        if not self.started_at or not self.finished_at: return None
+        return (self.finished_at - self.started_at).total_seconds()
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'queue_seconds': self.queue_seconds,
+            'run_seconds': self.run_seconds,
+            'estimated_memory_mb': self.estimated_memory_mb,
+            'peak_memory_mb': self.peak_memory_mb,
+        }
+    def __repr__(self): return f'<ReportJob {self.id} {self.status}>'
+
+
+class ReportDefinition(db.Model):
+    """Relatório guardado (módulos, período relativo, grupos de hosts) para geração em lote."""
+    PERIODS = ['previous_month', 'last_7_days', 'last_30_days']
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    period = db.Column(db.String(20), nullable=False, default='previous_month')
+    config_json = db.Column(db.Text, nullable=False)
+    run_day = db.Column(db.Integer)  # dia do mês para o agendador (None: só manualmente)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    def set_config(self, data): self.config_json = json.dumps(data)
+    def get_config(self): return json.loads(self.config_json)
+    def __repr__(self): return f'<ReportDefinition {self.name}>'
+
+class ReportBatch(db.Model):
+    """Execução de uma definição para um período; os relatórios de cada cliente são ReportJobs."""
+    STATUSES = ['running', 'finished']
+    __table_args__ = (db.UniqueConstraint('definition_id', 'period_start', 'period_end'),)
+    id = db.Column(db.Integer, primary_key=True)
+    definition_id = db.Column(db.Integer, db.ForeignKey('report_definition.id'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    period_end = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='running')
+    runner = db.Column(db.String(120))
+    heartbeat_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    definition = db.relationship('ReportDefinition', backref=db.backref('batches', lazy='dynamic', cascade="all, delete-orphan"))
+    def __repr__(self): return f'<ReportBatch {self.id} {self.definition_id} {self.period_start}..{self.period_end}>'
@@ -1,60 +1,85 @@
-# ==== AURA_V2/app/pdf_builder.py (VERSÃO CORRIGIDA) ====
+# ==== AURA_V2/app/pdf_builder.py ====
 
+import io
 import os
-import uuid
 from flask import render_template
 from xhtml2pdf import pisa
 from PyPDF2 import PdfWriter, PdfReader
+from .render_pool import run_in_pool
+from .artifact_store import PARTIAL_SUFFIX
+from .metrics import span
+
+DOCUMENT_TEMPLATE = 'reports/report.html'
 
 class PDFBuilderService:
-    """Serviço para construir relatórios em PDF a partir de templates HTML."""
-    def __init__(self, output_dir='relatorios_gerados'):
+    """
+    Serviço para construir relatórios em PDF a partir de templates HTML.
+
+    Cada módulo é renderizado como uma secção HTML. O documento final é montado
+    em memória e escrito uma única vez no disco, num de dois modos:
+      - 'single_pass': todas as secções num só documento e numa só passagem do pisa;
+      - 'parts': cada secção convertida em PDF (em paralelo) para BytesIO e
+        depois junta, sem ficheiros temporários.
+    A conversão (pesada em CPU) é delegada ao pool de processos, se existir.
+    """
+    def __init__(self, output_dir='relatorios_gerados', render_pool=None, mode='single_pass'):
         self.output_dir = output_dir
+        self.render_pool = render_pool
+        self.mode = mode
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
-        
-    def _cleanup(self, paths_to_clean):
-        """Remove os ficheiros PDF temporários."""
-        for filename in paths_to_clean:
-            # Adiciona uma verificação de segurança para apagar apenas na pasta de output
-            if os.path.dirname(filename) == os.path.abspath(self.output_dir):
-                try:
-                    os.remove(filename)
-                except OSError as e:
-                    print(f"Erro ao remover ficheiro temporário {filename}: {e}")
-
-    def html_to_pdf_path(self, template_name, context):
-        """Renderiza um template HTML e converte-o para um ficheiro PDF temporário."""
-        html = render_template(template_name, **context)
-        temp_filename = os.path.join(self.output_dir, f"temp_{uuid.uuid4().hex}.pdf")
-        
-        with open(temp_filename, "w+b") as result_file:
-            # --- CORREÇÃO APLICADA AQUI ---
-            # A variável correta é 'html', não 'source_html'.
-            pisa_status = pisa.CreatePDF(html, dest=result_file)
-        
-        if pisa_status.err:
-            raise IOError(f"Erro ao converter HTML para PDF: {pisa_status.err}")
-        
-        return temp_filename
-        
-    def merge_pdfs(self, pdf_paths, output_filename='relatorio_final.pdf'):
-        """Junta uma lista de ficheiros PDF num único ficheiro de saída."""
-        pdf_writer = PdfWriter()
-        temp_files_to_clean = []
-
-        for path in pdf_paths:
-            try:
-                pdf_reader = PdfReader(path)
-                for page in pdf_reader.pages:
-                    pdf_writer.add_page(page)
-                temp_files_to_clean.append(path)
-            except Exception as e:
-                print(f"Erro ao processar o ficheiro PDF temporário {path}: {e}")
 
+    def render_section(self, template_name, context):
+        """Renderiza o template de um módulo (fragmento HTML)."""
+        return render_template(template_name, **context)
+
+    def render_document(self, sections, **context):
+        """Envolve as secções no documento do relatório (estilos, quebras de página)."""
+        return render_template(DOCUMENT_TEMPLATE, sections=sections, **context)
+
+    def section_to_pdf_bytes(self, section, **context):
+        """Converte uma única secção num PDF em memória (modo 'parts')."""
+        html = self.render_document([section], **context)
+        with span('pdf_render'):
+            return run_in_pool(self.render_pool, html_to_pdf_bytes, html)
+
+    def build(self, sections=None, parts=None, output_filename='relatorio_final.pdf', **context):
+        """
+        Gera o PDF final e escreve-o uma única vez. Recebe as secções HTML (modo
+        'single_pass') ou os PDFs já convertidos de cada secção (modo 'parts').
+        """
+        if parts is not None:
+            with span('pdf_merge'):
+                pdf_bytes = merge_pdf_bytes(parts)
+        else:
+            html = self.render_document(sections, **context)
+            with span('pdf_render'):
+                pdf_bytes = run_in_pool(self.render_pool, html_to_pdf_bytes, html)
+
+        # Escreve num ficheiro parcial e renomeia: nunca fica um PDF final truncado.
         final_pdf_path = os.path.join(self.output_dir, output_filename)
-        with open(final_pdf_path, 'wb') as out:
-            pdf_writer.write(out)
-            
-        self._cleanup(temp_files_to_clean) # Limpa os ficheiros temporários após a junção
-        return final_pdf_path
\ No newline at end of file
+        partial_path = final_pdf_path + PARTIAL_SUFFIX
+        with open(partial_path, 'wb') as out:
+            out.write(pdf_bytes)
+        os.replace(partial_path, final_pdf_path)
+        return final_pdf_path
+
+def html_to_pdf_bytes(html):
+    """Converte HTML para PDF em memória (função de topo para poder correr noutro processo)."""
+    buffer = io.BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=buffer)
+    
+    if pisa_status.err:
+        raise IOError(f"Erro ao converter HTML para PDF: {pisa_status.err}")
+    
+    return buffer.getvalue()
+
+def merge_pdf_bytes(parts):
+    """Junta vários PDFs em memória num único PDF (bytes)."""
+    pdf_writer = PdfWriter()
+    for part in parts:
+        for page in PdfReader(io.BytesIO(part)).pages:
+            pdf_writer.add_page(page)
+    buffer = io.BytesIO()
+    pdf_writer.write(buffer)
+    return buffer.getvalue()
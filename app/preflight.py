@@ -0,0 +1,155 @@
+# ==== AURA_V2/app/preflight.py ====
+
+from flask import current_app
+from .collectors.base_collector import NUMERIC_VALUE_TYPES, TREND_PERIOD, parse_interval
+from .collectors.fetch_plan import QUEUE_PAGES
+
+# Memória aproximada de uma linha de histórico/trends: como dicionário
+# decodificado do JSON (strings incluídas) e já na página tipada (`ingestion`).
+RAW_ROW_BYTES = 600
+FRAME_ROW_BYTES = 24
+MB = 1024 * 1024
+
+class ReportTooLargeError(Exception):
+    """O relatório pedido excede os limites de volume ou de memória, mesmo com trends e leitura em fluxo."""
+    def __init__(self, message, estimate):
+        super().__init__(message)
+        self.estimate = estimate
+
+def _settings():
+    config = current_app.config
+    from .async_runtime import async_http_available
+    from .json_stream import can_stream
+    return {
+        'max_rows': config.get('REPORT_MAX_ROWS', 50_000_000),
+        'max_memory_mb': config.get('REPORT_MAX_MEMORY_MB', 1024),
+        'default_delay': config.get('PREFLIGHT_DEFAULT_DELAY', 60),
+        'window': config.get('HISTORY_WINDOW_SECONDS', 86400),
+        'trends_window': config.get('TRENDS_WINDOW_SECONDS', 30 * 86400),
+        'chunk': max(1, config.get('HISTORY_ITEM_CHUNK', 100)),
+        'page_limit': config.get('HISTORY_PAGE_LIMIT', 50000),
+        'stream_rows': config.get('ZABBIX_STREAM_BATCH_ROWS', 10000),
+        'prefetch': max(1, config.get('ZABBIX_ASYNC_PREFETCH', 8)),
+        'async': async_http_available(config),
+        'streaming': can_stream(),
+    }
+
+def _number(value):
+    """Número inteiro com os milhares separados por espaços (ex.: '50 000 000')."""
+    return f"{round(value):,}".replace(',', ' ')
+
+def estimate_rows(items, source, period, default_delay=60):
+    """Linhas que o período vai devolver: 1 por hora e item em trends, período/intervalo em histórico."""
+    if source == 'trends':
+        return len(items) * -(-period // TREND_PERIOD)
+    return sum(period // (parse_interval(item.get('delay')) or default_delay) for item in items)
+
+def _trends_allowed(collector, items):
+    """O coletor aceita resolução horária e todos os itens são numéricos (só esses têm trends)."""
+    resolution = collector.REQUIRED_RESOLUTION
+    if resolution is not None and resolution < TREND_PERIOD:
+        return False
+    return all(str(item.get('value_type', '0')) in NUMERIC_VALUE_TYPES for item in items)
+
+def _estimate(candidates, sources, host_count, settings, low_memory):
+    """Linhas e pico de memória por módulo, para as fontes e o modo de leitura indicados."""
+    shared = {}
+    for key in candidates:
+        shared[sources[key]] = shared.get(sources[key], 0) + 1
+
+    modules = {}
+    for key, (collector, items) in candidates.items():
+        source = sources[key]
+        period = max(0, collector.end_time - collector.start_time)
+        rows = estimate_rows(items, source, period, settings['default_delay'])
+        window = settings['trends_window'] if source == 'trends' else settings['window']
+        # Linhas de um pedido (bloco de itens x janela de tempo), em média.
+        request_rows = rows * min(1, window / period if period else 1) * min(1, settings['chunk'] / max(1, len(items)))
+
+        # Linhas decodificadas ao mesmo tempo em memória, conforme o modo de leitura.
+        if settings['async'] and not low_memory:
+            # Até 2 páginas por janela em curso (`iter_ordered_streams`).
+            in_flight = min(request_rows, settings['page_limit']) * 2 * settings['prefetch']
+        elif settings['streaming']:
+            in_flight = settings['stream_rows']
+        else:
+            in_flight = min(request_rows, settings['page_limit'])
+        memory = min(rows, in_flight) * RAW_ROW_BYTES
+        if shared[source] > 1 and not low_memory:
+            # Série partilhada pelo plano de recolha: páginas tipadas à espera na fila do coletor.
+            memory += QUEUE_PAGES * min(rows, settings['stream_rows']) * FRAME_ROW_BYTES
+        # Agregação por host (histograma dos percentis).
+        memory += host_count * getattr(collector, 'HISTOGRAM_BINS', 0) * 8
+
+        modules[key] = {'source': source, 'items': len(items), 'rows': int(rows), 'memory_mb': round(memory / MB, 1)}
+
+    return {
+        'rows': sum(module['rows'] for module in modules.values()),
+        # Os módulos correm em paralelo: os picos somam-se.
+        'memory_mb': round(sum(module['memory_mb'] for module in modules.values()), 1),
+        'modules': modules,
+        'low_memory': low_memory,
+    }
+
+def plan_report(collectors, host_count):
+    """
+    Estimativa prévia (antes de recolher) do volume e da memória de um
+    relatório, a partir do intervalo de recolha ('delay') dos itens e do
+    período pedido, e escolha de como o gerar dentro dos limites
+    REPORT_MAX_ROWS e REPORT_MAX_MEMORY_MB:
+
+    1. tal como pedido, se couber;
+    2. com trends (médias horárias) nos módulos que os aceitam;
+    3. em modo de pouca memória: leitura em fluxo, sem séries partilhadas nem
+       janelas pedidas em paralelo;
+    4. se nem assim couber, levanta ReportTooLargeError com uma mensagem clara.
+
+    `collectors` são os coletores já criados com o seu plano de recolha; os
+    itens vêm do plano (um único pedido de metadados, reaproveitado depois).
+    """
+    settings = _settings()
+    candidates = {}
+    for key, collector in collectors.items():
+        if collector.fetch_plan is None or not collector.ITEM_KEYS or not collector.start_time or not collector.end_time:
+            continue
+        candidates[key] = (collector, collector.fetch_plan.items_for(collector.ITEM_KEYS))
+
+    sources = {key: collector._resolve_source(items) for key, (collector, items) in candidates.items()}
+    estimate = _estimate(candidates, sources, host_count, settings, low_memory=False)
+    actions, notes = [], []
+
+    def too_large(estimate):
+        return estimate['rows'] > settings['max_rows'] or estimate['memory_mb'] > settings['max_memory_mb']
+
+    if too_large(estimate):
+        switched = [key for key, (collector, items) in candidates.items()
+                    if sources[key] == 'history' and _trends_allowed(collector, items)]
+        if switched:
+            sources.update({key: 'trends' for key in switched})
+            estimate = _estimate(candidates, sources, host_count, settings, low_memory=False)
+            actions.append('trends')
+            notes.append(f"Volume elevado: {', '.join(switched)} usará trends (médias horárias) em vez do histórico bruto.")
+    if estimate['memory_mb'] > settings['max_memory_mb']:
+        estimate = _estimate(candidates, sources, host_count, settings, low_memory=True)
+        actions.append('streaming')
+        notes.append('Memória estimada elevada: os dados serão lidos em fluxo, uma janela de cada vez (mais lento).')
+
+    estimate.update({'actions': actions, 'notes': notes,
+                     'limits': {'rows': settings['max_rows'], 'memory_mb': settings['max_memory_mb']}})
+    if too_large(estimate):
+        raise ReportTooLargeError(
+            f"O relatório pedido é demasiado grande: cerca de {_number(estimate['rows'])} registos e "
+            f"{_number(estimate['memory_mb'])} MB de memória estimados (limites: {_number(settings['max_rows'])} "
+            f"registos e {_number(settings['max_memory_mb'])} MB), mesmo com trends e leitura em fluxo. "
+            f"Reduza o período ou o número de hosts, ou divida o relatório.", estimate)
+    return estimate
+
+def apply_plan(collectors, estimate):
+    """Aplica aos coletores as fontes e o modo de leitura escolhidos por `plan_report`."""
+    for key, module in estimate['modules'].items():
+        collector = collectors[key]
+        collector.source_override = module['source']
+        if estimate['low_memory']:
+            collector.low_memory = True
+            if collector.fetch_plan is not None:
+                collector.fetch_plan.share_series = False
@@ -0,0 +1,48 @@
+# ==== AURA_V2/app/render_pool.py ====
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_render_pool(app):
+    """
+    Devolve o pool de processos partilhado para o trabalho pesado de CPU
+    (gráficos e conversão HTML -> PDF). Com REPORT_RENDER_PROCESSES = 0 devolve
+    None e a renderização é feita na própria thread que a pede.
+    """
+    global _pool
+    processes = int(app.config.get('REPORT_RENDER_PROCESSES', 2))
+    if processes <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' evita herdar locks de threads do processo web através de fork().
+            context = multiprocessing.get_context(app.config.get('REPORT_RENDER_START_METHOD', 'spawn'))
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+        return _pool
+
+def run_in_pool(pool, fn, *args):
+    """Executa `fn` no pool (ou localmente se não houver pool) e devolve o resultado."""
+    global _pool
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # Um processo morreu (ex.: falta de memória): descarta o pool para ser recriado.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
+
+def shutdown_render_pool():
+    """Termina o pool partilhado (usado ao encerrar workers)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
@@ -1,22 +1,36 @@
 # ==== AURA_V2/app/report_generator.py (VERSÃO DE DEBUG) ====
 
+import contextvars
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
-from .zabbix_api import ZabbixService
-from .charting import ChartingService
+from .service_registry import service_registry, PLATFORM_SERVICES
+from .charting import ChartingService, get_chart_cache
 from .pdf_builder import PDFBuilderService
-from .models import DataSource
+from .render_pool import get_render_pool
 from .collectors import AVAILABLE_COLLECTORS
+from .metrics import report_warning, span, trace_report
 
 class ReportGenerator:
-    """Orquestra a coleta de dados e a geração do relatório final em PDF."""
+    """
+    Orquestra a coleta de dados e a geração do relatório final em PDF.
+    Os módulos correm em paralelo: a coleta (I/O) num pool de threads e a
+    renderização de gráficos/PDF (CPU) num pool de processos partilhado.
+    """
     def __init__(self, client, report_config):
         self.client = client
+        self.client_name = client.name
         self.config = report_config
-        self.charting = ChartingService()
-        self.pdf_builder = PDFBuilderService()
+        render_pool = get_render_pool(current_app)
+        self.charting = ChartingService(render_pool=render_pool,
+                                        image_format=current_app.config.get('CHART_IMAGE_FORMAT', 'png'),
+                                        cache=get_chart_cache(current_app))
+        self.pdf_builder = PDFBuilderService(output_dir=current_app.config.get('ARTIFACT_DIR', 'relatorios_gerados'),
+                                             render_pool=render_pool,
+                                             mode=current_app.config.get('PDF_ASSEMBLY_MODE', 'single_pass'))
         self.platform_services = {}
+        self.preflight = None
 
         print("\\n--- INICIANDO DEBUG: ReportGenerator __init__ ---")
         print(f"[DEBUG] Configurações recebidas: {self.config}")
@@ -24,64 +38,138 @@ class ReportGenerator:
         for ds in self.client.data_sources:
             platform_name = ds.platform.capitalize()
             print(f"[DEBUG] A processar DataSource da plataforma: {platform_name}")
-            if platform_name == 'Zabbix':
+            if ds.platform.lower() in PLATFORM_SERVICES:
                 try:
-                    self.platform_services[platform_name] = ZabbixService(ds)
-                    print(f"[DEBUG] ZabbixService para o cliente '{self.client.name}' inicializado com SUCESSO.")
+                    self.platform_services[platform_name] = service_registry.get(ds)
+                    print(f"[DEBUG] Serviço {platform_name} para o cliente '{self.client_name}' obtido do registo com SUCESSO.")
                 except Exception as e:
-                    print(f"[DEBUG] ERRO ao inicializar ZabbixService: {e}")
+                    print(f"[DEBUG] ERRO ao inicializar o serviço {platform_name}: {e}")
         print("--- FIM DEBUG: ReportGenerator __init__ ---\\n")
 
+    def _ordered_modules(self):
+        """Módulos selecionados, sem duplicados, na ordem definida pelo utilizador no layout."""
+        modules = list(dict.fromkeys(self.config.get('modules', [])))
+        layout = self.config.get('layout_order') or []
+        if isinstance(layout, str):
+            layout = [key.strip() for key in layout.split(',') if key.strip()]
+        rank = {key: index for index, key in enumerate(layout)}
+        return sorted(modules, key=lambda key: rank.get(key, len(rank)))
+
+    def _document_context(self):
+        return {'client_name': self.client_name, 'report_name': self.config.get('report_name')}
+
+    def _build_collectors(self, module_keys):
+        """
+        Cria os coletores dos módulos e, por plataforma, um plano de recolha
+        partilhado: os metadados e as séries de todos os módulos são pedidos uma
+        única vez (ver `collectors.fetch_plan`). Antes de recolher, a estimativa
+        prévia (`app.preflight`) escolhe a fonte e o modo de leitura, ou recusa
+        o relatório com ReportTooLargeError.
+        """
+        from .collectors.fetch_plan import create_collectors
+        from .preflight import ReportTooLargeError, apply_plan, plan_report
+
+        collectors = create_collectors(module_keys, self.platform_services, self.charting, self.config)
+        try:
+            with span('preflight'):
+                self.preflight = plan_report(collectors, len(self.config.get('hosts', [])))
+        except ReportTooLargeError:
+            raise
+        except Exception as e:
+            current_app.logger.warning(f"Estimativa prévia indisponível ({e}); o relatório segue sem ela.")
+        else:
+            apply_plan(collectors, self.preflight)
+            for note in self.preflight['notes']:
+                current_app.logger.info(f"Relatório de '{self.client_name}': {note}")
+
+        # Todas as chaves já são conhecidas: um único pedido de metadados por plataforma.
+        for module_key, collector in collectors.items():
+            if collector.fetch_plan is None:
+                continue
+            try:
+                with span('fetch_plan', module=module_key):
+                    collector.fetch_plan.register(collector)
+            except Exception as e:
+                report_warning(f"Plano partilhado indisponível para '{module_key}' ({e}); o módulo recolhe os seus dados.")
+                collector.fetch_plan = None
+        return collectors
+
+    def _run_module(self, app, module_key, collector):
+        """
+        Coleta e renderiza um módulo. Corre numa thread do pool. Devolve a secção
+        HTML ou, no modo 'parts', o PDF da secção já convertido (bytes).
+        """
+        with app.app_context():
+            with span('collect', module=module_key):
+                module_context = collector.collect()
+            if not module_context:
+                print(f"[DEBUG] AVISO: Coletor '{module_key}' executou, mas não retornou dados.")
+                return None
+
+            print(f"[DEBUG] SUCESSO: Coletor '{module_key}' retornou dados.")
+            module_context.update(self._document_context())
+            template_path = f'reports/modules/{module_key}.html'
+            with span('render_section', module=module_key):
+                section = self.pdf_builder.render_section(template_path, module_context)
+                if self.pdf_builder.mode == 'parts':
+                    section = self.pdf_builder.section_to_pdf_bytes(section, **self._document_context())
+                    current_app.logger.debug(f"PDF da secção '{module_key}' gerado em memória.")
+            return section
+
     def generate(self):
-        """Executa o processo de geração do relatório."""
-        print("\\n--- INICIANDO DEBUG: ReportGenerator generate ---")
-        pdf_parts_paths = []
-        has_data = False
+        """
+        Executa o processo de geração do relatório. Os tempos de cada etapa e de
+        cada pedido ao Zabbix são registados em `app.metrics` e resumidos no log.
+        """
+        with trace_report(self.client_name) as trace:
+            try:
+                with span('report'):
+                    return self._generate()
+            finally:
+                current_app.logger.info(trace.format())
 
-        module_keys = self.config.get('modules', [])
+    def _generate(self):
+        print("\\n--- INICIANDO DEBUG: ReportGenerator generate ---")
+        module_keys = [key for key in self._ordered_modules() if key in AVAILABLE_COLLECTORS]
         print(f"[DEBUG] Módulos selecionados para o relatório: {module_keys}")
 
-        for module_key in module_keys:
-            if module_key in AVAILABLE_COLLECTORS:
-                CollectorClass = AVAILABLE_COLLECTORS[module_key]['class']
-                required_platform = CollectorClass.platform
-                platform_service = self.platform_services.get(required_platform)
-
-                print(f"\\n[DEBUG] A processar módulo: '{module_key}' (requer plataforma: '{required_platform}')")
-
-                if platform_service:
-                    print(f"[DEBUG] Serviço para '{required_platform}' encontrado. A chamar o coletor...")
-                    collector = CollectorClass(platform_service, self.charting, self.config)
-                    module_context = collector.collect()
-                    
-                    if module_context:
-                        has_data = True
-                        print(f"[DEBUG] SUCESSO: Coletor '{module_key}' retornou dados.")
-                        module_context.update({
-                            'client_name': self.client.name,
-                            'report_name': self.config.get('report_name')
-                        })
-                        
-                        template_path = f'reports/modules/{module_key}.html'
-                        temp_pdf_path = self.pdf_builder.html_to_pdf_path(template_path, module_context)
-                        pdf_parts_paths.append(temp_pdf_path)
-                        print(f"[DEBUG] PDF temporário para '{module_key}' gerado em: {temp_pdf_path}")
-                    else:
-                        print(f"[DEBUG] AVISO: Coletor '{module_key}' executou, mas não retornou dados.")
-                else:
-                    print(f"[DEBUG] ERRO: Serviço para a plataforma '{required_platform}' não foi encontrado ou falhou na inicialização.")
+        app = current_app._get_current_object()
+        collectors = self._build_collectors(module_keys)
+        plans = {id(c.fetch_plan): c.fetch_plan for c in collectors.values() if c.fetch_plan is not None}.values()
+        max_workers = max(1, min(len(module_keys), current_app.config.get('REPORT_IO_WORKERS', 4)))
+        # Os coletores de uma série partilhada recebem as páginas ao mesmo tempo: têm de correr todos.
+        max_workers = max([max_workers] + [plan.shared_consumers() for plan in plans])
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-module') as executor:
+                # Cada módulo corre numa cópia do contexto, para herdar o relatório em medição.
+                futures = {key: executor.submit(contextvars.copy_context().run, self._run_module, app, key, collector)
+                           for key, collector in collectors.items()}
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        print(f"[DEBUG] ERRO no módulo '{key}': {e}")
+                        results[key] = None
+        finally:
+            for plan in plans:
+                plan.close()
+
+        # A junção respeita a ordem do layout, independentemente da ordem de conclusão.
+        sections = [results[key] for key in module_keys if results.get(key)]
         
-        if not has_data:
+        if not sections:
             print("[DEBUG] Nenhum dado foi coletado por nenhum módulo. A retornar None.")
-            self.pdf_builder._cleanup(pdf_parts_paths)
             print("--- FIM DEBUG: generate (sem dados) ---\\n")
             return None
 
         report_name = self.config.get('report_name', 'Relatorio').replace(' ', '_')
-        final_pdf_path = self.pdf_builder.merge_pdfs(
-            pdf_paths=pdf_parts_paths,
-            output_filename=f"{report_name}_{self.client.name}_{uuid.uuid4().hex[:8]}.pdf"
-        )
+        output_filename = f"{report_name}_{self.client_name}_{uuid.uuid4().hex[:8]}.pdf"
+        if self.pdf_builder.mode == 'parts':
+            final_pdf_path = self.pdf_builder.build(parts=sections, output_filename=output_filename)
+        else:
+            final_pdf_path = self.pdf_builder.build(sections=sections, output_filename=output_filename,
+                                                    **self._document_context())
         print(f"[DEBUG] Relatório final gerado com sucesso em: {final_pdf_path}")
         print("--- FIM DEBUG: generate (sucesso) ---\\n")
-        return final_pdf_path
\ No newline at end of file
+        return final_pdf_path
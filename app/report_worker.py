@@ -0,0 +1,201 @@
+# ==== AURA_V2/app/report_worker.py ====
+
+import os
+import socket
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .models import ReportJob
+from .artifact_store import get_artifact_store, report_key
+from .metrics import get_metrics
+
+def worker_name():
+    """Identifica o worker (host:pid) nos registos dos trabalhos."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_report(client, user, report_config):
+    """
+    Cria um trabalho de relatório e devolve-o. Se um pedido idêntico já tiver um
+    PDF fresco no armazém, o trabalho nasce concluído com esse PDF; se estiver
+    em curso, devolve o trabalho existente em vez de gerar o relatório duas vezes.
+    """
+    key = report_key(client.id, report_config)
+
+    # Um trabalho 'running' há mais de REPORT_JOB_TIMEOUT ficou de um worker que
+    # morreu (ver `fail_stale_jobs`): não serve de trabalho em curso.
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get('REPORT_JOB_TIMEOUT', 3600))
+    in_flight = ReportJob.query.filter(
+        ReportJob.artifact_key == key,
+        db.or_(ReportJob.status == 'queued',
+               db.and_(ReportJob.status == 'running', ReportJob.started_at >= stale_before))
+    ).order_by(ReportJob.created_at).first()
+    if in_flight:
+        return in_flight
+
+    job = ReportJob(client_id=client.id, user_id=user.id if user else None,
+                    status='queued', artifact_key=key)
+    job.set_config(report_config)
+
+    stored_path = get_artifact_store().lookup(key, current_app.config.get('ARTIFACT_FRESHNESS_SECONDS', 6 * 3600))
+    if stored_path:
+        now = datetime.utcnow()
+        job.status = 'done'
+        job.output_path = stored_path
+        job.started_at = job.finished_at = now
+        job.worker = 'artifact-store'
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def claim_next_job(name):
+    """
+    Reserva o trabalho mais antigo da fila. A mudança de estado é condicional
+    ('queued' -> 'running'), pelo que dois workers nunca ficam com o mesmo trabalho.
+    """
+    while True:
+        job = ReportJob.query.filter_by(status='queued').order_by(ReportJob.created_at, ReportJob.id).first()
+        if job is None:
+            return None
+        claimed = ReportJob.query.filter_by(id=job.id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow(), 'worker': name},
+            synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+
+def fail_stale_jobs():
+    """
+    Marca como falhados os trabalhos 'running' há mais tempo que REPORT_JOB_TIMEOUT
+    (worker morreu). Os trabalhos de lotes ficam de fora: são do `batch-run`,
+    que os retoma se o seu processo tiver morrido (ver `batch_reports.start_batch`).
+    """
+    timeout = current_app.config.get('REPORT_JOB_TIMEOUT', 3600)
+    limit = datetime.utcnow() - timedelta(seconds=timeout)
+    count = ReportJob.query.filter(ReportJob.status == 'running', ReportJob.started_at < limit,
+                                   ReportJob.batch_id.is_(None)).update(
+        {'status': 'failed', 'finished_at': datetime.utcnow(),
+         'error_message': 'O trabalho foi interrompido antes de terminar.'},
+        synchronize_session=False)
+    db.session.commit()
+    return count
+
+class _PeakMemory:
+    peak_mb = None
+
+_tracked_jobs = 0
+_tracked_jobs_lock = threading.Lock()
+
+@contextmanager
+def track_peak_memory(enabled=True):
+    """
+    Mede com tracemalloc o pico de memória Python durante o bloco (em
+    `peak_mb`, MB). O tracemalloc é global ao processo: com vários trabalhos em
+    simultâneo (lotes), o pico inclui os outros em curso e o contador só é
+    reposto quando não há nenhum. Os processos de renderização não contam.
+    """
+    global _tracked_jobs
+    tracker = _PeakMemory()
+    if not enabled:
+        yield tracker
+        return
+    with _tracked_jobs_lock:
+        if _tracked_jobs == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracked_jobs += 1
+    try:
+        yield tracker
+    finally:
+        with _tracked_jobs_lock:
+            tracker.peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            _tracked_jobs -= 1
+            if _tracked_jobs == 0:
+                tracemalloc.stop()
+
+def run_job(job):
+    """Executa um trabalho já reservado e regista o resultado (e o pico de memória)."""
+    from .report_generator import ReportGenerator
+    from .preflight import ReportTooLargeError
+
+    current_app.logger.info(f"A gerar relatório do trabalho {job.id} (cliente '{job.client.name}').")
+    generator = None
+    with track_peak_memory(current_app.config.get('REPORT_TRACK_MEMORY', True)) as memory:
+        try:
+            generator = ReportGenerator(job.client, job.get_config())
+            pdf_path = generator.generate()
+            if pdf_path:
+                job.status = 'done'
+                job.output_path = get_artifact_store().store(job.artifact_key or report_key(job.client_id, job.get_config()), pdf_path)
+            else:
+                job.status = 'failed'
+                job.error_message = 'Não foi possível gerar o relatório. Verifique se há dados para os parâmetros selecionados.'
+        except ReportTooLargeError as e:
+            current_app.logger.warning(f"Relatório {job.id} recusado pela estimativa prévia: {e}")
+            db.session.rollback()
+            job.status = 'failed'
+            job.error_message = str(e)
+            job.estimated_memory_mb = e.estimate.get('memory_mb')
+        except Exception as e:
+            current_app.logger.error(f"Erro na geração do relatório {job.id}: {e}", exc_info=True)
+            db.session.rollback()
+            job.status = 'failed'
+            job.error_message = f'Ocorreu um erro inesperado ao gerar o relatório: {e}'
+    job.finished_at = datetime.utcnow()
+    job.peak_memory_mb = memory.peak_mb
+    if generator is not None and generator.preflight:
+        job.estimated_memory_mb = generator.preflight['memory_mb']
+    db.session.commit()
+    current_app.logger.info(f"Trabalho {job.id} terminou com estado '{job.status}' em {job.run_seconds:.1f}s"
+                            + (f" (pico de memória: {job.peak_memory_mb:.0f} MB)." if job.peak_memory_mb is not None else "."))
+
+    # As métricas do worker só ficam visíveis no endpoint depois de somadas à base partilhada.
+    metrics = get_metrics()
+    metrics.inc('aura_reports_total', status=job.status)
+    metrics.flush()
+    return job
+
+def sweep_artifacts():
+    """Aplica a retenção do armazém de relatórios e regista o que foi removido."""
+    removed = get_artifact_store().sweep()
+    if any(removed.values()):
+        current_app.logger.info(f"Limpeza do armazém de relatórios: {removed}")
+    return removed
+
+def run_worker(poll_interval=2.0, once=False):
+    """
+    Ciclo principal do worker: processa a fila até ser interrompido (ou esvaziar,
+    com `once`) e, a cada ARTIFACT_SWEEP_INTERVAL, limpa o armazém de relatórios.
+    """
+    # A pilha de relatórios (pandas, matplotlib, xhtml2pdf) é carregada já no
+    # arranque do worker, para não pesar no tempo do primeiro trabalho.
+    from . import report_generator  # noqa: F401
+
+    name = worker_name()
+    sweep_interval = current_app.config.get('ARTIFACT_SWEEP_INTERVAL', 600)
+    next_sweep = 0
+    stale = fail_stale_jobs()
+    if stale:
+        current_app.logger.warning(f"{stale} trabalho(s) interrompido(s) marcado(s) como falhado(s).")
+    current_app.logger.info(f"Worker de relatórios '{name}' iniciado.")
+
+    while True:
+        if time.monotonic() >= next_sweep:
+            sweep_artifacts()
+            next_sweep = time.monotonic() + sweep_interval
+
+        job = claim_next_job(name)
+        if job is None:
+            if once:
+                return
+            db.session.remove()
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        db.session.remove()
@@ -0,0 +1,83 @@
+# ==== AURA_V2/app/service_registry.py ====
+
+import hashlib
+import threading
+from .zabbix_api import ZabbixService
+from .softdesk_api import SoftdeskService
+
+# Mapeia o nome da plataforma (em minúsculas) para a classe de serviço.
+PLATFORM_SERVICES = {
+    'zabbix': ZabbixService,
+    'softdesk': SoftdeskService,
+}
+
+class PlatformServiceRegistry:
+    """
+    Registo, por processo, dos serviços de plataforma indexados pelo ID da
+    DataSource. Cada serviço mantém a sua sessão HTTP e o token em cache, pelo
+    que reutilizá-lo evita um novo handshake TLS e um novo login a cada pedido.
+    """
+    def __init__(self):
+        self._services = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(datasource):
+        """Impressão digital das credenciais, para detetar edições feitas noutro processo."""
+        raw = f"{datasource.platform.lower()}:{datasource.credentials_json}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, datasource):
+        """Devolve o serviço em cache para a DataSource, criando-o se necessário."""
+        fingerprint = self._fingerprint(datasource)
+        with self._lock:
+            entry = self._services.get(datasource.id)
+            if entry and entry[0] == fingerprint:
+                return entry[1]
+
+        service_class = PLATFORM_SERVICES.get(datasource.platform.lower())
+        if service_class is None:
+            raise ValueError(f"Plataforma '{datasource.platform}' não suportada.")
+
+        # A criação (que pode incluir o login) é feita fora do lock.
+        service = service_class(datasource)
+        with self._lock:
+            entry = self._services.get(datasource.id)
+            if entry and entry[0] == fingerprint:
+                self._close(service)
+                return entry[1]
+            self._services[datasource.id] = (fingerprint, service)
+        if entry:
+            self._close(entry[1])
+        return service
+
+    def get_by_id(self, datasource_id):
+        """Igual a `get`, a partir do ID (útil em threads sem o objeto da sessão do pedido)."""
+        from .models import DataSource
+        datasource = DataSource.query.get(datasource_id)
+        if datasource is None:
+            raise ValueError(f"Fonte de dados {datasource_id} não encontrada.")
+        return self.get(datasource)
+
+    def invalidate(self, datasource_id):
+        """Descarta o serviço de uma DataSource (ex.: credenciais alteradas ou apagadas)."""
+        with self._lock:
+            entry = self._services.pop(datasource_id, None)
+        if entry:
+            self._close(entry[1])
+
+    def clear(self):
+        """Descarta todos os serviços em cache."""
+        with self._lock:
+            entries = list(self._services.values())
+            self._services.clear()
+        for _, service in entries:
+            self._close(service)
+
+    @staticmethod
+    def _close(service):
+        close = getattr(service, 'close', None)
+        if close:
+            close()
+
+service_registry = PlatformServiceRegistry()
@@ -1,22 +1,67 @@
 # ==== AURA_V2/app/softdesk_api.py ====
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import requests
-import json
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from .governor import TransientError, governor_from_config
+from . import json_stream
 
 class SoftdeskServiceError(Exception):
     """Exceção customizada para erros na API do Softdesk."""
     pass
 
+def _parse_datetime(value):
+    """Data ISO 8601 da API (com ou sem fuso; sem fuso é hora local) em datetime UTC, ou None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+def _isoformat(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ') if moment else None
+
+def normalize_ticket(record):
+    """
+    Ticket da API no formato usado pela cache e pelos coletores: datas em UTC
+    ('...Z', comparáveis como texto) e instantes de abertura/fecho em segundos.
+    """
+    created, updated = _parse_datetime(record.get('created_at')), _parse_datetime(record.get('updated_at'))
+    closed, due = _parse_datetime(record.get('closed_at')), _parse_datetime(record.get('due_at'))
+    return {
+        'id': str(record['id']),
+        'status': record.get('status'),
+        'priority': record.get('priority') or 'Sem prioridade',
+        'category': record.get('category') or 'Sem categoria',
+        'created_at': _isoformat(created),
+        'updated_at': _isoformat(updated or created) or '',
+        'closed_at': _isoformat(closed),
+        'due_at': _isoformat(due),
+        'created_ts': created.timestamp() if created else None,
+        'closed_ts': closed.timestamp() if closed else None,
+    }
+
 class SoftdeskService:
     """
-    Uma classe dedicada para toda a comunicação com a API do Softdesk.
-    Este é um exemplo de como a arquitetura funciona para diferentes plataformas.
+    Cliente da API REST do Softdesk. Mantém uma sessão HTTP persistente
+    (keep-alive) e, como o ZabbixService, um governador de pedidos por fonte de
+    dados (limite de pedidos em simultâneo e repetição de falhas passageiras).
+
+    As listagens são paginadas: a resposta traz os registos em 'data' e, ou o
+    número da última página ('meta.last_page', com as páginas seguintes pedidas
+    em paralelo), ou um cursor para a página seguinte ('next_cursor', pedidas
+    em sequência). Uma lista simples é tratada como página única.
     """
     def __init__(self, datasource):
         if datasource.platform.lower() != 'softdesk':
             raise ValueError("A fonte de dados fornecida não é do tipo 'Softdesk'.")
 
+        self.datasource_id = datasource.id
         credentials = datasource.get_credentials()
         self.url = credentials.get('url')
         self.api_token = credentials.get('token') # O serviço Softdesk procura por um 'token'.
@@ -24,30 +69,133 @@ class SoftdeskService:
         if not all([self.url, self.api_token]):
             raise ValueError("Credenciais inválidas para Softdesk. São necessários 'url' e 'token'.")
 
-    def _make_request(self, endpoint, method='GET', params=None, data=None):
-        """Método central para fazer requisições à API do Softdesk."""
-        
-        # A autenticação com token é normalmente feita através de headers.
-        headers = {
+        config = current_app.config
+        self.timeout = (config.get('SOFTDESK_CONNECT_TIMEOUT', 5), config.get('SOFTDESK_REQUEST_TIMEOUT', 30))
+        self.page_size = config.get('SOFTDESK_PAGE_SIZE', 100)
+        self.max_concurrency = max(1, int(config.get('SOFTDESK_MAX_CONCURRENCY', 4)))
+        self.governor = governor_from_config(config, prefix='SOFTDESK')
+
+        # A autenticação com token é feita através de headers.
+        self.session = requests.Session()
+        self.session.headers.update({
             'Authorization': f'Bearer {self.api_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        full_url = f"{self.url.rstrip('/')}/{endpoint}"
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Fecha as ligações mantidas pela sessão HTTP (e pelo cliente assíncrono, se usado)."""
+        self.session.close()
+        if self._async_client is not None:
+            self._async_client.close_sync()
+
+    def async_client(self):
+        """Cliente assíncrono desta fonte de dados; None se os clientes assíncronos estiverem desativados."""
+        from .async_runtime import async_http_available
+        if not async_http_available(current_app.config):
+            return None
+        with self._lock:
+            if self._async_client is None:
+                from .async_clients import AsyncSoftdeskClient
+                self._async_client = AsyncSoftdeskClient(self)
+            return self._async_client
 
+    def _send(self, full_url, method, params, data):
+        response = self.session.request(method, full_url, params=params, json=data, timeout=self.timeout)
+        response.raise_for_status()
+        return json_stream.loads(response.content) if response.content else None
+
+    def _make_request(self, endpoint, method='GET', params=None, data=None):
+        """
+        Método central para fazer requisições à API do Softdesk. Não usa o
+        contexto da aplicação, pelo que pode correr nas threads de paginação.
+        """
+        full_url = f"{self.url.rstrip('/')}/{endpoint.lstrip('/')}"
         try:
-            # Lógica de requisição aqui...
-            # response = requests.request(method, full_url, headers=headers, params=params, json=data)
-            # response.raise_for_status()
-            # return response.json()
-            
-            # Apenas para demonstração, retornamos um valor fixo.
-            print(f"SUCESSO: Conexão com Softdesk em '{full_url}' seria feita com o token.")
-            return {"status": "success", "message": "Conexão simulada com sucesso."}
-
-        except requests.exceptions.RequestException as e:
-            raise SoftdeskServiceError(f"Não foi possível conectar ao servidor Softdesk em {self.url}.")
+            return self.governor.call(self._send, full_url, method, params, data)
+        except TransientError as e:
+            raise SoftdeskServiceError(f"Não foi possível conectar ao servidor Softdesk em {self.url}: {e}")
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else '?'
+            raise SoftdeskServiceError(f"Erro {status} da API do Softdesk em '{endpoint}'.")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise SoftdeskServiceError(f"Resposta inválida do servidor Softdesk em {self.url}: {e}")
+
+    def get(self, endpoint, params=None):
+        """Método genérico para leituras da API (resposta decodificada)."""
+        return self._make_request(endpoint, params=params)
+
+    @staticmethod
+    def _page_body(body):
+        """(registos, última página, cursor seguinte) de uma resposta paginada."""
+        if isinstance(body, list):
+            return body, 1, None
+        body = body or {}
+        meta = body.get('meta') or {}
+        return body.get('data') or [], int(meta.get('last_page') or 1), body.get('next_cursor')
+
+    def iter_pages(self, endpoint, params=None):
+        """
+        Gera as páginas (listas de registos) de uma listagem, por ordem. Com
+        paginação numerada, as páginas 2..N são pedidas em paralelo (até
+        SOFTDESK_MAX_CONCURRENCY, sob o governador, ou no loop assíncrono se os
+        clientes assíncronos estiverem ativos); com cursor, em sequência.
+        """
+        params = dict(params or {}, per_page=self.page_size)
+        records, last_page, cursor = self._page_body(self._make_request(endpoint, params=dict(params, page=1)))
+        yield records
+
+        if cursor:
+            while cursor:
+                records, _, cursor = self._page_body(self._make_request(endpoint, params=dict(params, cursor=cursor)))
+                yield records
+            return
+
+        if last_page > 1:
+            client = self.async_client()
+            if client is not None:
+                from .async_runtime import iter_ordered
+                factories = (lambda page=page: client.get(endpoint, dict(params, page=page))
+                             for page in range(2, last_page + 1))
+                for body in iter_ordered(factories, client.max_concurrency):
+                    yield self._page_body(body)[0]
+                return
+            fetch = lambda page: self._page_body(self._make_request(endpoint, params=dict(params, page=page)))[0]
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='softdesk-page') as executor:
+                yield from executor.map(fetch, range(2, last_page + 1))
 
     def get_tickets(self, status='open'):
-        """Exemplo de um método que busca tickets do Softdesk."""
-        return self._make_request('tickets', params={'status': status})
\ No newline at end of file
+        """Tickets (em bruto) com o estado indicado."""
+        return [record for page in self.iter_pages('tickets', {'status': status}) for record in page]
+
+    def sync_tickets(self, cache):
+        """
+        Atualiza a cópia local dos tickets: só pede os alterados desde a marca de
+        água ('updated_since', inclusiva, para não perder alterações no mesmo
+        segundo). A marca só avança depois de todas as páginas estarem gravadas,
+        pelo que uma sincronização interrompida é repetida. Devolve o número de
+        tickets recebidos.
+        """
+        watermark = cache.watermark(self.datasource_id)
+        params = {'updated_since': watermark} if watermark else {}
+        received, newest = 0, watermark
+        for page in self.iter_pages('tickets', params):
+            tickets = [normalize_ticket(record) for record in page if record.get('id') is not None]
+            cache.store(self.datasource_id, tickets, None, time.time())
+            received += len(tickets)
+            newest = max([newest or ''] + [ticket['updated_at'] for ticket in tickets]) or None
+        cache.store(self.datasource_id, [], newest, time.time())
+        return received
+
+    def tickets_between(self, time_from, time_till):
+        """Tickets ativos entre dois instantes (segundos), a partir da cópia local sincronizada."""
+        from .ticket_cache import get_ticket_cache
+        cache = get_ticket_cache()
+        received = self.sync_tickets(cache)
+        current_app.logger.info(f"Softdesk (fonte {self.datasource_id}): {received} ticket(s) novos ou alterados.")
+        return cache.tickets_between(self.datasource_id, time_from, time_till)
@@ -6,6 +6,18 @@ document.addEventListener('DOMContentLoaded', function () {
     const hostsSelect = document.getElementById('hosts'); // O select escondido
     const modulesContainer = document.querySelector('#modules-helper-text').parentNode;
     const helperText = document.getElementById('modules-helper-text');
+    const layoutOrderInput = document.getElementById('report_layout_order');
+
+    // Guarda a ordem atual dos módulos no campo oculto enviado com o formulário
+    function syncLayoutOrder() {
+        const keys = Array.from(modulesContainer.querySelectorAll('input[name="modules"]')).map(cb => cb.value);
+        layoutOrderInput.value = keys.join(',');
+    }
+
+    // Permite reordenar os módulos arrastando-os (a ordem final do PDF segue esta ordem)
+    if (window.Sortable) {
+        Sortable.create(modulesContainer, { animation: 150, draggable: '.form-check', onSort: syncLayoutOrder });
+    }
 
     // Função para buscar Hosts quando um grupo é selecionado
     async function fetchHosts() {
@@ -93,6 +105,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     `;
                     modulesContainer.appendChild(div);
                 });
+                syncLayoutOrder();
             } else {
                 modulesContainer.innerHTML = '<div class="alert alert-warning">Nenhum módulo compatível encontrado para a seleção atual.</div>';
             }
@@ -103,7 +116,144 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    const studioForm = document.getElementById('studio-form');
+    const jobStatus = document.getElementById('report-job-status');
+    const submitButton = studioForm.querySelector('[type="submit"]');
+    const JOB_STATUS_LABELS = { queued: 'Na fila...', running: 'A gerar o relatório...' };
+
+    // Mostra uma mensagem de erro vinda do servidor como texto, nunca como HTML
+    function showError(target, message) {
+        const span = document.createElement('span');
+        span.className = 'text-danger';
+        span.textContent = message;
+        target.replaceChildren(span);
+    }
+    const estimateBox = document.getElementById('report-estimate');
+    let estimateTimer = null;
+    let estimateRequest = 0;
+    let estimateRefused = false;
+
+    // Estimativa prévia do volume e da memória do relatório (antes de o pedir)
+    async function estimateReport() {
+        const moduleKeys = Array.from(modulesContainer.querySelectorAll('input[name="modules"]:checked')).map(cb => cb.value);
+        const hostIds = Array.from(hostsSelect.selectedOptions).map(o => o.value);
+        const requestId = ++estimateRequest;
+        if (estimateRefused) {
+            estimateRefused = false;
+            submitButton.disabled = false;
+        }
+
+        if (moduleKeys.length === 0 || hostIds.length === 0) {
+            estimateBox.textContent = '';
+            return;
+        }
+        estimateBox.textContent = 'A estimar o volume do relatório...';
+
+        try {
+            const response = await fetch('/api/estimate_report', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    host_ids: hostIds,
+                    modules: moduleKeys,
+                    start_date: document.getElementById('start_date').value,
+                    end_date: document.getElementById('end_date').value
+                })
+            });
+            const data = await response.json();
+            if (requestId !== estimateRequest) return; // já há uma estimativa mais recente
+            if (!response.ok) throw new Error(data.error || response.statusText);
+
+            if (data.refused) {
+                estimateRefused = true;
+                submitButton.disabled = true;
+                showError(estimateBox, data.error);
+                return;
+            }
+            if (!data.rows) {
+                estimateBox.textContent = '';
+                return;
+            }
+            const rows = data.rows.toLocaleString('pt-PT');
+            estimateBox.textContent = `Estimativa: ~${rows} registos, ~${Math.ceil(data.memory_mb)} MB de memória.`;
+            (data.notes || []).forEach(note => {
+                const span = document.createElement('span');
+                span.className = 'text-warning';
+                span.textContent = note;
+                estimateBox.append(document.createElement('br'), span);
+            });
+        } catch (error) {
+            console.error('Erro ao estimar o relatório:', error);
+            if (requestId === estimateRequest) estimateBox.textContent = '';
+        }
+    }
+
+    // Agrupa alterações seguidas (ex.: vários checkboxes) num só pedido
+    function scheduleEstimate() {
+        clearTimeout(estimateTimer);
+        estimateTimer = setTimeout(estimateReport, 400);
+    }
+
+    // Consulta o estado do trabalho até terminar e inicia o download
+    async function pollReportJob(statusUrl) {
+        try {
+            const response = await fetch(statusUrl);
+            if (!response.ok) throw new Error(`Erro na API: ${response.statusText}`);
+            const job = await response.json();
+
+            if (job.status === 'done') {
+                jobStatus.innerHTML = `Relatório pronto. <a href="${job.download_url}">Descarregar</a>`;
+                submitButton.disabled = false;
+                window.location.href = job.download_url;
+            } else if (job.status === 'failed') {
+                showError(jobStatus, job.error);
+                submitButton.disabled = false;
+            } else {
+                jobStatus.textContent = JOB_STATUS_LABELS[job.status] || job.status;
+                setTimeout(() => pollReportJob(statusUrl), 2000);
+            }
+        } catch (error) {
+            console.error('Erro ao consultar o trabalho:', error);
+            jobStatus.innerHTML = '<span class="text-danger">Erro ao consultar o estado do relatório.</span>';
+            submitButton.disabled = false;
+        }
+    }
+
+    // Envia o formulário em segundo plano: o relatório é gerado por um worker
+    async function submitReport(event) {
+        event.preventDefault();
+        if (estimateRefused) return;
+        submitButton.disabled = true;
+        jobStatus.textContent = 'A enviar o pedido...';
+
+        try {
+            const response = await fetch(studioForm.action, {
+                method: 'POST',
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                body: new FormData(studioForm)
+            });
+            const data = await response.json();
+            if (!response.ok || data.error) {
+                showError(jobStatus, data.error || response.statusText);
+                submitButton.disabled = false;
+                return;
+            }
+            jobStatus.textContent = JOB_STATUS_LABELS[data.status] || data.status;
+            pollReportJob(data.status_url);
+        } catch (error) {
+            console.error('Erro ao pedir o relatório:', error);
+            jobStatus.innerHTML = '<span class="text-danger">Erro ao pedir o relatório.</span>';
+            submitButton.disabled = false;
+        }
+    }
+
     // Adiciona os gatilhos (event listeners)
     hostGroupsSelect.addEventListener('change', fetchHosts);
     hostsContainer.addEventListener('change', validateModules); // Valida sempre que um checkbox de host é alterado
+    studioForm.addEventListener('submit', submitReport);
+    // Reestima quando mudam os módulos, os hosts ou o período
+    modulesContainer.addEventListener('change', scheduleEstimate);
+    hostsContainer.addEventListener('change', scheduleEstimate);
+    document.getElementById('start_date').addEventListener('change', scheduleEstimate);
+    document.getElementById('end_date').addEventListener('change', scheduleEstimate);
 });
\ No newline at end of file
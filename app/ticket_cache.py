@@ -0,0 +1,92 @@
+# ==== AURA_V2/app/ticket_cache.py ====
+
+import json
+import threading
+from flask import current_app
+from .local_store import connect, instance_file
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS tickets (
+        datasource_id INTEGER NOT NULL,
+        ticket_id TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        created_ts REAL,
+        closed_ts REAL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (datasource_id, ticket_id)
+    )""",
+    'CREATE INDEX IF NOT EXISTS tickets_period ON tickets (datasource_id, created_ts)',
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        datasource_id INTEGER PRIMARY KEY,
+        watermark TEXT NOT NULL,
+        synced_at REAL NOT NULL
+    )""",
+)
+
+class TicketCache:
+    """
+    Cópia local (SQLite) dos tickets de cada fonte de dados Softdesk.
+
+    Guarda o maior 'updated_at' já recebido (a marca de água): a sincronização
+    seguinte só pede à API os tickets alterados desde então. Um ticket só é
+    substituído por uma versão com 'updated_at' igual ou mais recente.
+    """
+    def __init__(self, path):
+        self.path = path
+        with connect(self.path) as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def watermark(self, datasource_id):
+        with connect(self.path) as connection:
+            row = connection.execute('SELECT watermark FROM sync_state WHERE datasource_id = ?',
+                                     (datasource_id,)).fetchone()
+        return row['watermark'] if row else None
+
+    def store(self, datasource_id, tickets, watermark, synced_at):
+        """Grava uma página de tickets normalizados e avança a marca de água (numa transação)."""
+        with connect(self.path) as connection:
+            connection.executemany(
+                """INSERT INTO tickets (datasource_id, ticket_id, updated_at, created_ts, closed_ts, data)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (datasource_id, ticket_id) DO UPDATE SET
+                       updated_at = excluded.updated_at, created_ts = excluded.created_ts,
+                       closed_ts = excluded.closed_ts, data = excluded.data
+                   WHERE excluded.updated_at >= tickets.updated_at""",
+                [(datasource_id, ticket['id'], ticket['updated_at'], ticket['created_ts'],
+                  ticket['closed_ts'], json.dumps(ticket)) for ticket in tickets])
+            if watermark is not None:
+                connection.execute(
+                    """INSERT INTO sync_state (datasource_id, watermark, synced_at) VALUES (?, ?, ?)
+                       ON CONFLICT (datasource_id) DO UPDATE SET
+                           watermark = MAX(sync_state.watermark, excluded.watermark),
+                           synced_at = excluded.synced_at""",
+                    (datasource_id, watermark, synced_at))
+
+    def tickets_between(self, datasource_id, time_from, time_till):
+        """Tickets ativos no período: abertos antes do fim e não fechados antes do início."""
+        with connect(self.path) as connection:
+            rows = connection.execute(
+                """SELECT data FROM tickets
+                   WHERE datasource_id = ? AND created_ts < ? AND (closed_ts IS NULL OR closed_ts >= ?)""",
+                (datasource_id, time_till, time_from)).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def invalidate(self, datasource_id):
+        """Descarta os tickets de uma fonte de dados (a próxima sincronização é completa)."""
+        with connect(self.path) as connection:
+            connection.execute('DELETE FROM tickets WHERE datasource_id = ?', (datasource_id,))
+            connection.execute('DELETE FROM sync_state WHERE datasource_id = ?', (datasource_id,))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_ticket_cache():
+    """Devolve a cache de tickets da aplicação atual."""
+    path = instance_file(current_app.config.get('SOFTDESK_TICKET_CACHE_FILE', 'ticket_cache.db'))
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = TicketCache(path)
+            _caches[path] = cache
+        return cache
@@ -1,22 +1,99 @@
 # ==== AURA_V2/app/zabbix_api.py ====
 
+import threading
+import time
 import requests
 import json
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from .metrics import record_zabbix_call, get_metrics
+from .governor import TransientError, governor_from_config
+from . import json_stream
+
+# Fragmentos das mensagens devolvidas pelo Zabbix quando a sessão expirou.
+SESSION_EXPIRED_MARKERS = ('re-login', 'session terminated', 'not authorised', 'not authorized')
+
+def _count_rows(response):
+    """Número de linhas numa resposta JSON-RPC (listas de resultados)."""
+    result = response.get('result') if isinstance(response, dict) else None
+    return len(result) if isinstance(result, list) else 0
+
+def _wire_bytes(response, streamed=False):
+    """
+    Bytes recebidos pela rede (comprimidos, se for o caso). Numa resposta lida
+    em fluxo conta só o que foi lido: `response.content` leria o resto do corpo.
+    """
+    if streamed:
+        try:
+            return response.raw.tell()
+        except Exception:
+            return 0
+    try:
+        return response.raw.tell() or len(response.content)
+    except Exception:
+        return len(response.content or b'')
 
 class ZabbixServiceError(Exception):
     """Exceção customizada para erros na API do Zabbix."""
     pass
 
+def batch_results(calls, data):
+    """
+    Resultados de um lote JSON-RPC pela ordem de `calls`; as chamadas que
+    falharam surgem como instâncias de ZabbixServiceError.
+    """
+    if isinstance(data, dict):
+        # Erros globais (ex.: pedido inválido) vêm num único objeto.
+        error_msg = data.get('error', {}).get('data', 'Resposta inesperada da API do Zabbix.')
+        raise ZabbixServiceError(error_msg)
+
+    responses = {item.get('id'): item for item in data}
+    results = []
+    for index, (method, _) in enumerate(calls):
+        item = responses.get(index)
+        if item is None:
+            results.append(ZabbixServiceError(f"{method}: resposta em falta no lote."))
+        elif 'error' in item:
+            error_msg = item['error'].get('data', 'Erro desconhecido na API do Zabbix.')
+            results.append(ZabbixServiceError(f"{method}: {error_msg}"))
+        else:
+            results.append(item.get('result'))
+    return results
+
 class ZabbixService:
-    """Uma classe dedicada para toda a comunicação com a API do Zabbix."""
+    """
+    Uma classe dedicada para toda a comunicação com a API do Zabbix.
+    Mantém uma sessão HTTP persistente (keep-alive) e reutiliza o token de
+    autenticação enquanto este for válido. As instâncias são partilhadas
+    através do registo em `app.service_registry`, pelo que o governador de
+    pedidos (`app.governor`) é um por fonte de dados.
+    """
     def __init__(self, datasource):
         if datasource.platform.lower() != 'zabbix':
             raise ValueError("A fonte de dados fornecida não é do tipo 'Zabbix'.")
 
+        self.datasource_id = datasource.id
         credentials = datasource.get_credentials()
         self.url = credentials.get('url')
         self.token = credentials.get('token') # Procura por um token primeiro
+        self.user = None
+        self.password = None
+
+        self.timeout = (current_app.config.get('ZABBIX_CONNECT_TIMEOUT', 5),
+                        current_app.config.get('ZABBIX_REQUEST_TIMEOUT', 30))
+        self.governor = governor_from_config(current_app.config)
+        self.session_ttl = current_app.config.get('ZABBIX_SESSION_TTL', 600)
+        self._token_last_used = None
+        self._login_lock = threading.Lock()
+        self._async_client = None
+
+        self.session = requests.Session()
+        # Respostas comprimidas: history.get/trend.get em JSON comprimem muito bem.
+        self.session.headers.update({'Content-Type': 'application/json-rpc', 'Accept-Encoding': 'gzip, deflate'})
+        pool_size = current_app.config.get('ZABBIX_POOL_MAXSIZE', 10)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
         # Se não encontrou um token, tenta o login com user/password
         if not self.token:
@@ -29,6 +106,33 @@ class ZabbixService:
         elif not self.url:
             raise ValueError("Credenciais insuficientes. A 'url' é obrigatória.")
 
+    @property
+    def uses_login(self):
+        """Indica se o token foi obtido via user.login (e pode expirar)."""
+        return self.user is not None
+
+    def close(self):
+        """Fecha as ligações mantidas pela sessão HTTP (e pelo cliente assíncrono, se usado)."""
+        self.session.close()
+        if self._async_client is not None:
+            self._async_client.close_sync()
+
+    def async_client(self):
+        """
+        Cliente assíncrono desta fonte de dados (mesma URL, token e política de
+        repetição), para recolhas com muitos pedidos em simultâneo a partir de
+        uma só thread. None se os clientes assíncronos estiverem desativados.
+        """
+        # asyncio/aiohttp só são carregados por quem usa o cliente assíncrono.
+        from .async_runtime import async_http_available
+        if not async_http_available(current_app.config):
+            return None
+        with self._login_lock:
+            if self._async_client is None:
+                from .async_clients import AsyncZabbixClient
+                self._async_client = AsyncZabbixClient(self)
+            return self._async_client
+
     def _login(self):
         """Realiza o login na API (usado apenas se não for fornecido um token)."""
         payload = {
@@ -41,30 +145,196 @@ class ZabbixService:
         self.token = response.get('result')
         if not self.token:
             raise ZabbixServiceError("Falha na autenticação com o Zabbix. Verifique as credenciais.")
+        self._token_last_used = time.monotonic()
 
-    def _make_request(self, payload, auth_required=True):
-        """Método central para fazer requisições à API."""
-        headers = {'Content-Type': 'application/json-rpc'}
-        
-        if auth_required:
-            if not self.token:
-                raise ZabbixServiceError("Token de autenticação não encontrado ou inválido.")
-            payload['auth'] = self.token
+    def _ensure_token(self, stale_token=None):
+        """
+        Garante um token válido. Um novo login só é feito se o token atual
+        expirou por inatividade ou se é o mesmo que o servidor acabou de recusar.
+        """
+        if not self.uses_login:
+            return
+        with self._login_lock:
+            if stale_token is not None and self.token != stale_token:
+                return  # Outra thread já renovou a sessão.
+            expired = (self._token_last_used is None or
+                       time.monotonic() - self._token_last_used > self.session_ttl)
+            if stale_token is not None or expired:
+                self._login()
+
+    @staticmethod
+    def _is_session_error(error_msg):
+        message = str(error_msg).lower()
+        return any(marker in message for marker in SESSION_EXPIRED_MARKERS)
 
+    def _send(self, body, method):
+        """Um único pedido HTTP, medido (latência, bytes e linhas) em `app.metrics`."""
+        start = time.perf_counter()
+        response_bytes, data = 0, None
         try:
-            response = requests.post(self.url, headers=headers, data=json.dumps(payload), timeout=30)
+            response = self.session.post(self.url, data=body, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-            if 'error' in data:
-                error_msg = data['error'].get('data', 'Erro desconhecido na API do Zabbix.')
-                current_app.logger.error(f"Erro na API Zabbix: {error_msg}")
-                raise ZabbixServiceError(error_msg)
+            response_bytes = _wire_bytes(response)
+            data = json_stream.loads(response.content)
             return data
-        except requests.exceptions.RequestException as e:
+        finally:
+            responses = data if isinstance(data, list) else [data]
+            record_zabbix_call(self.datasource_id, method, time.perf_counter() - start,
+                               response_bytes=response_bytes,
+                               rows=sum(_count_rows(item) for item in responses),
+                               error=any(not isinstance(item, dict) or 'error' in item for item in responses))
+
+    def _on_retry(self, attempt, delay, error):
+        current_app.logger.warning(f"Falha passageira no Zabbix ({error}); "
+                                   f"tentativa {attempt} dentro de {delay:.1f}s.")
+        get_metrics().inc('aura_zabbix_retries_total', datasource=self.datasource_id)
+
+    def _post(self, payload):
+        """
+        Envia o payload (objeto ou lista JSON-RPC) e devolve a resposta decodificada.
+        O pedido passa pelo governador da fonte de dados: limite de pedidos em
+        simultâneo e repetição das falhas passageiras.
+        """
+        method = payload.get('method') if isinstance(payload, dict) else 'batch'
+        try:
+            return self.governor.call(self._send, json.dumps(payload), method, on_retry=self._on_retry)
+        except (TransientError, requests.exceptions.RequestException) as e:
             current_app.logger.error(f"Erro de conexão com o Zabbix: {e}")
             raise ZabbixServiceError(f"Não foi possível conectar ao servidor Zabbix em {self.url}.")
 
+    def _make_request(self, payload, auth_required=True, _retry=True):
+        """Método central para fazer requisições à API."""
+        if auth_required:
+            self._ensure_token()
+            if not self.token:
+                raise ZabbixServiceError("Token de autenticação não encontrado ou inválido.")
+            payload['auth'] = self.token
+
+        data = self._post(payload)
+
+        if 'error' in data:
+            error_msg = data['error'].get('data', 'Erro desconhecido na API do Zabbix.')
+            if auth_required and _retry and self.uses_login and self._is_session_error(error_msg):
+                current_app.logger.info("Sessão Zabbix expirada. A renovar o login...")
+                self._ensure_token(stale_token=payload.get('auth'))
+                return self._make_request(payload, auth_required, _retry=False)
+            current_app.logger.error(f"Erro na API Zabbix: {error_msg}")
+            raise ZabbixServiceError(error_msg)
+
+        if auth_required:
+            self._token_last_used = time.monotonic()
+        return data
+
     def get(self, method, params):
         """Método genérico para chamadas 'get' da API."""
         payload = {"jsonrpc": "2.0", "method": method, "params": params, "id": 1}
-        return self._make_request(payload).get('result')
\ No newline at end of file
+        return self._make_request(payload).get('result')
+
+    def iter_result(self, method, params):
+        """
+        Igual a `get` para métodos que devolvem listas (history.get, trend.get...),
+        mas gera as linhas à medida que são decodificadas: o corpo da resposta
+        nunca fica inteiro em memória, nem em bytes nem como objetos. Se o ijson
+        não estiver instalado, decodifica a resposta de uma vez.
+        """
+        if not json_stream.can_stream():
+            yield from self.get(method, params) or []
+            return
+        yield from self._stream_request(method, params)
+
+    def _open_stream(self, body):
+        response = self.session.post(self.url, data=body, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        # O urllib3 só descomprime em read() se isto estiver ativo.
+        response.raw.decode_content = True
+        return response
+
+    def _stream_request(self, method, params, _retry=True):
+        """
+        Pedido com a resposta lida em fluxo. O governador limita os pedidos até à
+        chegada dos cabeçalhos: o frontend do Zabbix (PHP) só começa a enviar a
+        resposta depois de a ter gerado, pelo que é aí que está o trabalho do servidor.
+        """
+        self._ensure_token()
+        if not self.token:
+            raise ZabbixServiceError("Token de autenticação não encontrado ou inválido.")
+        token = self.token
+        payload = {"jsonrpc": "2.0", "method": method, "params": params, "id": 1, "auth": token}
+
+        start = time.perf_counter()
+        response, rows, failed, renew = None, 0, False, False
+        try:
+            try:
+                response = self.governor.call(self._open_stream, json.dumps(payload), on_retry=self._on_retry)
+            except (TransientError, requests.exceptions.RequestException) as e:
+                failed = True
+                current_app.logger.error(f"Erro de conexão com o Zabbix: {e}")
+                raise ZabbixServiceError(f"Não foi possível conectar ao servidor Zabbix em {self.url}.")
+            try:
+                for row in json_stream.iter_rpc_result(response.raw):
+                    rows += 1
+                    yield row
+            except json_stream.JsonRpcError as e:
+                failed = True
+                error_msg = e.error.get('data', 'Erro desconhecido na API do Zabbix.')
+                if _retry and self.uses_login and self._is_session_error(error_msg):
+                    current_app.logger.info("Sessão Zabbix expirada. A renovar o login...")
+                    self._ensure_token(stale_token=token)
+                    renew = True
+                else:
+                    current_app.logger.error(f"Erro na API Zabbix: {error_msg}")
+                    raise ZabbixServiceError(error_msg)
+            except Exception as e:
+                failed = True
+                current_app.logger.error(f"Resposta do Zabbix interrompida ou inválida ({method}): {e}")
+                raise ZabbixServiceError(f"Resposta inválida do servidor Zabbix em {self.url}.")
+        finally:
+            record_zabbix_call(self.datasource_id, method, time.perf_counter() - start,
+                               response_bytes=_wire_bytes(response, streamed=True) if response is not None else 0,
+                               rows=rows, error=failed)
+            if response is not None:
+                response.close()
+
+        if renew:
+            yield from self._stream_request(method, params, _retry=False)
+            return
+        self._token_last_used = time.monotonic()
+
+    def batch(self, calls, raise_on_error=True, _retry=True):
+        """
+        Envia várias chamadas num único pedido HTTP (batch JSON-RPC).
+
+        `calls` é uma lista de tuplos (method, params). Devolve os resultados na
+        mesma ordem. Com `raise_on_error=False`, as chamadas que falharam surgem
+        na lista como instâncias de ZabbixServiceError em vez de interromperem o lote.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        self._ensure_token()
+        if not self.token:
+            raise ZabbixServiceError("Token de autenticação não encontrado ou inválido.")
+        token = self.token
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": index, "auth": token}
+            for index, (method, params) in enumerate(calls)
+        ]
+
+        results = batch_results(calls, self._post(payload))
+        errors = [r for r in results if isinstance(r, ZabbixServiceError)]
+        if errors and _retry and self.uses_login and any(self._is_session_error(e) for e in errors):
+            current_app.logger.info("Sessão Zabbix expirada. A renovar o login...")
+            self._ensure_token(stale_token=token)
+            return self.batch(calls, raise_on_error, _retry=False)
+
+        self._token_last_used = time.monotonic()
+        for error in errors:
+            current_app.logger.error(f"Erro na API Zabbix (lote): {error}")
+        if errors and raise_on_error:
+            raise errors[0]
+        return results
@@ -0,0 +1 @@
+# ==== AURA_V2/benchmarks/__init__.py ====
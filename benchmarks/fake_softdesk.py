@@ -0,0 +1,140 @@
+# ==== AURA_V2/benchmarks/fake_softdesk.py ====
+"""
+Servidor HTTP que imita a API REST de tickets do Softdesk com dados
+sintéticos e determinísticos, para testar o SoftdeskService e o coletor de
+tickets sem um Softdesk real.
+
+Implementa GET /tickets com 'page'/'per_page' (resposta com 'meta.last_page')
+ou, com `--cursor`, paginação por 'next_cursor'; aceita os filtros
+'updated_since' e 'status'. `touch()` altera tickets (novo 'updated_at') para
+simular atividade entre duas sincronizações.
+
+Uso isolado:
+    python -m benchmarks.fake_softdesk --tickets 5000 --port 8901
+"""
+
+import argparse
+import json
+import math
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+TOKEN = 'fake-softdesk-token'
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+PRIORITIES = ('Baixa', 'Média', 'Alta', 'Crítica')
+SLA_HOURS = {'Baixa': 72, 'Média': 24, 'Alta': 8, 'Crítica': 4}
+CATEGORIES = ('Rede', 'Servidores', 'Backup', 'Acessos', 'Impressoras', 'E-mail')
+
+def _iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class SyntheticSoftdesk:
+    """Tickets sintéticos (um a cada `interval_minutes` a partir de 2024-01-01)."""
+    def __init__(self, tickets=1000, interval_minutes=30, cursor=False):
+        self.cursor = cursor
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.tickets = [self._ticket(number, interval_minutes) for number in range(1, tickets + 1)]
+
+    @staticmethod
+    def _ticket(number, interval_minutes):
+        priority = PRIORITIES[number % len(PRIORITIES)]
+        created = START + timedelta(minutes=number * interval_minutes)
+        # Duração determinística entre 0,5 e ~1,5x o prazo do SLA; 1 em cada 10 continua aberto.
+        hours = SLA_HOURS[priority] * (1 + math.sin(number)) * 0.75 + 0.5
+        closed = None if number % 10 == 0 else created + timedelta(hours=hours)
+        return {
+            'id': number, 'subject': f'Ticket {number}', 'priority': priority,
+            'category': CATEGORIES[number % len(CATEGORIES)],
+            'status': 'open' if closed is None else 'closed',
+            'created_at': _iso(created), 'updated_at': _iso(closed or created),
+            'closed_at': _iso(closed) if closed else None,
+            'due_at': _iso(created + timedelta(hours=SLA_HOURS[priority])),
+        }
+
+    def touch(self, count=10, when=None):
+        """Fecha/atualiza os primeiros `count` tickets abertos, com 'updated_at' = `when`."""
+        when = _iso(when or datetime.now(timezone.utc))
+        with self._lock:
+            for ticket in [t for t in self.tickets if t['closed_at'] is None][:count]:
+                ticket.update({'status': 'closed', 'closed_at': when, 'updated_at': when})
+
+    def list_tickets(self, query):
+        with self._lock:
+            self.calls['tickets'] += 1
+            tickets = self.tickets
+            if query.get('updated_since'):
+                tickets = [t for t in tickets if t['updated_at'] >= query['updated_since']]
+            if query.get('status'):
+                tickets = [t for t in tickets if t['status'] == query['status']]
+        per_page = int(query.get('per_page') or 100)
+        if self.cursor:
+            offset = int(query.get('cursor') or 0)
+            page = tickets[offset:offset + per_page]
+            next_offset = offset + per_page
+            return {'data': page, 'next_cursor': str(next_offset) if next_offset < len(tickets) else None}
+        page_number = int(query.get('page') or 1)
+        last_page = max(1, -(-len(tickets) // per_page))
+        offset = (page_number - 1) * per_page
+        return {'data': tickets[offset:offset + per_page],
+                'meta': {'current_page': page_number, 'last_page': last_page, 'total': len(tickets)}}
+
+    def stats(self, reset=False):
+        with self._lock:
+            result = {'calls': dict(self.calls), 'total_calls': sum(self.calls.values())}
+            if reset:
+                self.calls.clear()
+        return result
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, status=200):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        softdesk = self.server.softdesk
+        url = urlparse(self.path)
+        if url.path.startswith('/stats'):
+            return self._send(softdesk.stats(reset='reset' in url.query))
+        if self.headers.get('Authorization') != f'Bearer {TOKEN}':
+            return self._send({'error': 'Não autorizado.'}, status=401)
+        if url.path.rstrip('/').endswith('/tickets'):
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            return self._send(softdesk.list_tickets(query))
+        self.send_error(404)
+
+def start_server(tickets=1000, cursor=False, host='127.0.0.1', port=0):
+    """Arranca o servidor numa thread e devolve-o (URL base da API em `server.url`)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.softdesk = SyntheticSoftdesk(tickets=tickets, cursor=cursor)
+    server.url = f'http://{host}:{server.server_port}/api/v1'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor Softdesk sintético para testes.')
+    parser.add_argument('--tickets', type=int, default=1000)
+    parser.add_argument('--cursor', action='store_true', help='Paginação por cursor em vez de páginas numeradas.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    args = parser.parse_args()
+    server = start_server(args.tickets, args.cursor, args.host, args.port)
+    print(f"Softdesk sintético com {args.tickets} tickets em {server.url} (token '{TOKEN}', Ctrl+C para terminar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
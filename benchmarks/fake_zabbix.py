@@ -0,0 +1,214 @@
+# ==== AURA_V2/benchmarks/fake_zabbix.py ====
+"""
+Servidor JSON-RPC que imita a API do Zabbix com dados sintéticos e
+determinísticos, para medir a geração de relatórios sem um Zabbix real.
+
+Implementa user.login, hostgroup.get, host.get, item.get, history.get e
+trend.get (incluindo pedidos em lote). Cada host tem um item de CPU
+('system.cpu.util') recolhido a cada `delay` segundos; os valores dependem
+apenas do item e do instante, pelo que duas execuções devolvem o mesmo.
+
+Uso isolado:
+    python -m benchmarks.fake_zabbix --hosts 100 --port 8900
+"""
+
+import argparse
+import json
+import math
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIRST_HOST_ID = 10000
+GROUPS_PER_SERVER = 10
+TREND_PERIOD = 3600
+
+class FakeZabbixError(Exception):
+    """Erro devolvido ao cliente no campo 'error' da resposta JSON-RPC."""
+    pass
+
+class SyntheticZabbix:
+    """Dados sintéticos e despacho dos métodos JSON-RPC."""
+    def __init__(self, hosts=10, delay=60):
+        self.host_count = hosts
+        self.delay = delay
+        self.calls = Counter()
+        self.response_bytes = 0
+        self._lock = threading.Lock()
+
+    # --- Dados ---
+    def host_ids(self):
+        return [str(FIRST_HOST_ID + index) for index in range(self.host_count)]
+
+    @staticmethod
+    def item_id(host_id):
+        return str(int(host_id) * 10)
+
+    @staticmethod
+    def value(item_id, clock):
+        """Valor determinístico entre 5 e 95 (ciclo diário com desfasamento por item)."""
+        item = int(item_id)
+        return 50 + 35 * math.sin(clock / 13751 + item) + 10 * math.sin(clock / 600 + item * 7)
+
+    def _group_of(self, host_id):
+        return str(1 + (int(host_id) - FIRST_HOST_ID) % GROUPS_PER_SERVER)
+
+    def _selected_hosts(self, params):
+        host_ids = self.host_ids()
+        if params.get('hostids'):
+            wanted = {str(host_id) for host_id in _as_list(params['hostids'])}
+            host_ids = [host_id for host_id in host_ids if host_id in wanted]
+        if params.get('groupids'):
+            groups = {str(group_id) for group_id in _as_list(params['groupids'])}
+            host_ids = [host_id for host_id in host_ids if self._group_of(host_id) in groups]
+        return host_ids
+
+    # --- Métodos da API ---
+    def user_login(self, params):
+        return 'fake-session-token'
+
+    def hostgroup_get(self, params):
+        return [{'groupid': str(group), 'name': f'Grupo {group}'} for group in range(1, GROUPS_PER_SERVER + 1)]
+
+    def host_get(self, params):
+        return _limit([{'hostid': host_id, 'name': f'host-{host_id}'} for host_id in self._selected_hosts(params)], params)
+
+    def item_get(self, params):
+        search = params.get('search', {}).get('key_')
+        if search and not any(pattern in 'system.cpu.util' for pattern in _as_list(search)):
+            return []
+        items = [{'itemid': self.item_id(host_id), 'hostid': host_id, 'name': 'CPU utilization',
+                  'key_': 'system.cpu.util', 'delay': f'{self.delay}s', 'value_type': '0'}
+                 for host_id in self._selected_hosts(params)]
+        if params.get('itemids'):
+            wanted = {str(item_id) for item_id in _as_list(params['itemids'])}
+            items = [item for item in items if item['itemid'] in wanted]
+        return _limit(items, params)
+
+    def _known_items(self, params):
+        known = {self.item_id(host_id) for host_id in self.host_ids()}
+        return sorted((str(item_id) for item_id in _as_list(params.get('itemids', [])) if str(item_id) in known), key=int)
+
+    def history_get(self, params):
+        """Histórico ordenado por (clock, itemid); gera só as linhas dentro do 'limit'."""
+        item_ids = self._known_items(params)
+        time_from, time_till = int(params.get('time_from', 0)), int(params.get('time_till', 0))
+        limit = params.get('limit')
+        rows = []
+        if not item_ids:
+            return rows
+        clock = -(-time_from // self.delay) * self.delay
+        while clock <= time_till:
+            for item_id in item_ids:
+                rows.append({'itemid': item_id, 'clock': str(clock),
+                             'value': f'{self.value(item_id, clock):.4f}', 'ns': '0'})
+            if limit and len(rows) >= int(limit):
+                return rows[:int(limit)]
+            clock += self.delay
+        return rows
+
+    def trend_get(self, params):
+        """Agregados horários coerentes com o histórico (num = amostras por hora)."""
+        item_ids = self._known_items(params)
+        time_from, time_till = int(params.get('time_from', 0)), int(params.get('time_till', 0))
+        samples = max(1, TREND_PERIOD // self.delay)
+        rows = []
+        clock = -(-time_from // TREND_PERIOD) * TREND_PERIOD
+        while clock <= time_till:
+            for item_id in item_ids:
+                average = self.value(item_id, clock + TREND_PERIOD // 2)
+                rows.append({'itemid': item_id, 'clock': str(clock), 'num': str(samples),
+                             'value_min': f'{average - 8:.4f}', 'value_avg': f'{average:.4f}',
+                             'value_max': f'{average + 8:.4f}'})
+            clock += TREND_PERIOD
+        return _limit(rows, params)
+
+    def dispatch(self, request):
+        """Responde a um único pedido JSON-RPC."""
+        method = request.get('method', '')
+        with self._lock:
+            self.calls[method] += 1
+        handler = getattr(self, method.replace('.', '_'), None)
+        try:
+            if handler is None:
+                raise FakeZabbixError(f'Método {method} não implementado.')
+            if method != 'user.login' and not request.get('auth'):
+                raise FakeZabbixError('Not authorised.')
+            return {'jsonrpc': '2.0', 'result': handler(request.get('params') or {}), 'id': request.get('id')}
+        except FakeZabbixError as e:
+            return {'jsonrpc': '2.0', 'error': {'code': -32602, 'message': 'Invalid params.', 'data': str(e)},
+                    'id': request.get('id')}
+
+    def stats(self, reset=False):
+        """Chamadas por método e bytes enviados desde o último reset."""
+        with self._lock:
+            result = {'calls': dict(self.calls), 'total_calls': sum(self.calls.values()),
+                      'response_bytes': self.response_bytes}
+            if reset:
+                self.calls.clear()
+                self.response_bytes = 0
+        return result
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def _limit(rows, params):
+    limit = params.get('limit')
+    return rows[:int(limit)] if limit else rows
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type='application/json'):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+    def do_POST(self):
+        zabbix = self.server.zabbix
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if isinstance(payload, list):
+            body = [zabbix.dispatch(request) for request in payload]
+        else:
+            body = zabbix.dispatch(payload)
+        sent = self._send(body)
+        with zabbix._lock:
+            zabbix.response_bytes += sent
+
+    def do_GET(self):
+        # Endpoint auxiliar (fora da API do Zabbix) para o harness ler os contadores.
+        if self.path.startswith('/stats'):
+            self._send(self.server.zabbix.stats(reset='reset' in self.path))
+        else:
+            self.send_error(404)
+
+def start_server(hosts=10, delay=60, host='127.0.0.1', port=0):
+    """Arranca o servidor numa thread e devolve-o (URL em `server.url`)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.zabbix = SyntheticZabbix(hosts=hosts, delay=delay)
+    server.url = f'http://{host}:{server.server_port}/api_jsonrpc.php'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor Zabbix sintético para benchmarks.')
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--delay', type=int, default=60, help='Intervalo de recolha dos itens, em segundos.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+    server = start_server(args.hosts, args.delay, args.host, args.port)
+    print(f'Zabbix sintético com {args.hosts} hosts em {server.url} (Ctrl+C para terminar)')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# ==== AURA_V2/benchmarks/import_time.py ====
+"""
+Mede o arranque do processo web (importar `app` e chamar `create_app`) com
+`python -X importtime`, e garante que a pilha de relatórios (pandas, numpy,
+matplotlib, seaborn, xhtml2pdf, PyPDF2) não é carregada por ele: essas
+bibliotecas só devem entrar no worker ou no primeiro relatório.
+
+Exemplos:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --update-baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.report_benchmark import DEFAULT_BASELINE, ROOT_DIR
+
+BASELINE_KEY = 'import:web'
+# Módulos pesados que o arranque do processo web não pode importar.
+FORBIDDEN = ('pandas', 'numpy', 'matplotlib', 'seaborn', 'xhtml2pdf', 'PyPDF2', 'reportlab')
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app('testing')
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'startup_seconds': round(elapsed, 3),
+    'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'modules': sorted({name.split('.')[0] for name in sys.modules}),
+}))
+"""
+
+def parse_importtime(stderr):
+    """{pacote de topo: maior tempo cumulativo em ms} a partir da saída de -X importtime."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Agrupa pelo pacote de topo; o tempo cumulativo do pacote já inclui os submódulos.
+        package = name.strip().split('.')[0]
+        totals[package] = max(totals.get(package, 0), int(cumulative) / 1000)
+    return totals
+
+def measure(runs=3):
+    """Melhor de `runs` arranques (cada um num processo novo)."""
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+                                   cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['top_imports_ms'] = dict(sorted(parse_importtime(completed.stderr).items(),
+                                               key=lambda kv: -kv[1])[:10])
+        if best is None or result['startup_seconds'] < best['startup_seconds']:
+            best = result
+    loaded = set(best.pop('modules'))
+    best['forbidden_loaded'] = [name for name in FORBIDDEN if name in loaded]
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação e memória do arranque do processo web.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"Arranque: {result['startup_seconds']:.3f}s, RSS {result['rss_mb']:.1f} MB")
+    for name, ms in result['top_imports_ms'].items():
+        print(f"  {name:<24}{ms:>10.1f} ms")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        baseline[BASELINE_KEY] = {key: result[key] for key in ('startup_seconds', 'rss_mb')}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'Baseline atualizada em {args.baseline}.')
+
+    problems = [f"o arranque importa {name}" for name in result['forbidden_loaded']]
+    reference = baseline.get(BASELINE_KEY, {})
+    for metric in ('startup_seconds', 'rss_mb'):
+        if reference.get(metric) and result[metric] > reference[metric] * (1 + args.tolerance):
+            problems.append(f"{metric} {result[metric]} > {reference[metric]} (+{args.tolerance:.0%})")
+    for problem in problems:
+        print(f'REGRESSÃO: {problem}')
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# ==== AURA_V2/benchmarks/report_benchmark.py ====
+"""
+Benchmark de ponta a ponta da geração de relatórios (ReportGenerator) contra o
+Zabbix sintético de `benchmarks.fake_zabbix`. Corre sem rede externa.
+
+Cada cenário (N hosts x D dias, com os clientes HTTP síncronos ou assíncronos)
+corre num processo próprio, para que o pico de memória (RSS) seja o do cenário
+e não o acumulado. São registados o tempo de
+parede, o pico de RSS e o número de chamadas ao Zabbix, comparados depois com
+uma baseline guardada.
+
+Exemplos:
+    python -m benchmarks.report_benchmark
+    python -m benchmarks.report_benchmark --hosts 10,100 --days 1,7 --output resultados.json
+    python -m benchmarks.report_benchmark --http async
+    python -m benchmarks.report_benchmark --update-baseline
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Data final fixa: os dados sintéticos e o volume pedido não dependem do dia em que se corre.
+END_DATE = date(2024, 1, 31)
+# Variantes dos clientes HTTP: 'sync' (requests) e 'async' (asyncio + aiohttp).
+HTTP_MODES = ('sync', 'async')
+# Métricas comparadas com a baseline, com tolerância; as chamadas ao Zabbix não podem aumentar.
+COMPARED = ('wall_seconds', 'peak_rss_mb', 'render_peak_rss_mb')
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+def _mode_list(value):
+    modes = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [mode for mode in modes if mode not in HTTP_MODES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"modo HTTP desconhecido: {', '.join(unknown)}")
+    return modes
+
+def scenario_name(hosts, days, http='sync'):
+    return f'{hosts}h_{days}d_{http}'
+
+def run_scenario(url, hosts, days, modules, warm_cache=False, http='sync'):
+    """Gera um relatório completo no processo atual e devolve as medições."""
+    sys.path.insert(0, ROOT_DIR)
+    from app import create_app, db
+    from app.async_runtime import async_http_available
+    from app.models import Client, DataSource
+    from app.render_pool import shutdown_render_pool
+
+    workdir = tempfile.mkdtemp(prefix='aura-bench-')
+    app = create_app('testing')
+    app.config.update(
+        ARTIFACT_DIR=os.path.join(workdir, 'reports'),
+        HISTORY_CACHE_ENABLED=warm_cache,
+        HISTORY_CACHE_FILE=os.path.join(workdir, 'history_cache.db'),
+        METADATA_CACHE_FILE=os.path.join(workdir, 'metadata_cache.db'),
+        CAPABILITY_INDEX_FILE=os.path.join(workdir, 'capability_cache.db'),
+        METRICS_FILE=os.path.join(workdir, 'metrics.db'),
+        CHART_CACHE_MAX_MB=0,
+        ASYNC_HTTP_ENABLED=http == 'async',
+    )
+    if http == 'async' and not async_http_available(app.config):
+        raise RuntimeError('Os clientes assíncronos não estão disponíveis (aiohttp não instalado).')
+    from app.report_generator import ReportGenerator
+
+    with app.app_context():
+        db.create_all()
+        client = Client(name='Benchmark')
+        db.session.add(client)
+        db.session.commit()
+        datasource = DataSource(client_id=client.id, platform='Zabbix',
+                                credentials_json=json.dumps({'url': url, 'user': 'bench', 'password': 'bench'}))
+        db.session.add(datasource)
+        db.session.commit()
+
+        report_config = {
+            'report_name': f'Benchmark {scenario_name(hosts, days, http)}',
+            'modules': modules,
+            'hosts': [str(10000 + index) for index in range(hosts)],
+            'start_date': (END_DATE - timedelta(days=days)).isoformat(),
+            'end_date': END_DATE.isoformat(),
+        }
+        if warm_cache:
+            ReportGenerator(client, report_config).generate()
+        _read_stats(url, reset=True)
+
+        start = time.perf_counter()
+        pdf_path = ReportGenerator(client, report_config).generate()
+        wall_seconds = time.perf_counter() - start
+        stats = _read_stats(url)
+
+    shutdown_render_pool()
+    # ru_maxrss vem em KiB no Linux. RUSAGE_CHILDREN dá o maior dos processos de
+    # renderização (já terminados pelo shutdown acima).
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    render_peak_kib = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        'hosts': hosts, 'days': days, 'http': http,
+        'ok': bool(pdf_path),
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_rss_mb': round(peak_kib / 1024, 1),
+        'render_peak_rss_mb': round(render_peak_kib / 1024, 1),
+        'zabbix_calls': stats['total_calls'],
+        'zabbix_calls_by_method': stats['calls'],
+        'zabbix_response_mb': round(stats['response_bytes'] / 1024 / 1024, 2),
+        'pdf_bytes': os.path.getsize(pdf_path) if pdf_path else 0,
+    }
+
+def _read_stats(url, reset=False):
+    stats_url = url.rsplit('/', 1)[0] + '/stats' + ('?reset' if reset else '')
+    with urllib.request.urlopen(stats_url) as response:
+        return json.loads(response.read())
+
+def run_matrix(host_counts, day_counts, modules, delay, warm_cache, http_modes=HTTP_MODES):
+    """Corre cada cenário num subprocesso, contra um Zabbix sintético com o maior número de hosts."""
+    from benchmarks.fake_zabbix import start_server
+
+    server = start_server(hosts=max(host_counts), delay=delay)
+    results = {}
+    try:
+        for hosts in host_counts:
+            for days in day_counts:
+                for http in http_modes:
+                    name = scenario_name(hosts, days, http)
+                    print(f'-> {name} ...', flush=True)
+                    command = [sys.executable, '-m', 'benchmarks.report_benchmark', '--scenario',
+                               '--url', server.url, '--hosts', str(hosts), '--days', str(days),
+                               '--modules', ','.join(modules), '--http', http]
+                    if warm_cache:
+                        command.append('--warm-cache')
+                    completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+                    if completed.returncode != 0:
+                        print(completed.stderr[-2000:], file=sys.stderr)
+                        results[name] = {'hosts': hosts, 'days': days, 'http': http, 'ok': False}
+                        continue
+                    results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        server.shutdown()
+    return results
+
+def compare(results, baseline, tolerance):
+    """Lista de regressões face à baseline (tempo/memória acima da tolerância ou mais chamadas)."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not result.get('ok'):
+            if not result.get('ok'):
+                regressions.append(f'{name}: o relatório não foi gerado')
+            continue
+        for metric in COMPARED:
+            if reference.get(metric) and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {result[metric]} > {reference[metric]} (+{tolerance:.0%})')
+        if reference.get('zabbix_calls') is not None and result['zabbix_calls'] > reference['zabbix_calls']:
+            regressions.append(f"{name}: zabbix_calls {result['zabbix_calls']} > {reference['zabbix_calls']}")
+    return regressions
+
+def print_table(results, baseline):
+    header = f"{'cenário':<18}{'tempo (s)':>12}{'base':>10}{'RSS (MB)':>11}{'base':>10}{'chamadas':>10}{'base':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        reference = baseline.get(name, {})
+        if not result.get('ok'):
+            print(f'{name:<18}{"falhou":>12}')
+            continue
+        print(f"{name:<18}{result['wall_seconds']:>12.2f}{reference.get('wall_seconds', '-'):>10}"
+              f"{result['peak_rss_mb']:>11.1f}{reference.get('peak_rss_mb', '-'):>10}"
+              f"{result['zabbix_calls']:>10}{reference.get('zabbix_calls', '-'):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da geração de relatórios com um Zabbix sintético.')
+    parser.add_argument('--hosts', default='10,100,1000', help='Números de hosts, separados por vírgulas.')
+    parser.add_argument('--days', default='1,7,30', help='Períodos em dias, separados por vírgulas.')
+    parser.add_argument('--modules', default='cpu', help='Módulos do relatório, separados por vírgulas.')
+    parser.add_argument('--delay', type=int, default=60, help='Intervalo de recolha dos itens sintéticos (s).')
+    parser.add_argument('--http', type=_mode_list, default=list(HTTP_MODES),
+                        help='Clientes HTTP a medir (sync, async), separados por vírgulas.')
+    parser.add_argument('--warm-cache', action='store_true', help='Mede uma segunda geração, com a cache de histórico cheia.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Margem aceite face à baseline (0.25 = 25%%).')
+    parser.add_argument('--output', help='Ficheiro JSON onde guardar os resultados.')
+    parser.add_argument('--update-baseline', action='store_true', help='Grava os resultados como nova baseline.')
+    # Uso interno: corre um único cenário e escreve o resultado em JSON no stdout.
+    parser.add_argument('--scenario', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    modules = [module.strip() for module in args.modules.split(',') if module.strip()]
+
+    if args.scenario:
+        result = run_scenario(args.url, int(args.hosts), int(args.days), modules, args.warm_cache, args.http[0])
+        print(json.dumps(result))
+        return 0
+
+    results = run_matrix(_int_list(args.hosts), _int_list(args.days), modules, args.delay, args.warm_cache, args.http)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f'Baseline atualizada em {args.baseline}.')
+        return 0
+    if not baseline:
+        print('Sem baseline para comparar (use --update-baseline para a criar).')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSÃO: {regression}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,12 +7,103 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     LOG_FILE = 'app.log'
 
+    # Comunicação com o Zabbix
+    ZABBIX_REQUEST_TIMEOUT = 30     # segundos de espera pela resposta de um pedido HTTP
+    ZABBIX_CONNECT_TIMEOUT = 5      # segundos para estabelecer a ligação
+    ZABBIX_SESSION_TTL = 600        # segundos de inatividade até renovar o login
+    ZABBIX_POOL_MAXSIZE = 10        # ligações keep-alive por fonte de dados
+
+    # Governador de pedidos por fonte de dados (limite adaptativo e repetições)
+    ZABBIX_MAX_CONCURRENCY = 8      # pedidos em simultâneo (teto do limite adaptativo)
+    ZABBIX_MIN_CONCURRENCY = 1
+    ZABBIX_TARGET_LATENCY = 10.0    # acima disto (s), o pedido conta como sinal de sobrecarga
+    ZABBIX_MAX_RETRIES = 3          # repetições de falhas passageiras (ligação, timeout, 429/5xx)
+    ZABBIX_BACKOFF_BASE = 0.5       # espera base (s) da repetição exponencial com jitter
+    ZABBIX_BACKOFF_MAX = 30.0
+
+    # Clientes assíncronos (asyncio + aiohttp): muitos pedidos em simultâneo numa só thread
+    ASYNC_HTTP_ENABLED = True       # False: usa sempre os clientes síncronos
+    # (os pedidos assíncronos contam para o mesmo limite ZABBIX_/SOFTDESK_MAX_CONCURRENCY do governador)
+    ZABBIX_ASYNC_PREFETCH = 8       # janelas em curso por série (cada uma com no máximo 2 páginas em memória)
+
+    # Comunicação com o Softdesk (tickets)
+    SOFTDESK_REQUEST_TIMEOUT = 30
+    SOFTDESK_CONNECT_TIMEOUT = 5
+    SOFTDESK_PAGE_SIZE = 100        # registos por página das listagens
+    SOFTDESK_MAX_CONCURRENCY = 4    # páginas pedidas em simultâneo (e teto do governador)
+    SOFTDESK_TICKET_CACHE_FILE = 'ticket_cache.db'  # cópia local dos tickets, atualizada por 'updated_at'
+
+    # Busca de histórico em blocos
+    HISTORY_WINDOW_SECONDS = 86400  # tamanho de cada janela de tempo
+    HISTORY_ITEM_CHUNK = 100        # itens por pedido history.get
+    HISTORY_PAGE_LIMIT = 50000      # registos por página dentro de uma janela
+    ZABBIX_STREAM_BATCH_ROWS = 10000  # linhas entregues de cada vez ao ler uma página em fluxo (ijson)
+    TRENDS_MIN_PERIOD_SECONDS = 3 * 86400  # a partir daqui usa trends em vez de histórico
+    TRENDS_WINDOW_SECONDS = 30 * 86400     # janelas maiores: trends têm 1 linha/hora por item
+
+    # Cache local de histórico/trends (SQLite em 'instance/')
+    HISTORY_CACHE_ENABLED = True
+    HISTORY_CACHE_FILE = 'history_cache.db'
+    HISTORY_CACHE_BUCKET_SECONDS = 86400   # granularidade dos baldes guardados
+    HISTORY_CACHE_RECENT_SECONDS = 3600    # baldes mais recentes do que isto são sempre renovados
+    HISTORY_CACHE_MAX_MB = 1024            # acima disto, despeja os baldes menos usados
+
+    # Cache de metadados (grupos de hosts, hosts) partilhada entre workers
+    METADATA_CACHE_FILE = 'metadata_cache.db'
+    METADATA_CACHE_TTL = 300               # segundos em que o valor é servido sem atualizar
+    METADATA_CACHE_STALE_TTL = 3600        # depois do TTL, serve o valor antigo e atualiza em segundo plano
+
+    # Métricas (Prometheus em /admin/metrics)
+    METRICS_FILE = 'metrics.db'
+    METRICS_FLUSH_SECONDS = 15  # intervalo mínimo entre gravações das métricas do processo web (depois dos pedidos)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # permite a recolha sem sessão: 'Authorization: Bearer <token>'
+
+    # Índice de capacidades por host (validação de módulos sem consultas ao vivo)
+    CAPABILITY_INDEX_FILE = 'capability_cache.db'
+    CAPABILITY_INDEX_TTL = 3600            # idade máxima da entrada de um host antes de ser reindexado
+    CAPABILITY_INDEX_REBUILD_SECONDS = 86400  # intervalo entre reconstruções completas em segundo plano
+
+    # Geração de relatórios
+    REPORT_IO_WORKERS = 4           # threads para a coleta (I/O) dos módulos
+    REPORT_RENDER_PROCESSES = 2     # processos para gráficos e PDF (0 = na própria thread)
+    REPORT_RENDER_START_METHOD = 'spawn'
+    CHART_IMAGE_FORMAT = 'png'      # 'png' ou 'svg'
+    CHART_CACHE_MAX_MB = 64         # cache de gráficos em memória (0 = desativada)
+    PDF_ASSEMBLY_MODE = 'single_pass'  # ou 'parts' (secções convertidas em paralelo e juntas em memória)
+    REPORT_JOB_TIMEOUT = 3600       # segundos até um trabalho 'running' ser dado como perdido
+
+    # Estimativa prévia e limites de memória (app/preflight.py)
+    REPORT_MAX_ROWS = 50_000_000    # registos por relatório; acima disto usa trends ou recusa
+    REPORT_MAX_MEMORY_MB = 1024     # pico estimado por relatório; acima disto lê em fluxo ou recusa
+    PREFLIGHT_DEFAULT_DELAY = 60    # intervalo assumido para itens sem 'delay' utilizável (macros, trappers)
+    REPORT_TRACK_MEMORY = True      # mede o pico de memória de cada trabalho com tracemalloc (com algum custo de CPU)
+
+    # Armazém de relatórios gerados
+    ARTIFACT_DIR = 'relatorios_gerados'
+    ARTIFACT_FRESHNESS_SECONDS = 6 * 3600  # pedidos idênticos dentro desta janela reutilizam o PDF
+    ARTIFACT_MAX_AGE_DAYS = 30
+    ARTIFACT_MAX_MB = 2048
+    ARTIFACT_TEMP_MAX_AGE_SECONDS = 3600   # temporários/parciais abandonados mais velhos do que isto
+    ARTIFACT_SWEEP_INTERVAL = 600          # segundos entre limpezas feitas pelo worker
+
+    # Relatórios em lote ('flask batch-run')
+    BATCH_MAX_WORKERS = 4                  # relatórios gerados em simultâneo
+    BATCH_MAX_PER_SERVER = 2               # relatórios em simultâneo contra o mesmo servidor Zabbix
+    BATCH_HEARTBEAT_SECONDS = 30           # intervalo de sinal de vida do lote
+    BATCH_STALE_SECONDS = 120              # sem sinal há mais do que isto: o lote pode ser retomado
+
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'aura_dev.db')
 
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file